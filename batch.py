@@ -0,0 +1,196 @@
+"""
+Non-interactive batch mode: generates many scenarios from a job file in one process.
+
+Each job needs a prompt, a platform (reddit, twitter, instagram, facebook, or all to run it for every platform) and
+an output name, and may set its own country (defaults to the COUNTRY environment variable). Job files are JSONL (one job per line) or YAML (a list of jobs):
+    {"prompt": "Write 5 tweets about a forest fire.", "platform": "twitter", "output": "fire_tweets"}
+Jobs for very long threads can set "count" (and optionally "chunk_size") to generate them in parallel chunks.
+
+LLM calls run concurrently at batch priority (see scripts.ratelimit), and every render goes through the same shared browser. Completed jobs are recorded in a
+run log next to the outputs, so re-running the same job file after a crash only runs the jobs that did not finish.
+With --pipeline, jobs run through the asyncio pipeline instead (see scripts.pipeline), where generation, pictures, HTML
+and PDF export are separate stages that overlap across jobs, and stage utilization and throughput are reported.
+
+Usage: python batch.py jobs.jsonl [--concurrency 4] [--model gpt-4.1] [--format csv|parquet|feather] [--pipeline]
+"""
+# import packages
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+from openai import OpenAI
+from scripts.browser_pool import shutdown_pool
+from scripts.client import make_async_client, make_client
+from scripts.chunked import generate_chunked
+from scripts.fanout import platform_output
+from scripts.generate import PLATFORMS, generate_entries, entries_to_frame, render_in_memory
+from scripts.pipeline import format_report, run_pipeline
+from scripts.ratelimit import BATCH, limiter_stats, priority
+from scripts.tables import FORMATS, write_table
+from scripts.trace import start_trace
+
+def load_jobs(job_file: str) -> list:
+    """
+    Reads jobs from a JSONL or YAML file and checks that each one is complete.
+    """
+    with open(job_file, "r", encoding="utf-8") as file:
+        if Path(job_file).suffix.lower() in (".yaml", ".yml"):
+            # YAML support is optional, so only importing it when a YAML job file is used
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("[ERROR] Reading YAML job files requires PyYAML (pip install pyyaml).")
+            jobs = yaml.safe_load(file) or []
+        else:
+            jobs = [json.loads(line) for line in file if line.strip()]
+
+    # validating every job up front so a typo doesn't surface halfway through a long run
+    outputs = set()
+    expanded = []
+    for number, job in enumerate(jobs, start=1):
+        missing = [key for key in ("prompt", "platform", "output") if not job.get(key)]
+        if missing:
+            sys.exit(f"[ERROR] Job {number} is missing: {', '.join(missing)}")
+        if job["platform"] not in PLATFORMS and job["platform"] != "all":
+            sys.exit(f"[ERROR] Job {number} has unknown platform '{job['platform']}'. Choose from: {', '.join(PLATFORMS)}, all")
+        if re.search(r'[\\/:*?"<>|]', job["output"]):
+            sys.exit(rf'[ERROR] Job {number} output name contains invalid characters: \ / : * ? " < > |')
+        if not (job.get("country") or os.getenv("COUNTRY")):
+            sys.exit(f"[ERROR] Job {number} has no country and COUNTRY is not set.")
+        # "all" runs the scenario once per platform, as separate jobs so they run concurrently and resume separately
+        if job["platform"] == "all":
+            platform_jobs = [dict(job, platform=platform, output=platform_output(job["output"], platform))
+                             for platform in PLATFORMS]
+        else:
+            platform_jobs = [job]
+        for platform_job in platform_jobs:
+            if platform_job["output"] in outputs:
+                sys.exit(f"[ERROR] Job {number} reuses the output name '{platform_job['output']}'")
+            outputs.add(platform_job["output"])
+        expanded.extend(platform_jobs)
+    return expanded
+
+def job_key(job: dict) -> str:
+    """
+    Identifies a job by its content, so an edited job is re-run even if it keeps its output name.
+    """
+    fields = {key: job.get(key) for key in ("prompt", "platform", "country", "output")}
+    # optional fields only count when set, so existing run logs stay valid
+    fields.update({key: job[key] for key in ("count", "chunk_size") if job.get(key)})
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+def run_job(client: OpenAI, job: dict, model_name: str, use_cache: bool = True, file_format: str = "csv") -> float:
+    """
+    Generates, saves and renders a single job, returning how long it took in seconds.
+    """
+    started = time.perf_counter()
+    platform = job["platform"]
+    country = job.get("country") or os.getenv("COUNTRY")
+
+    # creating the LLM result, in parallel chunks for jobs asking for a large number of posts; batch requests give way
+    # to interactive ones sharing the same rate limits
+    with priority(BATCH):
+        if job.get("count"):
+            entries = generate_chunked(client, platform, job["prompt"], country, model_name, int(job["count"]),
+                                       int(job.get("chunk_size", 25)), use_cache=use_cache)
+        else:
+            entries = generate_entries(client, platform, job["prompt"], country, model_name, use_cache)
+
+    # pictures are named after their prompt, so jobs share one folder without overwriting each other's images
+    df = entries_to_frame(platform, entries, "pictures", model_name)
+
+    # printing the df for human edits if necessary, then rendering it
+    write_table(df, os.path.join("output", job["output"] + FORMATS[file_format]))
+    # rendering in memory and writing the finished HTML and PDF once, rather than having the browser read the page back
+    with priority(BATCH):
+        render_in_memory(platform, df, output_path=os.path.join("output", job["output"] + ".html"),
+                         model_name=model_name, client=client, use_cache=use_cache)
+    return time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate many social media scenarios from a job file.")
+    parser.add_argument("job_file", help="JSONL or YAML file with one job per entry")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum number of jobs running at once (default: 4)")
+    parser.add_argument("--model", default="gpt-4.1", help="model used for generation (default: gpt-4.1)")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate results even if an identical request is cached")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv",
+                        help="file format the generated posts are saved in (default: csv; parquet and feather need pyarrow)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run jobs through the asyncio pipeline, with --concurrency LLM calls at once, and report stage utilization")
+    parser.add_argument("--log", help="run log path (default: output/<job file name>.runlog.jsonl)")
+    parser.add_argument("--trace", metavar="FILE", help="time every pipeline stage and write a Chrome trace to FILE")
+    parser.add_argument("--profile", action="store_true", help="with --trace, also write cProfile stats for each renderer")
+    args = parser.parse_args()
+    if args.trace:
+        start_trace(args.trace, args.profile)
+
+    # loading .env file and checking for the API key, there is nobody to prompt in batch mode
+    load_dotenv()
+    if not os.getenv("OPENAI_API_KEY"):
+        sys.exit("[ERROR] OPENAI_API_KEY not found. Set it in .env or as an environment variable.")
+
+    # loading jobs after .env so COUNTRY can serve as the default country
+    jobs = load_jobs(args.job_file)
+    log_path = args.log or os.path.join("output", Path(args.job_file).stem + ".runlog.jsonl")
+
+    # skipping jobs that a previous run already completed
+    done = set()
+    if os.path.exists(log_path):
+        with open(log_path, "r", encoding="utf-8") as log:
+            done = {json.loads(line)["key"] for line in log if line.strip()}
+    pending = [job for job in jobs if job_key(job) not in done]
+    print(f"{len(jobs)} jobs loaded, {len(jobs) - len(pending)} already completed, {len(pending)} to run.")
+
+    # one client (and keep-alive connection pool) shared by every job, sized for a few image requests per job
+    client = make_client(max_keepalive_connections=max(20, args.concurrency * 4))
+    failures = 0
+    finished = 0
+
+    def record(job: dict, elapsed: float, error: Optional[Exception] = None) -> None:
+        nonlocal failures, finished
+        finished += 1
+        if error is not None:
+            failures += 1
+            print(f"[{finished}/{len(pending)}] FAILED {job['output']}: {error}")
+            return
+        # recording the job as soon as it completes, so a crash never loses finished work
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(json.dumps({"key": job_key(job), "output": job["output"], "completed": time.time()}) + "\n")
+        print(f"[{finished}/{len(pending)}] done {job['output']} ({elapsed:.1f}s)")
+
+    if args.pipeline:
+        # the pipeline has its own browser, and every request it makes is at batch priority
+        async_client = make_async_client(max_keepalive_connections=max(20, args.concurrency * 4))
+        with priority(BATCH):
+            report = asyncio.run(run_pipeline(pending, client, async_client, args.model, not args.no_cache, args.format,
+                                              workers={"generate": max(1, args.concurrency)}, on_done=record))
+        print(format_report(report))
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            futures = {executor.submit(run_job, client, job, args.model, not args.no_cache, args.format): job
+                       for job in pending}
+            for future in as_completed(futures):
+                error = future.exception()
+                record(futures[future], 0.0 if error else future.result(), error)
+
+    shutdown_pool()
+    print(f"Batch complete: {len(pending) - failures} succeeded, {failures} failed.")
+    # reporting time spent waiting on the rate limits (OPENAI_RPM, OPENAI_TPM, OPENAI_IMAGE_RPM) and 429s received
+    for kind, stats in limiter_stats().items():
+        waited = sum(stats["throttled_seconds"].values())
+        if waited or stats["rate_limited"]:
+            print(f"{kind.capitalize()} requests: {stats['throttled']} of {stats['requests']} throttled for {waited:.1f}s, "
+                  f"{stats['rate_limited']} rate limited")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
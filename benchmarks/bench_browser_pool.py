@@ -0,0 +1,59 @@
+"""
+Compares N sequential PDF exports with a fresh Chromium per export (the old behaviour of every generator)
+against the same exports served by a warm BrowserPool.
+Run from the repository root: python -m benchmarks.bench_browser_pool [N]
+"""
+# import packages
+import sys
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from playwright.sync_api import sync_playwright
+from scripts.browser_pool import BrowserPool, shutdown_pool
+from scripts.reddit_comments import reddit_comment_gen
+
+def cold_export(html_path: Path) -> None:
+    """
+    Reproduces the original per-call export: launch Chromium, render one page, close it.
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page()
+        page.goto(f"file://{html_path.resolve()}")
+        page.pdf(path=html_path.with_suffix(".pdf"), format="A4")
+        browser.close()
+
+def main(n: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # building a small sample feed once so only the export is timed
+        html_path = Path(tmp) / "sample.html"
+        df = pd.DataFrame({
+            "Type": ["top"] + ["comment"] * 9,
+            "Username": [f"user{i}" for i in range(10)],
+            "Upvotes": ["42"] * 10,
+            "Time": ["5 min ago"] * 10,
+            "Content": ["Lorem ipsum dolor sit amet."] * 10,
+        })
+        reddit_comment_gen(df, str(html_path))
+        shutdown_pool()
+
+        # timing a fresh browser per export
+        start = time.perf_counter()
+        for _ in range(n):
+            cold_export(html_path)
+        cold = time.perf_counter() - start
+
+        # timing the warm pool, including its one-off launch
+        start = time.perf_counter()
+        with BrowserPool() as pool:
+            for _ in range(n):
+                pool.render_pdf(html_path)
+        warm = time.perf_counter() - start
+
+    print(f"{n} exports without pool: {cold:.2f}s ({cold / n * 1000:.0f} ms/export)")
+    print(f"{n} exports with pool:    {warm:.2f}s ({warm / n * 1000:.0f} ms/export)")
+    print(f"speedup: {cold / warm:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,50 @@
+"""
+Compares one large structured output call with chunked parallel generation against a local fake model server whose
+response time grows with the number of entries returned, then repeats the chunked run with injected 429s to show
+that only the failed chunks are requested again.
+Run from the repository root: python -m benchmarks.bench_chunked_generation [total]
+"""
+# import packages
+import os
+import sys
+import time
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.chunked import generate_chunked, plan_chunks
+from scripts.generate import generate_entries
+
+# the benchmark must always reach the fake server
+os.environ["NO_CACHE"] = "1"
+
+PROMPT = "Write a Reddit thread about a power outage across the city."
+
+def main(total: int = 300) -> None:
+    with FakeOpenAI(latency=0.3, entry_delay=0.01) as server:
+        # switching off the client's own retries so failed chunks are retried by generate_chunked
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+
+        start = time.perf_counter()
+        entries = generate_entries(client, "reddit", f"{PROMPT} Generate exactly {total} comments.", "Testland", "fake-model")
+        single = time.perf_counter() - start
+        print(f"single call          {single:6.2f}s   {len(entries)} entries, 1 request")
+
+        for chunk_size in (100, 50, 25, 10):
+            before = server.requests
+            start = time.perf_counter()
+            entries = generate_chunked(client, "reddit", PROMPT, "Testland", "fake-model", total, chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f"chunks of {chunk_size:<3}       {elapsed:6.2f}s   {len(entries)} entries, "
+                  f"{server.requests - before} requests, {single / elapsed:4.1f}x faster")
+
+    # every 5th request is answered with a 429; each failed chunk costs one extra request, nothing more
+    with FakeOpenAI(latency=0.3, entry_delay=0.01, fail_every=5) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        chunks = len(plan_chunks(total, 25))
+        start = time.perf_counter()
+        entries = generate_chunked(client, "reddit", PROMPT, "Testland", "fake-model", total, chunk_size=25, max_attempts=5)
+        elapsed = time.perf_counter() - start
+        print(f"chunks of 25, 429s   {elapsed:6.2f}s   {len(entries)} entries, {server.requests} requests for "
+              f"{chunks} chunks + outline, {server.rate_limited} rate limited")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,71 @@
+"""
+Groups and renders multi-post Facebook feeds (posts x comments, rows shuffled so comments arrive out of order),
+comparing the single-pass grouping the generator uses with filtering the whole DataFrame once per post, which
+grows quadratically with the number of posts. Pass --pdf to also time one PDF per post on the browser pool.
+Run from the repository root: python -m benchmarks.bench_facebook_feed [posts] [comments] [--pdf]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from scripts.browser_pool import shutdown_pool
+from scripts.facebook import arrange_feed, facebook_gen
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def synthetic_feed(posts: int, comments: int) -> pd.DataFrame:
+    """
+    Builds posts * (comments + 1) rows, shuffled so every post's comments are spread across the whole CSV.
+    """
+    rows = posts * (comments + 1)
+    df = pd.DataFrame({
+        "PostID": [f"p{i // (comments + 1)}" for i in range(rows)],
+        "Name": [f"Alex Tan {i % 5000}" for i in range(rows)],
+        "Type": ["Post" if i % (comments + 1) == 0 else "Comment" for i in range(rows)],
+        "Time": ["1h"] * rows,
+        "Text": ["Saw this on the way to work today, stay safe everyone!"] * rows,
+        "Likes": ["42"] * rows,
+    })
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+def filter_per_post(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The naive grouping: one boolean mask over every row for each post.
+    """
+    parts = []
+    for post_id in df.loc[df["Type"] == "Post", "PostID"]:
+        rows = df[df["PostID"] == post_id]
+        parts.append(pd.concat([rows[rows["Type"] == "Post"].iloc[:1], rows[rows["Type"] == "Comment"]]))
+    return pd.concat(parts)
+
+def main(posts: int = 1000, comments: int = 100, pdf: bool = False) -> None:
+    for size in (posts // 4, posts // 2, posts):
+        df = synthetic_feed(size, comments)
+        start = time.perf_counter()
+        arranged = arrange_feed(df)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        filter_per_post(df)
+        masked = time.perf_counter() - start
+        print(f"{size:>5} posts x {comments} comments ({len(df):>7,} rows)   single pass {single:6.3f}s   "
+              f"mask per post {masked:7.3f}s   {len(arranged):,} rows grouped")
+
+    df = synthetic_feed(posts, comments)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        facebook_gen(df, os.path.join(tmp, "feed.html"), pdf=False)
+        print(f"full render of {posts} posts: {time.perf_counter() - start:.2f}s")
+        if pdf:
+            df = synthetic_feed(min(posts, 50), comments)
+            start = time.perf_counter()
+            facebook_gen(df, os.path.join(tmp, "feed.html"), pdf_per_post=True)
+            print(f"{min(posts, 50)} per-post PDFs: {time.perf_counter() - start:.2f}s "
+                  f"(BROWSER_POOL_SIZE={os.getenv('BROWSER_POOL_SIZE', '1')})")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:] if arg != "--pdf"]
+    main(*args, pdf="--pdf" in sys.argv)
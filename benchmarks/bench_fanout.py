@@ -0,0 +1,55 @@
+"""
+Generates one scenario for all four platforms against a local fake model server, first as four separate runs (one
+platform at a time, each launching its own browser like rerunning main.py), then with the concurrent fan-out on one
+warm browser. The fan-out should take about as long as the slowest single platform.
+Run from the repository root: python -m benchmarks.bench_fanout [latency]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.browser_pool import shutdown_pool
+from scripts.fanout import fan_out
+from scripts.generate import PLATFORMS
+
+# the benchmark must always reach the fake server, with avatars generated locally and the tiny fake pictures used as is
+os.environ["NO_CACHE"] = "1"
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+os.environ.setdefault("IMAGE_FORMAT", "png")
+
+PROMPT = "Write posts about a power outage across the city."
+
+def main(latency: float = 2.0) -> None:
+    with FakeOpenAI(latency=latency, entries=20) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test")
+        with tempfile.TemporaryDirectory() as tmp:
+            stem = os.path.join(tmp, "scenario")
+
+            timings = {}
+            start = time.perf_counter()
+            for platform in PLATFORMS:
+                platform_start = time.perf_counter()
+                fan_out(client, PROMPT, "Testland", "fake-model", stem, platforms=[platform], use_cache=False)
+                # a fresh browser for the next platform, as a separate run of main.py would launch
+                shutdown_pool()
+                timings[platform] = time.perf_counter() - platform_start
+            separate = time.perf_counter() - start
+
+            start = time.perf_counter()
+            errors = fan_out(client, PROMPT, "Testland", "fake-model", stem, use_cache=False)
+            together = time.perf_counter() - start
+            shutdown_pool()
+
+    slowest = max(timings, key=timings.get)
+    print(f"separate runs   {separate:6.2f}s   ({', '.join(f'{p} {t:.2f}s' for p, t in timings.items())})")
+    print(f"fan-out         {together:6.2f}s   {separate / together:4.1f}x faster, "
+          f"{together / timings[slowest]:4.2f}x the slowest platform ({slowest})")
+    failed = [platform for platform, error in errors.items() if error]
+    if failed:
+        print(f"failed: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
@@ -0,0 +1,76 @@
+"""
+Renders a 50-post Instagram feed with pictures shaped like the model's output (1024px PNGs) twice: with the pictures
+embedded as generated, and after the post-processing stage has downsized and re-encoded them. Reports the
+processing time (worker processes vs. a single process), PDF render time and PDF size of each.
+Run from the repository root: python -m benchmarks.bench_image_pipeline [posts]
+Needs Pillow and Playwright.
+"""
+# import packages
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image
+from benchmarks.feeds import synthetic_feed
+from scripts.browser_pool import get_pool, shutdown_pool
+from scripts.images import process_images
+from scripts.instagram import instagram_gen
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def write_pictures(folder: Path, count: int) -> None:
+    """
+    Writes count distinct 1024px PNGs: a colour gradient with noise, so they compress like photos rather than flat colour.
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    gradient = Image.linear_gradient("L").resize((1024, 1024))
+    for i in range(count):
+        noise = Image.effect_noise((1024, 1024), 40 + i)
+        Image.merge("RGB", (gradient, noise, gradient.rotate(90 + i))).save(folder / f"user_{i}.png")
+
+def render(df, output_path: str) -> tuple:
+    """
+    Renders the feed with its PDF and returns (seconds, PDF size in MB).
+    """
+    start = time.perf_counter()
+    instagram_gen(df, output_path)
+    return time.perf_counter() - start, os.path.getsize(Path(output_path).with_suffix(".pdf")) / 1e6
+
+def main(posts: int = 50) -> None:
+    df = synthetic_feed("instagram", posts)
+    get_pool().warm()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_pictures(Path(tmp) / "pictures", posts)
+        png_size = sum(path.stat().st_size for path in (Path(tmp) / "pictures").iterdir()) / 1e6
+
+        # the pictures as generated
+        os.environ["IMAGE_FORMAT"] = "png"
+        original, original_pdf = render(df, os.path.join(tmp, "original.html"))
+
+        # processing in one process, then again (from scratch) in the worker pool
+        os.environ["IMAGE_FORMAT"] = "webp"
+        start = time.perf_counter()
+        process_images(df["FilePath"], tmp, max_workers=1)
+        serial = time.perf_counter() - start
+        for path in (Path(tmp) / "pictures").glob("*.webp"):
+            path.unlink()
+        start = time.perf_counter()
+        process_images(df["FilePath"], tmp)
+        parallel = time.perf_counter() - start
+        webp_size = sum(path.stat().st_size for path in (Path(tmp) / "pictures").glob("*.600.webp")) / 1e6
+
+        processed, processed_pdf = render(df, os.path.join(tmp, "processed.html"))
+        shutil.rmtree(Path(tmp) / "pictures")
+
+    print(f"{posts} pictures: {png_size:.1f} MB of PNGs -> {webp_size:.1f} MB of {os.getenv('IMAGE_QUALITY', '80')}% WebP")
+    print(f"processing      1 process {serial:6.2f}s   {os.cpu_count()} processes {parallel:6.2f}s")
+    print(f"original PNGs   render {original:6.2f}s   PDF {original_pdf:7.1f} MB")
+    print(f"processed WebP  render {processed:6.2f}s   PDF {processed_pdf:7.1f} MB   ({original / processed:.1f}x faster, "
+          f"{original_pdf / processed_pdf:.1f}x smaller)")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,45 @@
+"""
+Compares exporting a feed the file way (HTML written to disk, loaded back by Chromium, PDF written next to it) with
+the in-memory path (HTML rendered to a string, loaded with set_content, PDF returned as bytes), on one warm browser.
+Run from the repository root: python -m benchmarks.bench_in_memory_render [exports] [rows]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from benchmarks.feeds import synthetic_feed
+from scripts.browser_pool import get_pool, shutdown_pool
+from scripts.generate import render_in_memory
+from scripts.tweets import tweet_gen
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def main(exports: int = 20, rows: int = 50) -> None:
+    df = synthetic_feed("twitter", rows)
+    get_pool().warm()
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "feed.html")
+        # one untimed run of each so avatars and page set-up are warm for both
+        tweet_gen(df, output_path)
+        render_in_memory("twitter", df)
+
+        start = time.perf_counter()
+        for _ in range(exports):
+            tweet_gen(df, output_path)
+        files = (time.perf_counter() - start) / exports
+
+        start = time.perf_counter()
+        for _ in range(exports):
+            html, pdf = render_in_memory("twitter", df)
+        memory = (time.perf_counter() - start) / exports
+
+    print(f"{rows} tweets, mean of {exports} exports")
+    print(f"file round-trip  {files * 1000:7.1f} ms per export")
+    print(f"in memory        {memory * 1000:7.1f} ms per export   ({len(html) / 1e3:.0f} kB HTML, {len(pdf) / 1e3:.0f} kB PDF, "
+          f"{files / memory:.2f}x)")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,54 @@
+"""
+Shows that insta_pic_gen's wall time scales with the concurrency limit rather than the number of rows,
+using a local fake OpenAI endpoint that injects latency and 429s.
+Run from the repository root: python -m benchmarks.bench_insta_concurrency
+"""
+# import packages
+import math
+import os
+import tempfile
+import time
+import pandas as pd
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.instagram import insta_pic_gen
+
+# every run must reach the fake server rather than the response cache
+os.environ["NO_CACHE"] = "1"
+
+def main(rows: int = 20, latency: float = 0.5) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        # insta_pic_gen writes relative to the output folder, so working from a scratch copy of it
+        os.makedirs(os.path.join(tmp, "output"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            df = pd.DataFrame({
+                "ImagePrompt": [f"A photo of a crowded hawker centre, take {i}" for i in range(rows)],
+                "FilePath": [f"post_{i}.png" for i in range(rows)],
+            })
+            for limit in (1, 4, 10, 20):
+                # clearing images from the previous run so every run has to write all of them
+                for path in df["FilePath"]:
+                    if os.path.exists(os.path.join("output", path)):
+                        os.remove(os.path.join("output", path))
+                with FakeOpenAI(latency=latency, fail_every=7) as server:
+                    client = OpenAI(base_url=server.base_url, api_key="test")
+                    start = time.perf_counter()
+                    insta_pic_gen(df, "fake-model", max_in_flight=limit, timeout=10, backoff=0.05, client=client,
+                                  use_cache=False)
+                    elapsed = time.perf_counter() - start
+                written = sum(os.path.exists(os.path.join("output", p)) for p in df["FilePath"])
+                # wall time should track ceil(rows / limit) request latencies, not rows * latency
+                ideal = math.ceil(rows / limit) * latency
+                print(f"max_in_flight={limit:>2}: {elapsed:5.2f}s (ideal {ideal:4.2f}s), "
+                      f"{written}/{rows} images, {server.rate_limited} injected 429s, peak in flight {server.max_in_flight}")
+                assert written == rows
+                assert server.max_in_flight <= limit
+                # allowing for the retried 429s and some scheduling overhead
+                assert elapsed < ideal * 2 + 1
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
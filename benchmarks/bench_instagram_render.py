@@ -0,0 +1,66 @@
+"""
+Regression benchmark for the Instagram renderer: renders 1k and 10k posts and checks that both the time taken
+and the bytes written grow linearly with the number of posts (the old renderer rewrote the whole file per post).
+Run from the repository root: python -m benchmarks.bench_instagram_render
+"""
+# import packages
+import builtins
+import os
+import tempfile
+import time
+import scripts.render as render_engine
+from benchmarks.feeds import synthetic_feed
+from scripts.instagram import instagram_gen
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def render(rows: int, output_path: str) -> tuple:
+    """
+    Renders a feed without PDF export and returns (seconds, bytes written to disk).
+    """
+    written = 0
+
+    # counting every byte the renderer writes, however many times it opens the file
+    class CountingFile:
+        def __init__(self, f):
+            self._f = f
+        def write(self, data):
+            nonlocal written
+            written += len(data.encode("utf-8")) if isinstance(data, str) else len(data)
+            return self._f.write(data)
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return self._f.__exit__(*exc)
+
+    # the renderer opens its output through the render engine
+    render_engine.open = lambda *args, **kwargs: CountingFile(builtins.open(*args, **kwargs))
+    try:
+        df = synthetic_feed("instagram", rows)
+        start = time.perf_counter()
+        instagram_gen(df, output_path, pdf=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        del render_engine.open
+    return elapsed, written
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "feed.html")
+        small_time, small_bytes = render(1_000, output_path)
+        large_time, large_bytes = render(10_000, output_path)
+        file_size = os.path.getsize(output_path)
+
+    print(f"  1k posts: {small_time:.3f}s, {small_bytes / 1e6:.2f} MB written")
+    print(f" 10k posts: {large_time:.3f}s, {large_bytes / 1e6:.2f} MB written")
+    print(f"time ratio {large_time / small_time:.1f}x, bytes ratio {large_bytes / small_bytes:.1f}x (linear is 10x)")
+
+    # the document is written exactly once
+    assert large_bytes == file_size
+    # 10x the posts should cost about 10x the bytes and well under the ~100x a quadratic renderer would take
+    assert 9 <= large_bytes / small_bytes <= 11
+    assert large_time / small_time < 20
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Renders feeds with Python's network access disabled, checking that the HTML references no remote resources and
+that render time stays flat as the number of distinct commenters grows. Runs with the local avatar provider and with
+the default cached DiceBear provider starting from an empty cache, whose fetches hang for a second before failing
+like an unreachable network, so only the first ones should wait.
+Run from the repository root: python -m benchmarks.bench_offline_render [--pdf]
+"""
+# import packages
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+from benchmarks.feeds import synthetic_feed
+from scripts.facebook import facebook_gen
+from scripts.instagram import instagram_gen
+from scripts.tweets import tweet_gen
+
+# seconds an outgoing connection hangs before it fails
+CONNECT_DELAY = 1.0
+
+def block_network() -> None:
+    """
+    Makes every outgoing connection from this process fail, after hanging like an unreachable host.
+    """
+    def refuse(*args, **kwargs):
+        time.sleep(CONNECT_DELAY)
+        raise OSError("network disabled for this benchmark")
+    socket.socket.connect = refuse
+    socket.create_connection = refuse
+
+def main(pdf: bool = False) -> None:
+    block_network()
+    generators = {"twitter": tweet_gen, "facebook": facebook_gen, "instagram": instagram_gen}
+    for provider in ("local", "cached"):
+        os.environ["AVATAR_PROVIDER"] = provider
+        with tempfile.TemporaryDirectory() as tmp:
+            # an empty avatar cache, so the cached provider has to try the network
+            os.environ["CACHE_DIR"] = os.path.join(tmp, "cache")
+            for platform, generator in generators.items():
+                for users in (10, 100, 1000):
+                    df = synthetic_feed(platform, 1000)
+                    # varying how many distinct people appear in the same 1000-post feed
+                    column = "Name" if platform == "facebook" else "Username"
+                    df[column] = [f"person {i % users}" for i in range(len(df))]
+                    output_path = os.path.join(tmp, f"{platform}_{users}.html")
+                    start = time.perf_counter()
+                    generator(df, output_path, pdf=pdf)
+                    elapsed = time.perf_counter() - start
+                    with open(output_path, "r", encoding="utf-8") as f:
+                        remote = re.findall(r'src="(https?://[^"]+)"', f.read())
+                    print(f"{provider:<7} {platform:<10} {users:>5} distinct users: {elapsed:.3f}s, "
+                          f"{len(remote)} remote images")
+                    assert not remote
+
+if __name__ == "__main__":
+    main("--pdf" in sys.argv)
@@ -0,0 +1,64 @@
+"""
+Runs a mix of scenarios against a local fake model server one after the other (LLM call, posts file, pictures, HTML,
+PDF, then the next scenario), as main.py does, and then through the asyncio pipeline, where the stages overlap
+across scenarios. Prints throughput in scenarios/minute for both, and the pipeline's per-stage utilization.
+Run from the repository root: python -m benchmarks.bench_pipeline [scenarios]
+"""
+# import packages
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from openai import AsyncOpenAI, OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.browser_pool import get_pool, shutdown_pool
+from scripts.generate import entries_to_frame, generate_entries, render_in_memory
+from scripts.pipeline import format_report, run_pipeline
+from scripts.tables import write_table
+
+# the benchmark must always reach the fake server, with avatars generated locally and the tiny fake pictures used as is
+os.environ["NO_CACHE"] = "1"
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+os.environ.setdefault("IMAGE_FORMAT", "png")
+
+PLATFORMS = ("twitter", "reddit", "facebook", "instagram")
+
+def scenarios(count: int) -> list:
+    return [{"prompt": f"Write posts about power outage number {i}.", "platform": PLATFORMS[i % len(PLATFORMS)],
+             "country": "Testland", "output": f"scenario_{i}"} for i in range(count)]
+
+def sequential(jobs: list, client: OpenAI, output_dir: str) -> float:
+    """
+    Runs every scenario from start to finish before starting the next, returning the total seconds.
+    """
+    start = time.perf_counter()
+    for job in jobs:
+        entries = generate_entries(client, job["platform"], job["prompt"], job["country"], "fake-model", use_cache=False)
+        df = entries_to_frame(job["platform"], entries, "pictures", "fake-model")
+        write_table(df, os.path.join(output_dir, job["output"] + ".csv"))
+        render_in_memory(job["platform"], df, output_path=os.path.join(output_dir, job["output"] + ".html"),
+                         model_name="fake-model", client=client, use_cache=False, pic_dir=output_dir)
+    return time.perf_counter() - start
+
+def main(count: int = 16) -> None:
+    jobs = scenarios(count)
+    with FakeOpenAI(latency=1.0, entries=20) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test")
+
+        # warming the shared browser first so the sequential run doesn't pay for its launch
+        get_pool().warm()
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = sequential(jobs, client, tmp)
+        shutdown_pool()
+        print(f"sequential  {elapsed:6.2f}s   {count / elapsed * 60:6.1f} scenarios/minute")
+
+        async_client = AsyncOpenAI(base_url=server.base_url, api_key="test")
+        with tempfile.TemporaryDirectory() as tmp:
+            report = asyncio.run(run_pipeline(jobs, client, async_client, "fake-model", use_cache=False, output_dir=tmp))
+        print(f"pipeline    {report['seconds']:6.2f}s   {report['scenarios_per_minute']:6.1f} scenarios/minute   "
+              f"({report['failed']} failed)")
+        print(format_report(report))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
@@ -0,0 +1,88 @@
+"""
+Runs parallel generation against a local fake API enforcing requests-per-minute and tokens-per-minute limits
+(scaled down to a short window so the run takes seconds), first relying on the OpenAI SDK's own retries and then
+through the shared scheduler configured with the same budgets, comparing 429s received and total time.
+A final run floods the scheduler with batch requests and then sends a few interactive ones, which should overtake
+the queue.
+Run from the repository root: python -m benchmarks.bench_rate_limits [requests]
+"""
+# import packages
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.generate import generate_entries
+from scripts.ratelimit import BATCH, INTERACTIVE, RateLimiter, priority, set_limiter
+
+# the benchmark must always reach the fake server
+os.environ["NO_CACHE"] = "1"
+
+# the fake API's limits, per WINDOW seconds instead of per minute
+WINDOW = 2.0
+RPM = 10
+TPM = 40_000
+PROMPT = "Write 5 tweets about a power outage across the city."
+
+def timed_request(client: OpenAI, level: int) -> float:
+    """
+    Generates one feed at the given priority and returns how long it took.
+    """
+    start = time.perf_counter()
+    with priority(level):
+        generate_entries(client, "twitter", PROMPT, "Testland", "fake-model", use_cache=False)
+    return time.perf_counter() - start
+
+def run(server: FakeOpenAI, client: OpenAI, requests: int) -> tuple:
+    before = server.rate_limited
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda _: timed_request(client, INTERACTIVE), range(requests)))
+    return time.perf_counter() - start, server.rate_limited - before
+
+def main(requests: int = 30) -> None:
+    with FakeOpenAI(latency=0.05, rpm=RPM, tpm=TPM, window=WINDOW) as server:
+        # without budgets, every request goes straight out and the SDK retries 429s on its own
+        set_limiter(RateLimiter())
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=10)
+        elapsed, limited = run(server, client, requests)
+        print(f"SDK retries only   {elapsed:6.2f}s   {limited:3d} requests rate limited")
+
+        # the scheduler with the API's budgets sends requests as fast as the limits allow
+        limiter = RateLimiter(rpm=RPM, tpm=TPM, period=WINDOW)
+        set_limiter(limiter)
+        time.sleep(WINDOW)
+        elapsed, limited = run(server, client, requests)
+        stats = limiter.snapshot()
+        print(f"shared scheduler   {elapsed:6.2f}s   {limited:3d} requests rate limited   "
+              f"{stats['throttled']} throttled for {sum(stats['throttled_seconds'].values()):.1f}s in total")
+        print(f"(limit: {RPM} requests and {TPM:,} tokens per {WINDOW:.0f}s, i.e. at least "
+              f"{(requests - RPM) / RPM * WINDOW:.1f}s for {requests} requests)")
+
+        # a backlog of batch requests, then interactive ones arriving while it drains
+        limiter = RateLimiter(rpm=RPM, tpm=TPM, period=WINDOW)
+        set_limiter(limiter)
+        time.sleep(WINDOW)
+        latencies = {BATCH: [], INTERACTIVE: []}
+
+        def submit(level: int) -> None:
+            latencies[level].append(timed_request(client, level))
+
+        threads = [threading.Thread(target=submit, args=(BATCH,)) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        time.sleep(WINDOW / 2)
+        interactive = [threading.Thread(target=submit, args=(INTERACTIVE,)) for _ in range(3)]
+        for thread in interactive:
+            thread.start()
+        for thread in threads + interactive:
+            thread.join()
+        print(f"priorities         batch mean {statistics.fmean(latencies[BATCH]):5.2f}s   "
+              f"interactive mean {statistics.fmean(latencies[INTERACTIVE]):5.2f}s (sent behind {requests} batch requests)")
+        print(f"throttled seconds  {limiter.snapshot()['throttled_seconds']}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
@@ -0,0 +1,53 @@
+"""
+Renders synthetic nested Reddit threads: a deep one (every comment replies to the previous one, far past Python's
+recursion limit) and a wide one (every comment replies to a random earlier comment), at two sizes to check that
+ordering and rendering time grow linearly. A collapsed run hides everything below the second level.
+Run from the repository root: python -m benchmarks.bench_reddit_tree [rows]
+"""
+# import packages
+import os
+import random
+import sys
+import tempfile
+import time
+import pandas as pd
+from scripts.reddit_comments import arrange_thread, reddit_comment_gen
+
+def synthetic_thread(rows: int, shape: str) -> pd.DataFrame:
+    """
+    Builds a thread with one "top" post and rows - 1 comments, shaped "deep" (a single chain) or "wide" (random tree).
+    """
+    rng = random.Random(0)
+    parents = [""] + [f"c{i - 1}" if shape == "deep" else f"c{rng.randrange(i)}" for i in range(1, rows)]
+    return pd.DataFrame({
+        "ID": [f"c{i}" for i in range(rows)],
+        "ParentID": parents,
+        "Type": ["top"] + ["comment"] * (rows - 1),
+        "Username": [f"user_{i % 5000}" for i in range(rows)],
+        "Upvotes": [str(i % 500) for i in range(rows)],
+        "Time": ["12 min ago"] * rows,
+        "Content": ["Power's been out on our street for an hour, anyone know when it's coming back?"] * rows,
+    })
+
+def main(rows: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for shape in ("deep", "wide"):
+            for size in (rows // 2, rows):
+                df = synthetic_thread(size, shape)
+                start = time.perf_counter()
+                arranged = arrange_thread(df)
+                ordered = time.perf_counter() - start
+                start = time.perf_counter()
+                reddit_comment_gen(df, os.path.join(tmp, f"{shape}.html"), pdf=False)
+                rendered = time.perf_counter() - start
+                print(f"{shape:<5} {size:>7,} comments   max depth {arranged['Depth'].max():>7,}   "
+                      f"tree {ordered:5.2f}s ({size / ordered:>9,.0f}/s)   full render {rendered:5.2f}s ({size / rendered:>9,.0f}/s)")
+
+        df = synthetic_thread(rows, "wide")
+        start = time.perf_counter()
+        collapsed = arrange_thread(df, collapse_depth=2)
+        print(f"wide, collapsed below depth 2: {len(collapsed):,} of {rows:,} comments shown, "
+              f"{collapsed['Hidden'].sum():,} hidden, {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,91 @@
+"""
+Measures peak RSS and throughput of the streaming renderers on 100k-row CSV inputs, one platform per subprocess
+so every measurement starts from a clean high-water mark. The same feed is also rendered the old way (whole body
+assembled as one string, then formatted into the page) for comparison.
+Run from the repository root: python -m benchmarks.bench_render_engine [rows]
+Unix only, as it relies on the resource module.
+"""
+# import packages
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+from benchmarks.feeds import synthetic_feed
+
+PLATFORMS = ("reddit", "twitter", "instagram", "facebook")
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far, in MB (ru_maxrss is in KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+def legacy_render(platform: str, df: pd.DataFrame, output_path: str) -> None:
+    """
+    Renders the feed the way the generators used to: one growing string, then a full-document format.
+    """
+    from scripts import facebook, instagram, reddit_comments, tweets
+    df["ProfileImage"] = "avatar.svg"
+    if platform == "reddit":
+        page, body = reddit_comments.REDDIT_PAGE, "".join(
+            reddit_comments.REDDIT_BLOCK.format(BoxClass="post-box" if row["Type"] == "top" else "comment-box",
+                                                Indent=0 if row["Type"] == "top" else 20, Collapsed="", **row) for _, row in df.iterrows())
+        slots = {"body": body}
+    elif platform == "twitter":
+        page, slots = tweets.TWEET_PAGE, {"body": "".join(tweets.TWEET_BLOCK.format_map(row) for _, row in df.iterrows())}
+    elif platform == "instagram":
+        # the old renderer had no responsive image sources
+        df["SrcSet"] = ""
+        page, slots = instagram.INSTAGRAM_PAGE, {"body": "".join(instagram.INSTAGRAM_BLOCK.format_map(row) for _, row in df.iterrows())}
+    else:
+        page, slots = facebook.FACEBOOK_PAGE, {"body": facebook.FACEBOOK_POST.format_map(df.iloc[0].to_dict()) + "".join(
+            facebook.FACEBOOK_COMMENT.format_map(row) for _, row in df.iloc[1:].iterrows())}
+    # formatting the whole document into one string before writing it, as the old generators did
+    final_html = "".join(literal + (slots[field] if field else "") for literal, field in page.parts)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(final_html)
+
+def measure(platform: str, csv_path: str, legacy: bool) -> None:
+    """
+    Renders one CSV and prints a single result line; runs inside its own subprocess.
+    """
+    from scripts.facebook import facebook_gen
+    from scripts.instagram import instagram_gen
+    from scripts.reddit_comments import reddit_comment_gen
+    from scripts.tweets import tweet_gen
+    generators = {"reddit": reddit_comment_gen, "twitter": tweet_gen, "instagram": instagram_gen, "facebook": facebook_gen}
+
+    df = pd.read_csv(csv_path)
+    baseline = peak_rss_mb()
+    output_path = csv_path.replace(".csv", ".html")
+    start = time.perf_counter()
+    if legacy:
+        legacy_render(platform, df, output_path)
+    else:
+        generators[platform](df, output_path, pdf=False)
+    elapsed = time.perf_counter() - start
+    extra = peak_rss_mb() - baseline
+    label = "legacy" if legacy else "stream"
+    print(f"{platform:<10} {label:<7} {len(df) / elapsed:>10,.0f} rows/s   peak RSS +{extra:7.1f} MB "
+          f"over the loaded DataFrame   output {os.path.getsize(output_path) / 1e6:.0f} MB")
+
+def main(rows: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for platform in PLATFORMS:
+            csv_path = os.path.join(tmp, f"{platform}.csv")
+            synthetic_feed(platform, rows).to_csv(csv_path, index=False, encoding="utf-8-sig")
+            for mode in ("legacy", "stream"):
+                subprocess.run([sys.executable, "-m", "benchmarks.bench_render_engine", "--measure", platform, csv_path, mode], check=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3], sys.argv[4] == "legacy")
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
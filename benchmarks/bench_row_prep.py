@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of per-row field preparation: rows/sec with the old iterrows()/apply() loop ("before") versus
+the column-wise preparation the generators now use ("after"), for each platform. PDF export is skipped.
+Run from the repository root: python -m benchmarks.bench_row_prep [rows]
+"""
+# import packages
+import itertools
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from benchmarks.feeds import synthetic_feed
+from scripts import facebook, instagram, reddit_comments, tweets
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def before(platform: str, df: pd.DataFrame, output_path: str) -> None:
+    """
+    The previous preparation: avatar URLs via .apply(lambda ...), then one boxed Series per row via iterrows().
+    """
+    df = df.copy()
+    url = "https://api.dicebear.com/9.x/notionists-neutral/svg?seed="
+    if platform == "reddit":
+        reddit_comments.REDDIT_PAGE.render_to_file(output_path, body=(
+            reddit_comments.REDDIT_BLOCK.format(BoxClass="post-box" if row["Type"] == "top" else "comment-box",
+                                                Indent=0 if row["Type"] == "top" else 20, Collapsed="", **row)
+            for _, row in df.iterrows()
+        ))
+    elif platform == "twitter":
+        df["ProfileImage"] = df["Username"].apply(lambda name: f"{url}{name}")
+        tweets.TWEET_PAGE.render_to_file(output_path, body=(
+            tweets.TWEET_BLOCK.format_map(row) for _, row in df.iterrows()
+        ))
+    elif platform == "instagram":
+        df["ProfileImage"] = df["Username"].apply(lambda name: f"{url}{name}")
+        instagram.INSTAGRAM_PAGE.render_to_file(output_path, body=(
+            instagram.INSTAGRAM_BLOCK.format(**{**row, "Likes": f"{row['Likes']:,}", "CommentCount": f"{row['CommentCount']:,}",
+                                                "SrcSet": ""})
+            for _, row in df.iterrows()
+        ))
+    else:
+        df["ProfileImage"] = df["Name"].apply(lambda name: f"{url}{name}")
+        facebook.FACEBOOK_PAGE.render_to_file(output_path, body=itertools.chain(
+            [facebook.FACEBOOK_POST.format_map(df[df["Type"] == "Post"].iloc[0].to_dict())],
+            (facebook.FACEBOOK_COMMENT.format_map(row) for _, row in df[df["Type"] == "Comment"].iterrows()),
+        ))
+
+def after(platform: str, df: pd.DataFrame, output_path: str) -> None:
+    """
+    The current generators, which prepare each field column-wise and render from plain tuples.
+    """
+    generators = {
+        "reddit": reddit_comments.reddit_comment_gen,
+        "twitter": tweets.tweet_gen,
+        "instagram": instagram.instagram_gen,
+        "facebook": facebook.facebook_gen,
+    }
+    generators[platform](df, output_path, pdf=False)
+
+def main(rows: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "feed.html")
+        print(f"{'platform':<10} {'before':>14} {'after':>14}  speedup")
+        for platform in ("reddit", "twitter", "instagram", "facebook"):
+            df = synthetic_feed(platform, rows)
+            timings = []
+            for render in (before, after):
+                start = time.perf_counter()
+                render(platform, df, output_path)
+                timings.append(time.perf_counter() - start)
+            print(f"{platform:<10} {rows / timings[0]:>9,.0f} rows/s {rows / timings[1]:>9,.0f} rows/s  {timings[0] / timings[1]:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
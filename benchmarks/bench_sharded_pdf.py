@@ -0,0 +1,52 @@
+"""
+Compares a single page.pdf call on a synthetic 10k-tweet feed (what tweet_gen did before) with the sharded export,
+which renders chunks of the feed in parallel across several browsers and merges the PDFs in order.
+Run from the repository root: python -m benchmarks.bench_sharded_pdf [rows] [browsers] [shard_size]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from benchmarks.feeds import synthetic_feed
+from scripts.avatars import LocalAvatars
+from scripts.browser_pool import BrowserPool, export_feed_pdf
+from scripts.render import escape_column, render_rows
+from scripts.tweets import TWEET_BLOCK, TWEET_PAGE, tweet_gen
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def main(rows: int = 10_000, browsers: int = 4, shard_size: int = 1_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        df = synthetic_feed("twitter", rows)
+        output_path = os.path.join(tmp, "tweets.html")
+        tweet_gen(df, output_path, pdf=False)
+        columns = {name: escape_column(df[name]) for name in df.columns}
+        columns["ProfileImage"] = escape_column(LocalAvatars().column(df["Username"], tmp))
+
+        # one browser, one page.pdf call over the whole feed
+        with BrowserPool(size=1) as pool:
+            pool.render_pdf(output_path)  # warm-up so both runs exclude the browser launch
+            start = time.perf_counter()
+            pool.render_pdf(output_path)
+            single = time.perf_counter() - start
+        single_size = os.path.getsize(os.path.join(tmp, "tweets.pdf"))
+
+        # shards rendered in parallel on several browsers, then merged
+        with BrowserPool(size=browsers) as pool:
+            for _ in range(browsers):
+                pool.submit(output_path, os.path.join(tmp, "warmup.pdf")).result()
+            start = time.perf_counter()
+            export_feed_pdf(TWEET_PAGE, output_path, rows, "body", shard_size, pool,
+                            body=render_rows(TWEET_BLOCK, columns))
+            sharded = time.perf_counter() - start
+        sharded_size = os.path.getsize(os.path.join(tmp, "tweets.pdf"))
+
+    print(f"single page.pdf:            {single:6.2f}s ({single_size / 1e6:.1f} MB)")
+    print(f"{rows // shard_size} shards on {browsers} browsers: {sharded:6.2f}s ({sharded_size / 1e6:.1f} MB)")
+    print(f"speedup: {single / sharded:.1f}x")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
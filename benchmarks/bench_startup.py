@@ -0,0 +1,64 @@
+"""
+Measures CLI startup cost with `python -X importtime`: `main.py --help`, and re-rendering a CSV to HTML with
+`main.py --render` (no PDF). Each run happens in a fresh interpreter; the cumulative import time of every top-level
+module is read from stderr.
+The render path must not import openai or playwright, and its total import time should stay under RENDER_BUDGET_S.
+Run from the repository root: python -m benchmarks.bench_startup [rows]
+"""
+# import packages
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.feeds import synthetic_feed
+
+# target for the cumulative import time of the render-from-CSV path (pandas + pydantic + the renderers)
+RENDER_BUDGET_S = 1.0
+
+# modules the render path must never load
+FORBIDDEN = ("openai", "playwright")
+
+def import_times(args: list, env: dict) -> tuple:
+    """
+    Runs main.py under -X importtime and returns the cumulative import time in seconds of each top-level import,
+    along with the names of every module that was loaded.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "main.py", *args],
+                            capture_output=True, text=True, env=env, check=True)
+    times, modules = {}, set()
+    # lines look like "import time:   self [us] | cumulative | <indent>package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        # only counting top-level imports (no indentation), as nested ones are part of their parent's cumulative time
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative) / 1e6
+    return times, modules
+
+def report(label: str, times: dict) -> float:
+    total = sum(times.values())
+    heaviest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f"{label:<18} {total:6.3f} s of imports   heaviest: "
+          + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in heaviest))
+    return total
+
+def main(rows: int = 50) -> None:
+    # generating avatars locally so the render doesn't reach for urllib or the network
+    env = dict(os.environ, AVATAR_PROVIDER="local")
+    report("--help", import_times(["--help"], env)[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "reddit.csv")
+        synthetic_feed("reddit", rows).to_csv(csv_path, index=False, encoding="utf-8-sig")
+        times, modules = import_times(["--render", csv_path, "--no-pdf"], env)
+    total = report("--render (no PDF)", times)
+
+    loaded = [name for name in sorted(modules) if name.split(".")[0] in FORBIDDEN]
+    assert not loaded, f"render path imported {', '.join(loaded)}"
+    status = "within" if total <= RENDER_BUDGET_S else "OVER"
+    print(f"render path is {status} its {RENDER_BUDGET_S:.1f} s import budget; openai and playwright not imported")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,44 @@
+"""
+Measures time to first rendered post with and without streaming, against a local fake streaming Responses endpoint.
+Without streaming, the first post only appears once the whole response has arrived and been rendered.
+Run from the repository root: python -m benchmarks.bench_stream_latency [entries]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from openai import OpenAI
+from benchmarks.fake_openai import FakeOpenAI
+from scripts.generate import entries_to_frame, generate_entries, render_output
+from scripts.streaming import stream_to_files
+
+# the benchmark must always reach the fake server, and shouldn't depend on the network for avatars
+os.environ["NO_CACHE"] = "1"
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+def main(entries: int = 20) -> None:
+    # both modes take the same 0.1s per generated entry, streamed or not
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAI(latency=0.3, entries=entries, chunk_delay=0.0,
+                                                          entry_delay=0.1) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test")
+        stem = os.path.join(tmp, "thread")
+
+        # waiting for the whole response, then rendering it
+        start = time.perf_counter()
+        generated = generate_entries(client, "twitter", "Write tweets about a flood.", "Testland", "fake-model")
+        render_output("twitter", entries_to_frame("twitter", generated), stem + ".html", "fake-model", client, pdf=False)
+        blocking = time.perf_counter() - start
+
+        # streaming, with the preview updated per post
+        arrivals = []
+        start = time.perf_counter()
+        stream_to_files(client, "twitter", "Write tweets about a flood.", "Testland", "fake-model", stem, pdf=False,
+                        on_post=lambda count, elapsed: arrivals.append(elapsed))
+        streamed = time.perf_counter() - start
+
+    print(f"without streaming: first post rendered after {blocking:.2f}s (total {blocking:.2f}s)")
+    print(f"with streaming:    first post rendered after {arrivals[0]:.2f}s (total {streamed:.2f}s, {len(arrivals)} posts)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,45 @@
+"""
+Compares CSV with Parquet and Arrow (Feather) for a large generated corpus: file size, full load time, load time of
+two projected columns, and the in-memory size of the loaded DataFrame.
+Run from the repository root: python -m benchmarks.bench_table_formats [rows]
+Needs pyarrow.
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from benchmarks.feeds import synthetic_feed
+from scripts.tables import FORMATS, read_table, write_table
+
+def best_of(runs: int, load) -> float:
+    """
+    Fastest of several loads, so a cold page cache on the first read doesn't skew the comparison.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(rows: int = 300_000) -> None:
+    df = synthetic_feed("reddit", rows)
+    # varying the text a little, as a corpus of identical comments would compress unrealistically well
+    df["Content"] = df["Content"] + [f" #{i % 9973}" for i in range(rows)]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{rows:,} Reddit comments")
+        for fmt, extension in FORMATS.items():
+            path = os.path.join(tmp, "corpus" + extension)
+            start = time.perf_counter()
+            write_table(df, path)
+            written = time.perf_counter() - start
+            loaded = read_table(path)
+            full = best_of(3, lambda: read_table(path))
+            projected = best_of(3, lambda: read_table(path, columns=["Username", "Upvotes"]))
+            print(f"{fmt:<8} {os.path.getsize(path) / 1e6:7.1f} MB on disk   write {written:6.2f}s   load {full:6.3f}s   "
+                  f"load 2 columns {projected:6.3f}s   {loaded.memory_usage(deep=True).sum() / 1e6:7.1f} MB in memory   "
+                  f"Upvotes as {loaded['Upvotes'].dtype}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300_000)
@@ -0,0 +1,48 @@
+"""
+Measures watch mode turnaround: a full first render of a synthetic CSV, then the re-render after a single edited
+post, which only rebuilds that post's HTML. Pass --pdf to include the PDF export on the warm browser, against a
+target of under a second per edit.
+Run from the repository root: python -m benchmarks.bench_watch [rows] [--pdf]
+"""
+# import packages
+import os
+import sys
+import tempfile
+import time
+from benchmarks.feeds import synthetic_feed
+from scripts.browser_pool import shutdown_pool
+from scripts.watch import CsvWatcher
+
+# generating avatars locally so the timings don't depend on DiceBear or the network
+os.environ.setdefault("AVATAR_PROVIDER", "local")
+
+TARGET_S = 1.0
+
+def main(rows: int = 2000, pdf: bool = False) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for platform in ("reddit", "twitter", "facebook"):
+            csv_path = os.path.join(tmp, f"{platform}.csv")
+            df = synthetic_feed(platform, rows)
+            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+            watcher = CsvWatcher(csv_path, platform, pdf=pdf)
+
+            start = time.perf_counter()
+            watcher.render()
+            first = time.perf_counter() - start
+
+            # editing one post in the middle of the feed, as a user would in a spreadsheet
+            text_column = {"reddit": "Content", "twitter": "Content", "facebook": "Text"}[platform]
+            df.loc[rows // 2, text_column] = "Edited: the road has reopened."
+            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+            start = time.perf_counter()
+            result = watcher.render()
+            edit = time.perf_counter() - start
+
+            status = "within" if edit <= TARGET_S else "OVER"
+            print(f"{platform:<9} first render {first:6.2f}s   after one edit {edit:6.2f}s "
+                  f"({result['rendered']} of {result['rows']} posts rebuilt, {status} the {TARGET_S:.0f}s target)")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--pdf"]
+    main(int(args[0]) if args else 2000, "--pdf" in sys.argv)
@@ -0,0 +1,282 @@
+"""
+A local stand-in for the OpenAI Responses API used by the benchmarks.
+It answers image generation requests with a tiny PNG and structured output requests (text.format json_schema) with
+synthetic entries that match the requested schema, either in one response or streamed as server-sent events.
+Latency and 429s can be injected, and requests-per-minute and tokens-per-minute limits enforced like the real API,
+answering requests over the limit with a 429 and the Retry-After of when they would fit.
+Usage:
+    with FakeOpenAI(latency=0.5, fail_every=5) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test")
+"""
+# import packages
+import base64
+import itertools
+import json
+import math
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def tiny_png() -> bytes:
+    """
+    Builds a valid 1x1 grey PNG without any imaging library.
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(b"\x00\x80")) + chunk(b"IEND", b"")
+
+def fake_value(schema: dict, defs: dict, name: str, index: int):
+    """
+    Produces a value matching a (strict, pydantic-generated) JSON schema.
+    """
+    if "$ref" in schema:
+        schema = defs[schema["$ref"].split("/")[-1]]
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: fake_value(sub, defs, key, index) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_value(schema["items"], defs, name, i) for i in range(index)]
+    if kind == "integer":
+        return 100 + index
+    if kind == "number":
+        return 1.5 + index
+    if kind == "boolean":
+        return index % 2 == 0
+    return f"{name} {index}"
+
+class FakeOpenAI:
+    """
+    Threaded HTTP server imitating POST /v1/responses.
+    Parameters:
+        latency (float): Seconds each request takes before it is answered (before the first streamed event).
+        fail_every (int): Answer every n-th request with a 429 (0 disables the injected rate limits).
+        entries (int): Number of entries returned for structured output requests, unless the request input asks for
+            "exactly N" of them.
+        entry_delay (float): Extra seconds per returned entry for structured output, imitating latency that grows
+            with the number of output tokens. Streamed responses spread it evenly over their text deltas.
+        chunk_delay (float): Seconds between streamed text deltas.
+        chunk_size (int): Characters of JSON per streamed text delta.
+        rpm (int): Requests allowed per window (0 for no limit).
+        tpm (int): Tokens (input plus output, four characters each) allowed per window (0 for no limit).
+        window (float): Length of the limit window in seconds, 60 like the real API; shorter for quick benchmarks.
+    """
+
+    def __init__(self, latency: float = 0.5, fail_every: int = 0, entries: int = 5,
+                 chunk_delay: float = 0.01, chunk_size: int = 16, entry_delay: float = 0.0,
+                 rpm: int = 0, tpm: int = 0, window: float = 60.0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.entries = entries
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.entry_delay = entry_delay
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.requests = 0
+        self.rate_limited = 0
+        # [time, tokens] of every request admitted within the current window
+        self._admitted = deque()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def admit(self, body: dict):
+        """
+        Checks a request against the rpm and tpm limits. Returns its usage record ([time, tokens], to add the output
+        tokens to once known), or the seconds until it would fit if it is over a limit.
+        """
+        now = time.monotonic()
+        cost = len(json.dumps(body.get("input", ""))) // 4
+        with self._lock:
+            while self._admitted and self._admitted[0][0] <= now - self.window:
+                self._admitted.popleft()
+            if self.rpm and len(self._admitted) >= self.rpm:
+                return self._admitted[0][0] + self.window - now
+            if self.tpm:
+                used = sum(tokens for _, tokens in self._admitted)
+                # waiting for enough of the oldest requests to leave the window
+                for admitted_at, tokens in self._admitted:
+                    if used + cost <= self.tpm:
+                        break
+                    used -= tokens
+                    wait = admitted_at + self.window - now
+                if used + cost > self.tpm and self._admitted:
+                    return wait
+            record = [now, cost]
+            self._admitted.append(record)
+            return record
+
+    def entry_count(self, body: dict) -> int:
+        """
+        Number of entries to return: the last "exactly N" in the request input, or the configured default.
+        """
+        asked = re.findall(r"exactly (\d+)", json.dumps(body.get("input", "")))
+        return int(asked[-1]) if asked else self.entries
+
+    def structured_text(self, body: dict) -> str:
+        """
+        Builds the JSON text a model would return for the request's json_schema output format.
+        """
+        schema = body["text"]["format"]["schema"]
+        # the index passed down is used as the length of every array, i.e. the number of entries
+        return json.dumps(fake_value(schema, schema.get("$defs", {}), "GenData", self.entry_count(body)))
+
+    def response(self, body: dict, output: list, status: str = "completed") -> dict:
+        """
+        Wraps output items in a Response object.
+        """
+        return {
+            "id": f"resp_{next(self._counter)}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": status,
+            "model": body.get("model", "fake"),
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "output": output,
+            "usage": {
+                "input_tokens": len(json.dumps(body.get("input", ""))) // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": sum(len(json.dumps(item)) for item in output) // 4,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": 0,
+            },
+        }
+
+    @staticmethod
+    def message(text: str, status: str = "completed") -> dict:
+        return {
+            "type": "message",
+            "id": "msg_fake",
+            "status": status,
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}] if text is not None else [],
+        }
+
+    def respond(self, body: dict) -> dict:
+        """
+        Builds the Response object returned for a non-streaming request body.
+        """
+        if body.get("text", {}).get("format", {}).get("type") == "json_schema":
+            time.sleep(self.entry_delay * self.entry_count(body))
+            return self.response(body, [self.message(self.structured_text(body))])
+        return self.response(body, [{
+            "type": "image_generation_call",
+            "id": "ig_fake",
+            "status": "completed",
+            "result": base64.b64encode(tiny_png()).decode(),
+        }])
+
+    def stream_events(self, body: dict):
+        """
+        Yields the server-sent events of a streamed structured output response, text arriving in small deltas.
+        """
+        text = self.structured_text(body)
+        sequence = itertools.count()
+        created = self.response(body, [], status="in_progress")
+        yield {"type": "response.created", "sequence_number": next(sequence), "response": created}
+        yield {"type": "response.output_item.added", "sequence_number": next(sequence), "output_index": 0,
+               "item": self.message(None, status="in_progress")}
+        yield {"type": "response.content_part.added", "sequence_number": next(sequence), "item_id": "msg_fake",
+               "output_index": 0, "content_index": 0, "part": {"type": "output_text", "text": "", "annotations": []}}
+        # the same generation time as a non-streamed response, only delivered as it is produced
+        deltas = range(0, len(text), self.chunk_size)
+        delay = self.chunk_delay + self.entry_delay * self.entry_count(body) / max(1, len(deltas))
+        for start in deltas:
+            time.sleep(delay)
+            yield {"type": "response.output_text.delta", "sequence_number": next(sequence), "item_id": "msg_fake",
+                   "output_index": 0, "content_index": 0, "delta": text[start:start + self.chunk_size], "logprobs": []}
+        yield {"type": "response.output_text.done", "sequence_number": next(sequence), "item_id": "msg_fake",
+               "output_index": 0, "content_index": 0, "text": text, "logprobs": []}
+        completed = dict(created, status="completed", output=[self.message(text)])
+        yield {"type": "response.completed", "sequence_number": next(sequence), "response": completed}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: dict = None) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in server.stream_events(body):
+                    self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    number = server.requests
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    # enforcing the configured limits, telling the client when to come back
+                    admitted = server.admit(body) if server.rpm or server.tpm else None
+                    if isinstance(admitted, float):
+                        with server._lock:
+                            server.rate_limited += 1
+                        self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                                   {"retry-after-ms": str(math.ceil(admitted * 1000)), "retry-after": str(math.ceil(admitted))})
+                        return
+                    # injecting a rate limit error on every n-th request
+                    if server.fail_every and number % server.fail_every == 0:
+                        with server._lock:
+                            server.rate_limited += 1
+                        self._send(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+                        return
+                    time.sleep(server.latency)
+                    if body.get("stream"):
+                        self._stream(body)
+                    else:
+                        response = server.respond(body)
+                        if admitted is not None:
+                            # charging the output tokens to the window as well
+                            with server._lock:
+                                admitted[1] += response["usage"]["output_tokens"]
+                        self._send(200, response)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
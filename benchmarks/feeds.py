@@ -0,0 +1,50 @@
+"""
+Synthetic feeds shaped like the CSVs main.py writes, shared by the benchmarks.
+"""
+# import packages
+import pandas as pd
+
+def synthetic_feed(platform: str, rows: int) -> pd.DataFrame:
+    """
+    Builds a DataFrame with the columns the given platform's generator expects.
+    Platforms: reddit, twitter, instagram, facebook
+    """
+    names = [f"user_{i % 5000}" for i in range(rows)]
+    if platform == "reddit":
+        return pd.DataFrame({
+            "Type": ["top" if i % 10 == 0 else "comment" for i in range(rows)],
+            "Username": names,
+            "Upvotes": [str(i % 500) for i in range(rows)],
+            "Time": ["12 min ago"] * rows,
+            "Content": ["Can't believe this is happening in the middle of town, the queue is insane & nobody knows why."] * rows,
+        })
+    if platform == "twitter":
+        return pd.DataFrame({
+            "Username": names,
+            "Handle": [f"@{name}" for name in names],
+            "Time": ["1 hr ago"] * rows,
+            "Content": ["Traffic at the interchange is at a standstill <again>, anyone know what's up?"] * rows,
+            "Replies": ["12"] * rows,
+            "Retweets": ["34"] * rows,
+            "Likes": ["1.2k"] * rows,
+            "Views": ["5.6k"] * rows,
+        })
+    if platform == "instagram":
+        return pd.DataFrame({
+            "Username": names,
+            "ImagePrompt": ["A sunset over the harbour"] * rows,
+            "FilePath": [f"pictures/{name}.png" for name in names],
+            "Caption": ["Golden hour never gets old 🌅"] * rows,
+            "Likes": [1234 + i for i in range(rows)],
+            "CommentCount": [56] * rows,
+            "Time": ["2h"] * rows,
+        })
+    if platform == "facebook":
+        return pd.DataFrame({
+            "Name": [f"Alex Tan {i % 5000}" for i in range(rows)],
+            "Type": ["Post"] + ["Comment"] * (rows - 1),
+            "Time": ["1h"] * rows,
+            "Text": ["Saw this on the way to work today, stay safe everyone!"] * rows,
+            "Likes": ["42"] * rows,
+        })
+    raise ValueError(f"Unknown platform: {platform}")
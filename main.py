@@ -1,17 +1,10 @@
-from dotenv import load_dotenv
+import argparse
 import sys
 import os
 import re
-import pandas as pd
-from openai import OpenAI
-from pydantic import create_model
-from scripts.reddit_comments import reddit_comment_gen, RedditComment
-from scripts.tweets import tweet_gen, Tweet
-from scripts.instagram import instagram_gen, insta_pic_gen, InstaPost
-from scripts.facebook import Facebook, facebook_gen
 
-# loading .env file
-load_dotenv()
+# heavy dependencies (pandas, openai, playwright) are imported inside the functions that need them,
+# so `--help` and CSV re-renders don't pay for the generation stack
 
 # defining default storage folder for pictures (within the output folder)
 pic_folder = "pictures"
@@ -19,136 +12,234 @@ pic_folder = "pictures"
 # name of model to use
 model_name = "gpt-4.1"
 
-# checking for OpenAI API key and asking user to manually input it if not found
-if not os.getenv("OPENAI_API_KEY"):
-    print("""
+# mapping the menu choices to platforms
+platform_choices = {"1": "reddit", "2": "twitter", "3": "instagram", "4": "facebook"}
+# menu choice generating the scenario for every platform at once
+all_choice = "5"
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options.
+    """
+    parser = argparse.ArgumentParser(description="Generate simulated social media content from user_input.txt.")
+    parser.add_argument("--stream", action="store_true",
+                        help="write each post to the CSV and an HTML preview as soon as it is generated")
+    parser.add_argument("--render", metavar="CSV",
+                        help="skip generation and re-render an existing (e.g. hand-edited) CSV, Parquet or Arrow file")
+    parser.add_argument("--watch", metavar="CSV",
+                        help="re-render a CSV every time it is saved, only rebuilding the posts that changed")
+    parser.add_argument("--platform", choices=sorted(platform_choices.values()),
+                        help="platform of the CSV passed to --render or --watch (detected from its columns if omitted)")
+    parser.add_argument("--no-pdf", action="store_true", help="only write the HTML file when using --render or --watch")
+    parser.add_argument("--count", type=int, metavar="N",
+                        help="generate N posts as several smaller requests in parallel (for very long threads)")
+    parser.add_argument("--chunk-size", type=int, default=25, help="maximum posts per request with --count (default: 25)")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv",
+                        help="file format the generated posts are saved in (default: csv; parquet and feather need pyarrow)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="time every pipeline stage and write a Chrome trace (chrome://tracing, Perfetto) to FILE")
+    parser.add_argument("--profile", action="store_true",
+                        help="with --trace, also write cProfile stats for each renderer next to the trace file")
+    args = parser.parse_args(argv)
+    if args.count is not None and args.stream:
+        parser.error("--count can't be combined with --stream")
+    if args.format != "csv" and args.stream:
+        parser.error("--stream always writes a CSV, so it can't be combined with --format")
+    return args
+
+def load_settings() -> None:
+    """
+    Loads .env and asks for the API key and country if they are not set.
+    """
+    from dotenv import load_dotenv
+
+    # loading .env file
+    load_dotenv()
+
+    # checking for OpenAI API key and asking user to manually input it if not found
+    if not os.getenv("OPENAI_API_KEY"):
+        print("""
     OPENAI_API_KEY not found. Please enter your OpenAI API key (you can also set it as an environment variable).
     """)
-    os.environ["OPENAI_API_KEY"] = input(">> ").strip()
+        os.environ["OPENAI_API_KEY"] = input(">> ").strip()
 
-# checking for defined country and asking user to manually input it if not found
-if not os.getenv("COUNTRY"):
-    print("""
+    # checking for defined country and asking user to manually input it if not found
+    if not os.getenv("COUNTRY"):
+        print("""
     Please enter the country of origin for your simulated posts (you can also set it as an environment variable).
     """)
-    os.environ["COUNTRY"] = input(">> ").strip()
-
-# passing API key to OpenAI
-client = OpenAI()
-
-# checking if 'input.txt' exists in the current directory
-if not os.path.exists("user_input.txt"):
-    print("[ERROR] input.txt not found in the current directory. Please create it and try again.")
-    sys.exit(1)  # Exit the script with an error code
-
-# reading input txt as user prompt
-with open("user_input.txt", "r", encoding="utf-8") as file:
-    user_prompt = file.read().strip()
-
-# check if file is empty after stripping whitespace
-if not user_prompt:
-    print("[ERROR] No user input detected. Please add a prompt to input.txt and try again.")
-    sys.exit(1)
-
-# inform user if prompt successfully loaded
-print("Prompt successfully loaded.")
-
-# initial instructions to user
-print("""
+        os.environ["COUNTRY"] = input(">> ").strip()
+
+def read_user_prompt() -> str:
+    """
+    Reads the user prompt from user_input.txt, exiting with an error if it is missing or empty.
+    """
+    # checking if 'input.txt' exists in the current directory
+    if not os.path.exists("user_input.txt"):
+        print("[ERROR] input.txt not found in the current directory. Please create it and try again.")
+        sys.exit(1)  # Exit the script with an error code
+
+    # reading input txt as user prompt
+    with open("user_input.txt", "r", encoding="utf-8") as file:
+        user_prompt = file.read().strip()
+
+    # check if file is empty after stripping whitespace
+    if not user_prompt:
+        print("[ERROR] No user input detected. Please add a prompt to input.txt and try again.")
+        sys.exit(1)
+
+    # inform user if prompt successfully loaded
+    print("Prompt successfully loaded.")
+    return user_prompt
+
+def ask_platform() -> str:
+    """
+    Shows the platform menu and returns the chosen platform, or "all" for every platform.
+    """
+    # initial instructions to user
+    print("""
 Social media generator activated.
 Select 1 to generate a Reddit comment thread.
 Select 2 to generate a Twitter/X thread.
 Select 3 to generate Instagram posts.
 Select 4 to generate a Facebook post and comments.
+Select 5 to generate all four platforms at once.
 """)
 
-# limiting user choices
-valid_choices = {'1', '2', '3', '4'}
+    # validating user input and adding an error message if they mess up
+    while True:
+        user_choice = input(">> ").strip()
+        if user_choice in platform_choices:
+            return platform_choices[user_choice]
+        if user_choice == all_choice:
+            return "all"
+        print("Invalid input. Please try again.")
 
-# validating user input and adding an error message if they mess up
-while True:
-    user_choice = input(">> ").strip()
-    if user_choice in valid_choices:
-        user_choice = int(user_choice)
-        break
+def ask_filename() -> str:
+    """
+    Prompts the user for an output filename until a valid one is entered.
+    """
+    print("\nEnter your preferred output filename (without file extensions).\n")
+    while True:
+        filename = input(">> ").strip()
+        # reject empty strings
+        if not filename:
+            print("Filename cannot be empty.")
+            continue
+        # reject windows forbidden characters: \ / : * ? " < > |
+        if re.search(r'[\\/:*?"<>|]', filename):
+            print(r'Filename contains invalid characters: \ / : * ? " < > |')
+            continue
+        # trim and normalize filename
+        return re.sub(r'\s+', '_', filename)  # replace spaces with underscores
+
+def render_csv(csv_path: str, platform: str = None, pdf: bool = True) -> None:
+    """
+    Re-renders an existing CSV (or Parquet/Arrow file) without touching the OpenAI client (Playwright is only loaded
+    if a PDF is exported).
+    """
+    from scripts.generate import PLATFORMS, detect_platform
+    from scripts.tables import read_table, table_columns
+
+    # working out the platform from the header or schema alone, so a file that isn't a feed fails before it is read
+    platform = platform or detect_platform(table_columns(csv_path))
+    df = read_table(csv_path)
+    PLATFORMS[platform]["render"](df, os.path.splitext(csv_path)[0] + ".html", pdf=pdf)
+
+def watch_csv(csv_path: str, platform: str = None, pdf: bool = True) -> None:
+    """
+    Re-renders a CSV whenever it is saved until interrupted with Ctrl+C.
+    """
+    from dotenv import load_dotenv
+    from scripts.watch import CsvWatcher
+
+    # the API key is only needed if an edited Instagram ImagePrompt has to be regenerated
+    load_dotenv()
+    watcher = CsvWatcher(csv_path, platform, pdf=pdf, model_name=model_name)
+    print(f"Watching {csv_path} for changes (Ctrl+C to stop).")
+    try:
+        watcher.watch(on_render=lambda result, elapsed: print(
+            f"Rendered {result['rows']} posts ({result['rendered']} changed) in {elapsed:.2f}s"
+        ))
+    except KeyboardInterrupt:
+        pass
+
+def generate(stream: bool = False, count: int = None, chunk_size: int = 25, file_format: str = "csv") -> None:
+    """
+    The interactive flow: read the prompt, pick a platform (or all of them), generate the posts and render them.
+    With count, the posts are generated in parallel chunks of at most chunk_size. The posts are saved in file_format.
+    """
+    load_settings()
+    from scripts.client import get_client
+    from scripts.generate import generate_entries, entries_to_frame, render_output
+
+    # passing API key to OpenAI, on the shared pooled client that image generation also uses
+    client = get_client()
+    user_prompt = read_user_prompt()
+    platform = ask_platform()
+
+    # all platforms: the four generations run at once, and each platform is rendered as soon as its posts arrive
+    if platform == "all":
+        if stream:
+            print("[ERROR] --stream generates a single platform. Choose a platform or run without --stream.")
+            sys.exit(1)
+        from scripts.fanout import fan_out
+        filename = ask_filename()
+        errors = fan_out(
+            client, user_prompt, os.getenv("COUNTRY"), model_name, "output/" + filename, pic_folder=pic_folder,
+            file_format=file_format, count=count, chunk_size=chunk_size,
+            on_platform=lambda name, elapsed, error: print(
+                f"{name} failed: {error}" if error else f"{name} ready ({elapsed:.1f}s)"
+            )
+        )
+        if any(errors.values()):
+            sys.exit(1)
+        return
+
+    # streaming mode: posts are written to the CSV and an HTML preview as they arrive, so the filename is needed first
+    if stream:
+        from scripts.streaming import stream_to_files
+        filename = ask_filename()
+        stream_to_files(
+            client, platform, user_prompt, os.getenv("COUNTRY"), model_name, "output/" + filename, pic_folder,
+            on_post=lambda count, elapsed: print(f"Post {count} ready ({elapsed:.1f}s)")
+        )
+        return
+
+    # creating the LLM result from the platform's system prompt, filling in country name from environmental variable
+    if count:
+        from scripts.chunked import generate_chunked
+        entries = generate_chunked(
+            client, platform, user_prompt, os.getenv("COUNTRY"), model_name, count, chunk_size,
+            on_chunk=lambda done, chunks: print(f"Chunk {done}/{chunks} ready")
+        )
     else:
-        print("Invalid input. Please try again.")
+        entries = generate_entries(client, platform, user_prompt, os.getenv("COUNTRY"), model_name)
+
+    # convert to a dataframe (with picture filepaths for Instagram)
+    df = entries_to_frame(platform, entries, pic_folder, model_name)
+
+    # get output filename from user
+    filename = ask_filename()
+
+    # printing the df for human edits if necessary
+    from scripts.tables import FORMATS, write_table
+    write_table(df, "output/" + filename + FORMATS[file_format])
+
+    # activating generator function
+    render_output(platform, df, "output/" + filename + ".html", model_name, client)
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.trace:
+        from scripts.trace import start_trace
+        start_trace(args.trace, args.profile)
+    if args.render:
+        render_csv(args.render, args.platform, pdf=not args.no_pdf)
+    elif args.watch:
+        watch_csv(args.watch, args.platform, pdf=not args.no_pdf)
+    else:
+        generate(stream=args.stream, count=args.count, chunk_size=args.chunk_size, file_format=args.format)
 
-# importing correct system prompt and generating output Pydantic model based on user choice
-if user_choice == 1:
-    with open("prompts/reddit_prompt.txt", "r", encoding="utf-8") as file:
-        system_prompt = file.read()
-    GenData = create_model("GenData", Entry=(list[RedditComment])) # dynamically generates output Pydantic model
-elif user_choice == 2:
-    with open("prompts/twitter_prompt.txt", "r", encoding="utf-8") as file:
-        system_prompt = file.read()
-    GenData = create_model("GenData", Entry=(list[Tweet]))
-elif user_choice == 3:
-    with open("prompts/instagram_prompt.txt", "r", encoding="utf-8") as file:
-        system_prompt = file.read()
-    GenData = create_model("GenData", Entry=(list[InstaPost]))
-elif user_choice == 4:
-    with open("prompts/facebook_prompt.txt", "r", encoding="utf-8") as file:
-        system_prompt = file.read()
-    GenData = create_model("GenData", Entry=(list[Facebook]))
-
-
-# filling in country name from environmental variable
-system_prompt = system_prompt.format(country=os.getenv("COUNTRY"))
-
-# creating the LLM result
-result = client.responses.parse(
-    model = model_name,
-    input = [
-        {
-            "role": "system",
-            "content": system_prompt,
-        },
-        {"role": "user", "content": user_prompt},
-    ],
-    text_format=GenData
-)
-
-# get parsed output in structured form
-gen_data = result.output_parsed
-
-# convert to a dataframe
-df = pd.DataFrame([e.model_dump() for e in gen_data.Entry])
-
-# FOR INSTAGRAM ONLY, adding an output folder and filepath column to the df
-if user_choice == 3:
-    df["FilePath"] = df["Username"].apply(
-        lambda name: os.path.join(pic_folder, re.sub(r'[^\w-]', '_', name) + ".png")
-    )
-
-# get output filename from user
-print("""
-Enter your preferred output filename (without file extensions).
-""")
-while True:
-    filename = input(">> ").strip()
-    # reject empty strings
-    if not filename:
-        print("Filename cannot be empty.")
-        continue
-    # reject windows forbidden characters: \ / : * ? " < > |
-    if re.search(r'[\\/:*?"<>|]', filename):
-        print(r'Filename contains invalid characters: \ / : * ? " < > |')
-        continue
-    # trim and normalize filename
-    filename = re.sub(r'\s+', '_', filename)  # replace spaces with underscores
-    break  # break when valid filename accepted
-
-# printing the df for human edits if necessary
-df.to_csv("output/" + filename + ".csv", index=False, encoding="utf-8-sig")
-
-# activating generator function
-if user_choice == 1:
-    reddit_comment_gen(df, "output/" + filename + ".html")
-elif user_choice == 2:
-    tweet_gen(df, "output/" + filename + ".html")
-elif user_choice == 3:
-    insta_pic_gen(df, model_name)
-    instagram_gen(df, "output/" + filename + ".html")
-elif user_choice == 4:
-    facebook_gen(df, "output/" + filename + ".html")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
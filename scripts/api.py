@@ -0,0 +1,74 @@
+"""
+Programmatic entry points for embedding the generator in other code, without the interactive prompts of main.py.
+    from scripts.api import generate, make_client, render, render_bytes
+    client = make_client(max_connections=50)
+    posts = generate("twitter", "A flash flood hits the city centre", "Singapore", client=client)
+    render("twitter", posts, "output/flood.html")
+    html, pdf = render_bytes("twitter", posts)
+Calls without a client share one process-wide client (see scripts.client), so connections are reused either way.
+"""
+# import packages
+import os
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+import pandas as pd
+from pydantic import BaseModel
+from scripts.client import get_client, make_client
+from scripts.generate import PLATFORMS, entries_to_frame, generate_entries, render_in_memory, render_output
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+__all__ = ["PLATFORMS", "generate", "get_client", "make_client", "render", "render_bytes"]
+
+def generate(platform: str, prompt: str, country: str, model_name: str = "gpt-4.1", client: Optional["OpenAI"] = None,
+             use_cache: bool = True) -> List[BaseModel]:
+    """
+    Generates posts for a platform and returns them as a list of the platform's Pydantic model.
+    Parameters:
+        platform (str): One of "reddit", "twitter", "instagram" or "facebook".
+        prompt (str): The scenario, as would be written in user_input.txt.
+        country (str): Country of origin for the simulated posts.
+        model_name (str): Model used for generation.
+        client (OpenAI): Client to use, defaults to the shared pooled client.
+        use_cache (bool): Set to False to skip the response cache lookup.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform {platform!r}, expected one of: {', '.join(PLATFORMS)}")
+    return generate_entries(client or get_client(), platform, prompt, country, model_name, use_cache)
+
+def render(platform: str, posts: Union[List[BaseModel], pd.DataFrame], output_path: str, model_name: str = "gpt-4.1",
+           client: Optional["OpenAI"] = None, pic_folder: str = "pictures", use_cache: bool = True,
+           pdf: bool = True) -> pd.DataFrame:
+    """
+    Renders posts (as returned by generate, or a DataFrame read from a CSV) to HTML and optionally PDF, generating
+    Instagram pictures in pic_folder next to the HTML file first. Returns the DataFrame that was rendered.
+    Parameters:
+        output_path (str): Path of the HTML file; the folder is created if needed.
+        model_name (str): Model used for Instagram pictures.
+        client (OpenAI): Client used for Instagram pictures, defaults to the shared pooled client.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform {platform!r}, expected one of: {', '.join(PLATFORMS)}")
+    df = posts if isinstance(posts, pd.DataFrame) else entries_to_frame(platform, posts, pic_folder, model_name)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    render_output(platform, df, output_path, model_name, client, use_cache, pdf)
+    return df
+
+def render_bytes(platform: str, posts: Union[List[BaseModel], pd.DataFrame], pdf: bool = True,
+                 output_path: Optional[str] = None, model_name: str = "gpt-4.1", client: Optional["OpenAI"] = None,
+                 pic_folder: str = "pictures", use_cache: bool = True, pic_dir: str = "output") -> Tuple[str, Optional[bytes]]:
+    """
+    Renders posts in memory and returns (html, pdf bytes or None), without writing the page to disk and loading it back
+    into the browser. The HTML is self-contained, with avatars and pictures inlined. Files are only written when
+    output_path is given.
+    Parameters:
+        output_path (str): Also save the HTML (and PDF) here; the folder is created if needed.
+        pic_folder (str): Folder for Instagram pictures, relative to pic_dir.
+        pic_dir (str): Folder Instagram pictures are generated (and cached) in.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform {platform!r}, expected one of: {', '.join(PLATFORMS)}")
+    df = posts if isinstance(posts, pd.DataFrame) else entries_to_frame(platform, posts, pic_folder, model_name)
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    return render_in_memory(platform, df, pdf, output_path, model_name, client, use_cache, pic_dir)
@@ -0,0 +1,184 @@
+# import packages
+import base64
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+import pandas as pd
+from scripts.render import text_column
+from scripts.trace import stage
+
+# neutral grey silhouette used when an avatar can't be shown, inlined so it never needs the network
+FALLBACK_AVATAR = "data:image/svg+xml;base64," + base64.b64encode(
+    b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 64 64">'
+    b'<rect width="64" height="64" fill="#e1e8ed"/><circle cx="32" cy="24" r="12" fill="#aab8c2"/>'
+    b'<path d="M10 60c2-14 11-20 22-20s20 6 22 20z" fill="#aab8c2"/></svg>'
+).decode()
+
+class AvatarProvider(ABC):
+    """
+    Turns a seed (a username or name) into avatar image data, always producing the same avatar for the same seed.
+    Subclasses implement svg(). Every unique seed is only produced once per call to column(), however many
+    posts the user has.
+    """
+
+    @abstractmethod
+    def svg(self, seed: str) -> bytes:
+        """
+        Produces the SVG avatar for a seed.
+        """
+
+    def svgs(self, seeds: list) -> Dict[str, bytes]:
+        """
+        Produces the SVG for several unique seeds; providers that fetch over the network override this to do it in parallel.
+        """
+        return {seed: self.svg(seed) for seed in seeds}
+
+    def column(self, seeds: pd.Series, output_dir: Optional[str] = None) -> pd.Series:
+        """
+        Returns one image src per row.
+        With output_dir, each unique avatar is written once to output_dir/avatars and referenced by relative path;
+        without it, avatars are inlined as data URIs.
+        """
+        seeds = text_column(seeds)
+        unique = list(seeds.unique())
+        with stage("avatars", provider=type(self).__name__, seeds=len(unique)):
+            images = self.svgs(unique)
+
+        # building one src per unique seed, then mapping it onto every row
+        sources = {}
+        for seed, image in images.items():
+            if output_dir is None:
+                sources[seed] = "data:image/svg+xml;base64," + base64.b64encode(image).decode()
+            else:
+                name = hashlib.sha256(image).hexdigest()[:16] + ".svg"
+                path = Path(output_dir) / "avatars" / name
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(image)
+                sources[seed] = f"avatars/{name}"
+        return seeds.map(sources)
+
+class LocalAvatars(AvatarProvider):
+    """
+    Generates identicon-style avatars (a mirrored 5x5 grid in a colour derived from the seed) entirely offline.
+    """
+
+    def svg(self, seed: str) -> bytes:
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        hue = digest[0] * 360 // 256
+        cells = []
+        # filling the left three columns from the hash and mirroring them onto the right
+        for row in range(5):
+            for col in range(3):
+                if digest[1 + row * 3 + col] % 2:
+                    for x in {col, 4 - col}:
+                        cells.append(f'<rect x="{6 + x * 10}" y="{6 + row * 10}" width="10" height="10"/>')
+        return (
+            '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 62 62">'
+            f'<rect width="62" height="62" fill="hsl({hue}, 45%, 92%)"/>'
+            f'<g fill="hsl({hue}, 55%, 45%)">{"".join(cells)}</g></svg>'
+        ).encode("utf-8")
+
+class DiceBearAvatars(AvatarProvider):
+    """
+    DiceBear avatars, fetched once per seed and kept in a local cache folder, so later renders work offline.
+    Avatars that can't be fetched fall back to locally generated ones, and after a failed fetch no other is tried for
+    offline_retry seconds.
+    Parameters:
+        style (str): DiceBear style, e.g. "notionists-neutral".
+        cache_dir (str): Folder the fetched SVGs are stored in.
+        timeout (float): Seconds to wait for each fetch.
+    """
+
+    base_url = "https://api.dicebear.com/9.x/{style}/svg?seed="
+    # seconds fetching is skipped for after a fetch fails, so an offline render falls back straight away instead of
+    # waiting for a timeout per uncached seed
+    offline_retry = 300.0
+
+    def __init__(self, style: str, cache_dir: Optional[str] = None, timeout: float = 10.0):
+        self.style = style
+        self.url = self.base_url.format(style=style)
+        self.folder = Path(cache_dir or os.path.join(os.getenv("CACHE_DIR", ".cache"), "avatars")) / style
+        self.timeout = timeout
+        self.fallback = LocalAvatars()
+
+    def _path(self, seed: str) -> Path:
+        return self.folder / (hashlib.sha256(seed.encode("utf-8")).hexdigest() + ".svg")
+
+    @property
+    def _offline_marker(self) -> Path:
+        # kept next to the cache rather than in memory, so later runs (e.g. main.py --render) skip fetching too
+        return self.folder.parent / ".offline"
+
+    def _offline(self) -> bool:
+        try:
+            return time.time() - self._offline_marker.stat().st_mtime < self.offline_retry
+        except OSError:
+            return False
+
+    def svg(self, seed: str) -> bytes:
+        # reusing the cached copy when there is one
+        path = self._path(seed)
+        if path.exists():
+            return path.read_bytes()
+        # DiceBear was unreachable a moment ago, so not waiting on it again; the real avatar is fetched once it's back
+        if self._offline():
+            return self.fallback.svg(seed)
+        # importing urllib's HTTP stack only when an avatar actually has to be fetched
+        import urllib.request
+        try:
+            with urllib.request.urlopen(self.url + quote(seed, safe=""), timeout=self.timeout) as response:
+                image = response.read()
+        except OSError:
+            try:
+                self._offline_marker.parent.mkdir(parents=True, exist_ok=True)
+                self._offline_marker.touch()
+            except OSError:
+                pass
+            return self.fallback.svg(seed)
+        # writing to a temporary name first so a parallel render never reads half a file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(image)
+        os.replace(tmp_path, path)
+        return image
+
+    def svgs(self, seeds: list) -> Dict[str, bytes]:
+        # fetching uncached seeds in parallel so render latency doesn't scale with the number of commenters
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return dict(zip(seeds, executor.map(self.svg, seeds)))
+
+class RemoteAvatars(AvatarProvider):
+    """
+    Points avatars straight at DiceBear's URLs, leaving the browser to fetch them at render time (the old behaviour).
+    """
+
+    def __init__(self, style: str):
+        self.url = DiceBearAvatars.base_url.format(style=style)
+        self.style = style
+
+    def svg(self, seed: str) -> bytes:
+        # the image behind a seed's URL, for callers that need the SVG itself rather than a link to it
+        return DiceBearAvatars(self.style).svg(seed)
+
+    def column(self, seeds: pd.Series, output_dir: Optional[str] = None) -> pd.Series:
+        return self.url + text_column(seeds).map(lambda seed: quote(seed, safe=""))
+
+def get_avatar_provider(style: str) -> AvatarProvider:
+    """
+    Returns the avatar provider selected through the AVATAR_PROVIDER environment variable:
+    "cached" (default) fetches DiceBear avatars once and reuses them offline, "local" never touches the network,
+    and "remote" links to DiceBear directly.
+    """
+    provider = os.getenv("AVATAR_PROVIDER", "cached").strip().lower()
+    if provider == "local":
+        return LocalAvatars()
+    if provider == "remote":
+        return RemoteAvatars(style)
+    return DiceBearAvatars(style)
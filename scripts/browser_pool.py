@@ -0,0 +1,361 @@
+# import packages
+import atexit
+import io
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional
+from scripts.trace import stage
+
+# lazy images below the fold are not loaded by the time the page's load event fires, so before printing they are
+# switched to eager loading and awaited (pages without any return straight away)
+LOAD_LAZY_IMAGES = """() => Promise.all(Array.from(document.querySelectorAll('img[loading="lazy"]'), img => {
+    img.loading = "eager";
+    return img.complete ? null : new Promise(resolve => { img.onload = img.onerror = resolve; });
+}))"""
+
+class BrowserPool:
+    """
+    Keeps one or more Chromium instances warm and renders HTML files (or HTML strings) to PDF on them.
+    Playwright's sync API is bound to the thread that started it, so every browser lives on its own worker thread
+    and all workers pull jobs from a shared queue. At most `size` pages are ever open at once.
+    Parameters:
+        size (int): Number of Chromium instances (and therefore concurrent PDF exports) to keep warm.
+        pdf_format (str): Paper format passed to page.pdf.
+    """
+
+    def __init__(self, size: int = 1, pdf_format: str = "A4"):
+        self.size = max(1, size)
+        self.pdf_format = pdf_format
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _start(self) -> None:
+        """
+        Launches the worker threads on first use (or once every browser has died) and waits until they are up.
+        """
+        # only the first caller launches browsers, everybody else waits for them and reuses them
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool has been shut down.")
+            if self._workers:
+                return
+            launches = []
+            for i in range(self.size):
+                ready = Future()
+                worker = threading.Thread(target=self._worker, args=(ready,), name=f"browser-pool-{i}", daemon=True)
+                worker.start()
+                launches.append((worker, ready))
+            # a worker only counts as started once its browser is up, so a failed launch is retried by the next call
+            errors = []
+            for worker, ready in launches:
+                error = ready.exception()
+                if error is None:
+                    self._workers.append(worker)
+                else:
+                    errors.append(error)
+        # surfacing launch failures (e.g. missing browser binaries) to the caller instead of hanging on the queue
+        if errors and not self._workers:
+            raise errors[0]
+
+    def _retire(self) -> None:
+        """
+        Removes the calling worker from the pool. When it was the last one, every export still queued is failed
+        rather than left waiting for a browser that will never take it.
+        """
+        with self._lock:
+            worker = threading.current_thread()
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if self._workers:
+                return
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job[3].set_running_or_notify_cancel():
+                    job[3].set_exception(RuntimeError("The browser exited before the export could run."))
+
+    def _enqueue(self, job: tuple) -> None:
+        """
+        Queues a job for the workers, relaunching the browsers first if every one of them has died.
+        """
+        while True:
+            self._start()
+            # checking and queueing under the lock, so the job can't land after the last worker has drained the queue
+            with self._lock:
+                if self._workers:
+                    self._jobs.put(job)
+                    return
+
+    def _worker(self, ready: Future) -> None:
+        """
+        Owns a single Chromium instance and serves render jobs until it receives the shutdown sentinel.
+        """
+        try:
+            # importing playwright here so modules that never export a PDF do not pay for it
+            from playwright.sync_api import sync_playwright
+
+            with stage("browser.launch"):
+                p = sync_playwright().start()
+                browser = p.chromium.launch()
+                page = browser.new_page()
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+
+        try:
+            while True:
+                job = self._jobs.get()
+                # None is the shutdown sentinel
+                if job is None:
+                    break
+                html_path, html, pdf_path, future = job
+                # skipping jobs that were cancelled while waiting in the queue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if html is None:
+                        with stage("pdf.render", path=str(html_path)):
+                            page.goto(f"file://{Path(html_path).resolve()}")
+                            page.evaluate(LOAD_LAZY_IMAGES)
+                            page.pdf(path=pdf_path, format=self.pdf_format)
+                        future.set_result(Path(pdf_path))
+                    else:
+                        # loading the page straight from memory; without a path, page.pdf returns the PDF as bytes
+                        with stage("pdf.render", bytes=len(html)):
+                            page.set_content(html, wait_until="load")
+                            page.evaluate(LOAD_LAZY_IMAGES)
+                            data = page.pdf(path=pdf_path, format=self.pdf_format)
+                        future.set_result(Path(pdf_path) if pdf_path else data)
+                except Exception as e:
+                    future.set_exception(e)
+                    # replacing the page in case the failure left it in a bad state (if the browser itself is gone,
+                    # this raises and the worker retires)
+                    try:
+                        page.close()
+                    except Exception:
+                        pass
+                    page = browser.new_page()
+        finally:
+            self._retire()
+            try:
+                browser.close()
+                p.stop()
+            except Exception:
+                pass
+
+    def warm(self) -> None:
+        """
+        Launches the browsers now rather than on the first export.
+        """
+        self._start()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of exports waiting for a free browser.
+        """
+        return self._jobs.qsize()
+
+    def submit(self, html_path, pdf_path=None) -> Future:
+        """
+        Queues an HTML file for PDF export and returns a Future resolving to the PDF path.
+        The PDF is written next to the HTML file unless pdf_path is given.
+        """
+        if pdf_path is None:
+            pdf_path = Path(html_path).with_suffix(".pdf")
+        future = Future()
+        self._enqueue((html_path, None, pdf_path, future))
+        return future
+
+    def submit_html(self, html: str, pdf_path=None) -> Future:
+        """
+        Queues an HTML string for PDF export, without writing it to disk first. The Future resolves to the PDF as
+        bytes, or to pdf_path once written if one is given. The page has no folder to resolve relative links against,
+        so images must be inlined (see scripts.render.inline_images) or absolute URLs.
+        """
+        future = Future()
+        self._enqueue((None, html, pdf_path, future))
+        return future
+
+    def render_pdf(self, html_path, pdf_path=None) -> Path:
+        """
+        Exports an HTML file to PDF and blocks until it is written.
+        """
+        return self.submit(html_path, pdf_path).result()
+
+    def render_pdf_bytes(self, html: str) -> bytes:
+        """
+        Exports an HTML string to PDF and blocks until the PDF bytes are ready.
+        """
+        return self.submit_html(html).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Closes every browser once the jobs already queued have finished.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        # one sentinel per worker so each of them exits its loop
+        for _ in workers:
+            self._jobs.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+# shared pool used by all generators, created on first use
+_default_pool: Optional[BrowserPool] = None
+_default_lock = threading.Lock()
+
+def get_pool() -> BrowserPool:
+    """
+    Returns the process-wide browser pool, creating it on first use.
+    The pool size can be set through the BROWSER_POOL_SIZE environment variable (defaults to 1).
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool(size=int(os.getenv("BROWSER_POOL_SIZE", "1")))
+            # closing the browsers cleanly when the interpreter exits
+            atexit.register(shutdown_pool)
+        return _default_pool
+
+def shutdown_pool() -> None:
+    """
+    Shuts down the process-wide browser pool if one was started.
+    """
+    global _default_pool
+    with _default_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def export_pdf(html_path, pdf_path=None) -> Path:
+    """
+    Renders an HTML file to PDF on the shared browser pool.
+    """
+    return get_pool().render_pdf(html_path, pdf_path)
+
+def shards(slots: dict, shard_slot: str, shard_size: int) -> Iterator[dict]:
+    """
+    Splits a feed's slots into consecutive shards of shard_size posts; slots other than shard_slot only go in the first.
+    """
+    fragments = iter(slots[shard_slot])
+    first = True
+    while True:
+        chunk = list(islice(fragments, shard_size))
+        if not chunk and not first:
+            break
+        yield {name: chunk if name == shard_slot else (slot if first else []) for name, slot in slots.items()}
+        first = False
+        if len(chunk) < shard_size:
+            break
+
+def export_feed_pdf(template, output_path, rows: int, shard_slot: str, shard_size: Optional[int] = None,
+                    pool: Optional[BrowserPool] = None, **slots) -> Path:
+    """
+    Exports a rendered feed to PDF. Long feeds are split into shards of shard_size posts that are rendered in
+    parallel across the pool's browsers and merged in order; shorter feeds use a single page.pdf call on the HTML file.
+    Parameters:
+        template (FeedTemplate): The page template the feed was rendered with.
+        output_path (str): Path of the HTML file; the PDF is written next to it.
+        rows (int): Number of posts in the feed.
+        shard_slot (str): Name of the template slot holding the posts, which is the one split into shards.
+        shard_size (int): Posts per shard. Defaults to the PDF_SHARD_SIZE environment variable; 0 disables sharding.
+        pool (BrowserPool): Pool to render on, defaults to the shared pool.
+        **slots: Fresh fragment iterables for every template slot. Slots other than shard_slot only go in the first shard.
+    """
+    if shard_size is None:
+        shard_size = int(os.getenv("PDF_SHARD_SIZE", "0"))
+    pool = pool or get_pool()
+    output_path = Path(output_path)
+    if not shard_size or rows <= shard_size:
+        return pool.render_pdf(output_path)
+
+    # merging needs pypdf, which only this export mode uses
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ImportError("Sharded PDF export requires pypdf (pip install pypdf).")
+
+    # writing each shard as a standalone page next to the output, so relative image paths still resolve
+    parts = []
+    for shard_slots in shards(slots, shard_slot, shard_size):
+        html_path = output_path.with_name(f".{output_path.stem}.part{len(parts)}.html")
+        template.render_to_file(html_path, **shard_slots)
+        # queueing straight away so browsers start rendering while later shards are still being written
+        parts.append((html_path, pool.submit(html_path)))
+
+    # merging the shard PDFs in feed order, then cleaning up
+    pdf_path = output_path.with_suffix(".pdf")
+    writer = PdfWriter()
+    try:
+        for html_path, future in parts:
+            writer.append(str(future.result()))
+        with stage("pdf.merge", shards=len(parts)), open(pdf_path, "wb") as f:
+            writer.write(f)
+    finally:
+        for html_path, future in parts:
+            # waiting for any shard still rendering before deleting its files
+            try:
+                future.result()
+            except Exception:
+                pass
+            for path in (html_path, html_path.with_suffix(".pdf")):
+                if path.exists():
+                    path.unlink()
+    return pdf_path
+
+def render_feed_pdf(template, rows: int, shard_slot: str, shard_size: Optional[int] = None,
+                    pool: Optional[BrowserPool] = None, html: Optional[str] = None, **slots) -> bytes:
+    """
+    Renders a feed to PDF bytes entirely in memory: pages are loaded into the browsers from strings and the PDF is
+    returned rather than written, so neither the HTML nor the PDF touch the disk. Long feeds are sharded and merged
+    as in export_feed_pdf. Images must be inlined, as there is no folder to resolve relative paths against.
+    Parameters:
+        template (FeedTemplate): The page template.
+        rows (int): Number of posts in the feed.
+        shard_slot (str): Name of the template slot holding the posts, which is the one split into shards.
+        shard_size (int): Posts per shard. Defaults to the PDF_SHARD_SIZE environment variable; 0 disables sharding.
+        pool (BrowserPool): Pool to render on, defaults to the shared pool.
+        html (str): The whole page if it was already rendered, used as is when the feed fits in a single shard.
+        **slots: Fragment lists for every template slot.
+    """
+    if shard_size is None:
+        shard_size = int(os.getenv("PDF_SHARD_SIZE", "0"))
+    pool = pool or get_pool()
+    if not shard_size or rows <= shard_size:
+        return pool.render_pdf_bytes(html if html is not None else template.render_to_string(**slots))
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ImportError("Sharded PDF export requires pypdf (pip install pypdf).")
+
+    # queueing every shard as soon as it is rendered, then merging the results in feed order
+    futures = [pool.submit_html(template.render_to_string(**shard_slots))
+               for shard_slots in shards(slots, shard_slot, shard_size)]
+    writer = PdfWriter()
+    for future in futures:
+        writer.append(io.BytesIO(future.result()))
+    out = io.BytesIO()
+    with stage("pdf.merge", shards=len(futures)):
+        writer.write(out)
+    return out.getvalue()
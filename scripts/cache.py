@@ -0,0 +1,123 @@
+# import packages
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+class ResponseCache:
+    """
+    Content-addressed, on-disk cache for model results (parsed structured outputs and generated images).
+    Entries are JSON files named after a hash of everything that determines the result. Reading an entry refreshes
+    its modification time, which is used to evict the least recently used entries once the cache outgrows max_bytes.
+    Parameters:
+        folder (str): Directory holding the cache entries.
+        max_bytes (int): Size the cache is trimmed back to after a write.
+        ttl (float): Seconds after which an entry is considered stale and regenerated.
+    """
+
+    def __init__(self, folder: str = ".cache", max_bytes: int = 500 * 1024 * 1024, ttl: float = 30 * 24 * 3600):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """
+        Hashes any JSON-serialisable parts into a cache key.
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value for key, or None if it is missing or older than the TTL.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # treating stale entries as misses, they are overwritten by the next put
+        if time.time() - entry["created"] > self.ttl:
+            return None
+        # marking the entry as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serialisable value under key, then evicts old entries if the cache is over its size limit.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created": time.time(), "value": value}).encode("utf-8")
+
+        # writing to a temporary file first so concurrent readers never see half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.folder.glob("*/*.json"))
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Deletes least recently used entries until the cache is back under max_bytes. Called with the lock held.
+        """
+        entries = []
+        for p in self.folder.glob("*/*.json"):
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if self._size <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                self._size -= size
+            except OSError:
+                pass
+
+# shared cache used by the generators, created on first use
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+def get_cache() -> Optional[ResponseCache]:
+    """
+    Returns the process-wide response cache, or None when caching is switched off with NO_CACHE=1.
+    Configured through the environment: CACHE_DIR (default .cache), CACHE_MAX_MB (default 500)
+    and CACHE_TTL_DAYS (default 30).
+    """
+    global _default_cache
+    if os.getenv("NO_CACHE", "").strip().lower() in ("1", "true", "yes"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                folder=os.getenv("CACHE_DIR", ".cache"),
+                max_bytes=int(float(os.getenv("CACHE_MAX_MB", "500")) * 1024 * 1024),
+                ttl=float(os.getenv("CACHE_TTL_DAYS", "30")) * 24 * 3600,
+            )
+        return _default_cache
@@ -0,0 +1,207 @@
+# import packages
+import math
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import TYPE_CHECKING, Callable, List, Optional
+from pydantic import BaseModel
+from scripts.cache import ResponseCache, get_cache
+from scripts.generate import PLATFORMS, generate_entries
+from scripts.ratelimit import DEFAULT_OUTPUT_TOKENS, estimate_tokens, get_limiter
+from scripts.trace import record_usage, stage
+
+# the OpenAI client is passed in by callers, so it is only imported here for type hints
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# the post a thread hangs off, which only the first chunk writes: (field, value) per platform
+LEAD_POSTS = {"reddit": ("Type", "top"), "facebook": ("Type", "Post")}
+# the identifier every chunk is told the lead post has, so chunks generated in parallel can all reply to it:
+# (field, value, how replies refer to it) per platform
+LEAD_IDS = {
+    "reddit": ("ID", "t1", 'Replies to the top post have the ParentID "t1".'),
+    "facebook": ("PostID", "p1", 'Every comment has the PostID "p1".'),
+}
+
+class Outline(BaseModel):
+    Summary: str
+    Parts: list[str]
+
+class ChunkError(Exception):
+    """
+    Raised when a chunk's output doesn't match what was asked for, so that chunk is generated again.
+    """
+
+def plan_chunks(total: int, chunk_size: int) -> List[int]:
+    """
+    Splits total posts into near-equal chunk sizes of at most chunk_size, e.g. 55 in chunks of 25 -> [19, 18, 18].
+    """
+    chunks = max(1, math.ceil(total / chunk_size))
+    return [total // chunks + (1 if i < total % chunks else 0) for i in range(chunks)]
+
+def generate_outline(client: "OpenAI", platform: str, user_prompt: str, chunks: int, model_name: str,
+                     use_cache: bool = True) -> Outline:
+    """
+    Asks the model for a short storyline summary and one beat per chunk, which every chunk is then given so the
+    chunks, although generated in parallel, read as one continuous thread.
+    """
+    instructions = (
+        f"You plan long {platform} threads about a scenario. Write a two or three sentence Summary of how the "
+        f"discussion unfolds, then split it into exactly {chunks} Parts, each one sentence describing what that "
+        "stretch of the thread talks about, in order."
+    )
+    cache = get_cache()
+    key = ResponseCache.key("outline", model_name, instructions, user_prompt, Outline.model_json_schema())
+    if cache is not None and use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return Outline(**cached)
+
+    with stage("llm.outline", platform=platform, model=model_name) as details:
+        result = get_limiter().call(lambda: client.with_options(max_retries=0).responses.parse(
+            model=model_name,
+            input=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": user_prompt},
+            ],
+            text_format=Outline
+        ), estimate_tokens(instructions, user_prompt) + DEFAULT_OUTPUT_TOKENS)
+        record_usage(details, result)
+    outline = result.output_parsed
+    # padding or trimming so there is exactly one beat per chunk
+    outline.Parts = (outline.Parts + [outline.Summary] * chunks)[:chunks]
+    if cache is not None:
+        cache.put(key, outline.model_dump())
+    return outline
+
+def chunk_prompt(platform: str, user_prompt: str, outline: Outline, index: int, sizes: List[int]) -> str:
+    """
+    Builds the user prompt for one chunk: the scenario, the shared storyline, what came before and this chunk's part.
+    """
+    lines = [
+        user_prompt,
+        "",
+        f"This request is part {index + 1} of {len(sizes)} of one long thread of {sum(sizes)} posts.",
+        f"Storyline of the whole thread: {outline.Summary}",
+    ]
+    if index:
+        lines.append("Earlier parts covered: " + " ".join(outline.Parts[:index]))
+    lines.append(f"This part covers: {outline.Parts[index]}")
+    if platform in LEAD_POSTS:
+        field, value = LEAD_POSTS[platform]
+        if index:
+            lines.append(f'The thread has already started, so do not write a new {field} "{value}" entry; only replies.')
+        else:
+            lines.append(f'Start with the single {field} "{value}" entry the rest of the thread responds to.')
+        if platform in LEAD_IDS:
+            id_field, lead_id, replies = LEAD_IDS[platform]
+            lines.append(f'The {field} "{value}" entry has the {id_field} "{lead_id}". ' + replies)
+    lines.append(f"Generate exactly {sizes[index]} entries, ignoring any other number mentioned above.")
+    return "\n".join(lines)
+
+def validate_chunk(platform: str, entries: List[BaseModel], index: int, size: int) -> List[BaseModel]:
+    """
+    Checks a chunk is usable: it has entries, and only the first chunk starts a new thread. Models rarely write
+    exactly the number asked for, so extra entries are trimmed and a chunk a few entries short is kept as it is,
+    rather than regenerating an otherwise valid chunk.
+    """
+    if not entries:
+        raise ChunkError(f"chunk {index + 1} returned no entries")
+    if index and platform in LEAD_POSTS:
+        field, value = LEAD_POSTS[platform]
+        if any(getattr(entry, field) == value for entry in entries):
+            raise ChunkError(f'chunk {index + 1} started a new thread with a {field} "{value}" entry')
+    return entries[:size]
+
+def link_chunks(platform: str, chunks: List[List[BaseModel]]) -> List[BaseModel]:
+    """
+    Merges chunks in thread order, making their identifiers consistent. Every chunk numbers its entries on its own
+    (c1, c2, ...), so Reddit IDs are prefixed with the chunk number and ParentIDs remapped the same way; replies to
+    the top post, or to an entry the chunk couldn't see, are attached to the top post. Facebook comments all get
+    the lead post's PostID, as a chunked thread is a single post.
+    """
+    if platform not in LEAD_IDS:
+        return [entry for chunk in chunks for entry in chunk]
+    id_field, lead_id, _ = LEAD_IDS[platform]
+    field, value = LEAD_POSTS[platform]
+    if id_field == "PostID":
+        return [entry.model_copy(update={"PostID": lead_id}) for chunk in chunks for entry in chunk]
+
+    merged = []
+    for index, chunk in enumerate(chunks):
+        # the first chunk's lead post keeps the ID later chunks were told about, whatever the model called it
+        ids = {entry.ID: (lead_id if not index and getattr(entry, field) == value else f"{index + 1}-{entry.ID}")
+               for entry in chunk}
+        for entry in chunk:
+            new_id = ids[entry.ID]
+            if new_id == lead_id:
+                parent = ""
+            elif entry.ParentID == lead_id or entry.ParentID not in ids:
+                parent = lead_id
+            else:
+                parent = ids[entry.ParentID]
+            merged.append(entry.model_copy(update={"ID": new_id, "ParentID": parent}))
+    return merged
+
+def generate_chunked(client: "OpenAI", platform: str, user_prompt: str, country: str, model_name: str, total: int,
+                     chunk_size: int = 25, max_workers: int = 8, max_attempts: int = 3, use_cache: bool = True,
+                     on_chunk: Optional[Callable[[int, int], None]] = None) -> List[BaseModel]:
+    """
+    Generates a large thread as several smaller requests running in parallel, instead of one call that is slow,
+    runs into output token limits and fails as a whole.
+    An outline call first fixes the storyline, then each chunk is generated with it, validated against the platform's
+    schema, trimmed to its requested size and merged back in order. Only chunks that fail or come back malformed
+    (empty, or a later chunk starting a new thread) are retried, so the thread may end up a few posts short of total.
+    Parameters:
+        total (int): Number of posts to generate.
+        chunk_size (int): Maximum posts per request.
+        max_workers (int): Maximum requests running at the same time.
+        max_attempts (int): Attempts per chunk before giving up on the whole thread.
+        on_chunk (callable): Called with (chunks done, number of chunks) as chunks complete.
+    """
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform {platform!r}, expected one of: {', '.join(PLATFORMS)}")
+    sizes = plan_chunks(total, chunk_size)
+    # a single chunk needs no outline to stay coherent
+    if len(sizes) == 1:
+        prompt = f"{user_prompt}\n\nGenerate exactly {total} entries, ignoring any other number mentioned above."
+        return generate_entries(client, platform, prompt, country, model_name, use_cache)
+    for attempt in range(max_attempts):
+        try:
+            outline = generate_outline(client, platform, user_prompt, len(sizes), model_name, use_cache)
+            break
+        except Exception:
+            if attempt + 1 >= max_attempts:
+                raise
+    prompts = [chunk_prompt(platform, user_prompt, outline, i, sizes) for i in range(len(sizes))]
+
+    def run(index: int, attempt: int) -> List[BaseModel]:
+        # retries skip the cache lookup, as the cached answer may be the one that failed validation
+        with stage("llm.chunk", platform=platform, chunk=index, attempt=attempt):
+            entries = generate_entries(client, platform, prompts[index], country, model_name, use_cache and not attempt)
+        return validate_chunk(platform, entries, index, sizes[index])
+
+    results = [None] * len(sizes)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # running every chunk in a copy of this context, so chunks keep the caller's request priority
+        futures = {executor.submit(copy_context().run, run, i, 0): (i, 0) for i in range(len(sizes))}
+        done_count = 0
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, attempt = futures.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    if attempt + 1 >= max_attempts:
+                        # the queued chunks are pointless once the thread can't be completed
+                        for pending in futures:
+                            pending.cancel()
+                        raise RuntimeError(f"Chunk {index + 1} of {len(sizes)} failed {max_attempts} times: {e}") from e
+                    futures[executor.submit(copy_context().run, run, index, attempt + 1)] = (index, attempt + 1)
+                    continue
+                done_count += 1
+                if on_chunk is not None:
+                    on_chunk(done_count, len(sizes))
+
+    # merging in thread order
+    return link_chunks(platform, results)
@@ -0,0 +1,63 @@
+# import packages
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+# openai and httpx (whose connection limits are passed to the SDK's http client) are only imported once a client is
+# actually built
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+def make_client(api_key: Optional[str] = None, base_url: Optional[str] = None, max_connections: int = 100,
+                max_keepalive_connections: int = 20, keepalive_expiry: float = 60.0, **kwargs) -> "OpenAI":
+    """
+    Builds an OpenAI client on an explicitly sized keep-alive connection pool. Share one client between calls
+    (and threads) so TLS and connection setup are paid once rather than per request.
+    Parameters:
+        api_key (str): API key, defaults to the OPENAI_API_KEY environment variable.
+        base_url (str): API base URL, e.g. a proxy or a local test server.
+        max_connections (int): Maximum number of open connections.
+        max_keepalive_connections (int): Idle connections kept open for reuse.
+        keepalive_expiry (float): Seconds an idle connection is kept before it is closed.
+        **kwargs: Passed on to OpenAI(), e.g. timeout or max_retries.
+    """
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    http_client = DefaultHttpxClient(limits=httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    ))
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, **kwargs)
+
+def make_async_client(api_key: Optional[str] = None, base_url: Optional[str] = None, max_connections: int = 100,
+                      max_keepalive_connections: int = 20, keepalive_expiry: float = 60.0, **kwargs) -> "AsyncOpenAI":
+    """
+    Builds an AsyncOpenAI client on an explicitly sized keep-alive connection pool, for use from asyncio code
+    (see scripts.pipeline). It belongs to the event loop it is first used on. Parameters are those of make_client.
+    """
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    ))
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, **kwargs)
+
+# shared client used whenever a caller doesn't pass one, created on first use
+_default_client: Optional["OpenAI"] = None
+_default_lock = threading.Lock()
+
+def get_client() -> "OpenAI":
+    """
+    Returns the process-wide OpenAI client, creating it on first use.
+    The pool size can be set through the OPENAI_MAX_CONNECTIONS environment variable (defaults to 100).
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = make_client(max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")))
+        return _default_client
@@ -1,31 +1,32 @@
 # import packages
+import bisect
 import pandas as pd
 import os
+import sys
 from pydantic import BaseModel
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+from itertools import groupby, repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# allowing the script to be run directly (python scripts/facebook.py) as well as imported as part of the package
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.browser_pool import export_feed_pdf, get_pool
+from scripts.avatars import get_avatar_provider
+from scripts.render import FeedTemplate, escape_column, text_column
+from scripts.tables import read_table
 
 # defining a facebook post class for use with structured outputs
 class Facebook(BaseModel):
+    PostID: str
     Name: str
     Type: str
     Time: str
     Text: str
     Likes: str
 
-def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html") -> None:
-    """
-    Generates a Facebook-style HTML feed from a DataFrame.
-    Expects columns: [Name, Type, Time, Text, Likes]
-    """
-    # dynamically generating profile images using the DiceBear API - url defined below
-    dicebear_url = "https://api.dicebear.com/9.x/avataaars-neutral/svg?seed="
-
-    # create a new column for ProfileImage using the Name as seed and leveraging on DiceBear's capabilities
-    content["ProfileImage"] = content["Name"].apply(lambda name: f"{dicebear_url}{name}")
-
-    # defining the HTML template and styling
-    html_template = """
+# defining the HTML template and styling, precompiled once into a streamable template
+FACEBOOK_PAGE = FeedTemplate("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -40,14 +41,29 @@ def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html") -> N
           padding: 20px;
         }}
     
-        .post-container {{
+        .post-container, .comment-row {{
           background: #fff;
-          border-radius: 8px;
           padding: 15px;
           max-width: 600px;
-          margin: 20px auto;
+          margin: 0 auto;
           box-shadow: 0 2px 5px rgba(0,0,0,0.1);
         }}
+        /* every post and comment is its own block, so a post's comments continue its card below it */
+        .post-container {{
+          border-radius: 8px 8px 0 0;
+          margin-top: 20px;
+        }}
+        .comment-row {{
+          padding-top: 0;
+          padding-bottom: 0;
+        }}
+        .post-container:not(:has(+ .comment-row)) {{
+          border-radius: 8px;
+        }}
+        .comment-row:not(:has(+ .comment-row)) {{
+          border-radius: 0 0 8px 8px;
+          padding-bottom: 15px;
+        }}
     
         .post-header {{
           display: flex;
@@ -122,9 +138,6 @@ def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html") -> N
           font-size: 0.95em;
         }}
     
-        .comments-section {{
-          margin-top: 10px;
-        }}
     
         .comment {{
           display: flex;
@@ -180,38 +193,26 @@ def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html") -> N
       </style>
     </head>
     <body>
-        <div class="post-container">
-            {post}
-            <div class="reaction-bar">
-                <span class="icon">♡ Like</span>
-                <span class="icon">💬 Comment</span>
-                <span class="icon">🔗 Share</span>
-            </div>
-            <div class="comments-section">
-                {comments}
-            </div>
-        </div>
+        {body}
     </body>
     </html>
-    """
-    # separating the df into post and comments section
-    post_content = content[content['Type'] == 'Post'].iloc[0].to_dict() # extracting as a dict for ease of reference
-    comments_content = content[content['Type'] == 'Comment']
+    """)
 
-    # building post content from dataframe
-    post_html = f"""
+# HTML for a post
+FACEBOOK_POST = """
+    <div class="post-container">
     <div class="post-header">
         <div class ="header-left">
-            <img src={post_content['ProfileImage']} alt="Avatar" class="avatar"/>
+            <img src="{ProfileImage}" alt="Avatar" class="avatar"/>
             <div class="user-info">
-                <span class="user-name">{post_content['Name']}</span>
-                <span class="timestamp">{post_content['Time']}</span>
+                <span class="user-name">{Name}</span>
+                <span class="timestamp">{Time}</span>
             </div>
         </div>
         <div class="post-options">⋯</div>
     </div>
     <div class="post-text">
-        {post_content['Text']}
+        {Text}
     </div>
         
     <!-- 
@@ -219,49 +220,165 @@ def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html") -> N
     <img src="INSERT URL HERE" alt="Post Image" class="post-image"/> 
     -->
         
-    <div class="like-count">♡ {post_content['Likes']} people like this</div>
+    <div class="like-count">♡ {Likes} people like this</div>
+    <div class="reaction-bar">
+        <span class="icon">♡ Like</span>
+        <span class="icon">💬 Comment</span>
+        <span class="icon">🔗 Share</span>
+    </div>
+    </div>
     """
 
-    # instantiates empty string to store comments section
-    comments_html = ""
-
-    # dynamically generates html from the imported dataframe
-    for _, row in comments_content.iterrows():
-        html_block =f"""
+# HTML for a single comment
+FACEBOOK_COMMENT = """
+        <div class="comment-row">
         <div class="comment">
-            <img src="{row['ProfileImage']}" alt="Commenter Avatar" class="comment-avatar"/>
+            <img src="{ProfileImage}" alt="Commenter Avatar" class="comment-avatar"/>
             <div class="comment-body">
-              <div class="comment-author">{row['Name']}</div>
-              <div class="comment-text">{row['Text']}</div>
-              <div class="comment-meta">{row['Time']}</div>
-              <div class="comment-like">♡ {row['Likes']}</div>
+              <div class="comment-author">{Name}</div>
+              <div class="comment-text">{Text}</div>
+              <div class="comment-meta">{Time}</div>
+              <div class="comment-like">♡ {Likes}</div>
             </div>
         </div>
+        </div>
         """
-        comments_html += html_block
 
-    # adding dynamically generated html to the empty string following the template laid out above
-    final_html = html_template.format(post=post_html, comments=comments_html)
+# columns a CSV needs to be rendered; PostID is optional so older single-post CSVs still render
+FACEBOOK_COLUMNS = {"Name", "Type", "Time", "Text", "Likes"}
+
+def arrange_feed(content: pd.DataFrame) -> pd.DataFrame:
+    """
+    Groups a feed into posts, each followed by its comments, in a single pass over the rows.
+    Posts keep the order they first appear in, and comments keep their order within a post. With a PostID column,
+    comments belong to the post sharing their PostID; comments whose post is missing are attached to the post above
+    them (or the first post) with a warning, and further "Post" rows reusing a PostID are left out, also with a warning.
+    Without one, the whole CSV is a single post: the first "Post" row and every comment (with a warning if there are
+    more posts).
+    A Group column numbering the posts is added.
+    """
+    if "Group" in content.columns:
+        return content
+    post_ids = text_column(content["PostID"]).tolist() if "PostID" in content.columns else repeat("")
+
+    # one pass: collecting the post and comment positions of every PostID
+    groups = {}
+    duplicates = 0
+    for position, (kind, post_id) in enumerate(zip(content["Type"].tolist(), post_ids)):
+        group = groups.setdefault(post_id, [None, []])
+        if kind == "Post" and group[0] is None:
+            group[0] = position
+        elif kind == "Post":
+            duplicates += 1
+        elif kind == "Comment":
+            group[1].append(position)
+
+    # comments whose PostID has no post go to the nearest post above them rather than disappearing
+    posts = [group for group in groups.values() if group[0] is not None]
+    orphans = sorted(position for group in groups.values() if group[0] is None for position in group[1])
+    if orphans and posts:
+        starts = sorted((group[0], index) for index, group in enumerate(posts))
+        for position in orphans:
+            above = bisect.bisect_right(starts, (position, len(posts))) - 1
+            posts[starts[max(above, 0)][1]][1].append(position)
+        for group in posts:
+            group[1].sort()
+        print(f"Warning: {len(orphans)} Facebook comments had no matching PostID and were attached to the post above them.")
+    elif orphans:
+        print(f"Warning: {len(orphans)} Facebook comments were left out as the feed has no posts.")
+    if duplicates and "PostID" in content.columns:
+        print(f"Warning: {duplicates} Facebook posts reused the PostID of an earlier post and were left out.")
+    elif duplicates:
+        print(f"Warning: {duplicates} Facebook posts after the first were left out as the feed has no PostID column.")
+
+    order, numbers = [], []
+    for number, (post, comments) in enumerate(posts):
+        order.append(post)
+        order.extend(comments)
+        numbers.extend([number] * (len(comments) + 1))
+    return content.iloc[order].assign(Group=numbers)
+
+def facebook_columns(content: pd.DataFrame, output_dir) -> Dict[str, pd.Series]:
+    """
+    Prepares every template field column-wise, with avatars saved to output_dir/avatars.
+    """
+    # escaping the text
+    columns = {name: escape_column(content[name]) for name in ["Name", "Time", "Text", "Likes"]}
+
+    # profile images are DiceBear avatars seeded by the Name, produced once per user and saved next to the HTML file
+    avatars = get_avatar_provider("avataaars-neutral")
+    columns["ProfileImage"] = escape_column(avatars.column(content["Name"], output_dir))
+    return columns
+
+def _feed_rows(content: pd.DataFrame, columns: Dict[str, pd.Series]) -> Iterator[str]:
+    """
+    Formats every row of an arranged feed with the post or comment template.
+    """
+    names = list(columns)
+    templates = {"Post": FACEBOOK_POST, "Comment": FACEBOOK_COMMENT}
+    for kind, values in zip(content["Type"].tolist(), zip(*(columns[name].tolist() for name in names))):
+        yield templates[kind].format(**dict(zip(names, values)))
+
+def facebook_fragments(content: pd.DataFrame, output_dir) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (template slot, HTML) for every row of an arranged feed (see arrange_feed) in order, for callers that
+    assemble the page themselves.
+    """
+    content = arrange_feed(content)
+    return zip(repeat("body"), _feed_rows(content, facebook_columns(content, output_dir)))
+
+def export_post_pdfs(content: pd.DataFrame, columns: Dict[str, pd.Series], output_path) -> List[Path]:
+    """
+    Exports every post of an arranged feed (with its comments) to its own PDF, <stem>.post<N>.pdf, rendering them
+    in parallel on the browser pool while later posts are still being written.
+    """
+    output_path = Path(output_path)
+    pool = get_pool()
+    jobs = []
+    rows = zip(content["Group"].tolist(), _feed_rows(content, columns))
+    for number, group in groupby(rows, key=lambda row: row[0]):
+        html_path = output_path.with_name(f"{output_path.stem}.post{number + 1}.html")
+        FACEBOOK_PAGE.render_to_file(html_path, body=(fragment for _, fragment in group))
+        jobs.append((html_path, pool.submit(html_path)))
+
+    pdf_paths = []
+    for html_path, future in jobs:
+        pdf_paths.append(future.result())
+        html_path.unlink()
+    return pdf_paths
+
+def facebook_gen(content: pd.DataFrame, output_path: str = "facebook.html", pdf: bool = True,
+                 shard_size: Optional[int] = None, pdf_per_post: bool = False) -> None:
+    """
+    Generates a Facebook-style HTML feed from a DataFrame: every post followed by its comments.
+    Expects columns: [PostID, Name, Type, Time, Text, Likes] (without PostID, the CSV is treated as a single post)
+    Set pdf to False to only write the HTML file, and shard_size to export long feeds to PDF in parallel shards
+    (defaults to the PDF_SHARD_SIZE environment variable). With pdf_per_post, each post is exported to its own PDF
+    (in parallel across the browser pool) instead of one PDF for the whole feed.
+    """
+    # grouping comments under their posts, then preparing every field column-wise
+    content = arrange_feed(content)
+    columns = facebook_columns(content, Path(output_path).parent)
 
-    # writing html file
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    # streaming the page to file one post or comment at a time
+    FACEBOOK_PAGE.render_to_file(output_path, body=_feed_rows(content, columns))
 
-    # write html to pdf
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(f"file://{Path(output_path).resolve()}")
-        page.pdf(path=Path(output_path).with_suffix(".pdf"), format="A4")
-        browser.close()
+    # write html to pdf on the shared, already warm browsers, in parallel shards for long feeds
+    if pdf and pdf_per_post:
+        export_post_pdfs(content, columns, output_path)
+    elif pdf:
+        export_feed_pdf(
+            FACEBOOK_PAGE, output_path, len(content), "body", shard_size,
+            body=_feed_rows(content, columns)
+        )
 
     # completion message
-    print("Facebook post generated.")
+    print("Facebook feed generated.")
 
 # alternative functionality if python file is executed directly
 if __name__ == "__main__":
     # prompting user for input
-    user_path = input("Manual input activated. Enter path to CSV file: ").strip()
+    user_path = input("Manual input activated. Enter path to CSV, Parquet or Arrow file: ").strip()
     # constructing a path to default output directory in case user didn't type full path
     default_path = Path(__file__).resolve().parent.parent / "output" / user_path
     # checking if either file exists
@@ -273,7 +390,7 @@ if __name__ == "__main__":
             file_path = default_path
         # running generator
         try:
-            df = pd.read_csv(file_path)
+            df = read_table(file_path)
             output_path = Path(file_path).with_suffix(".html")
             facebook_gen(df, output_path)
         except Exception as e:
@@ -0,0 +1,77 @@
+"""
+Generating one scenario for every platform at once. The four generations run concurrently, each platform is saved and
+rendered as soon as its posts arrive, and the shared browser is launched while the model is still writing, so the
+whole run takes about as long as the slowest platform rather than the sum of all four.
+"""
+# import packages
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional
+from scripts.browser_pool import get_pool
+from scripts.chunked import generate_chunked
+from scripts.generate import PLATFORMS, entries_to_frame, generate_entries, render_output
+from scripts.tables import FORMATS, write_table
+from scripts.trace import stage
+
+# the OpenAI client is passed in by callers, so it is only imported here for type hints
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+def platform_output(output_stem: str, platform: str) -> str:
+    """
+    Output path (without extension) of one platform's feed, e.g. output/fire -> output/fire_reddit.
+    """
+    return f"{output_stem}_{platform}"
+
+def fan_out(client: "OpenAI", user_prompt: str, country: str, model_name: str, output_stem: str,
+            platforms: Optional[Iterable[str]] = None, pic_folder: str = "pictures", file_format: str = "csv",
+            use_cache: bool = True, pdf: bool = True, count: Optional[int] = None, chunk_size: int = 25,
+            on_platform: Optional[Callable[[str, float, Optional[Exception]], None]] = None) -> Dict[str, Optional[Exception]]:
+    """
+    Generates the same scenario for several platforms concurrently and renders each one through the shared browser.
+    Parameters:
+        client (OpenAI): Client shared by every generation (and the Instagram pictures).
+        user_prompt (str): The scenario, used with each platform's own system prompt.
+        country (str): Country filled into the system prompts.
+        model_name (str): Model used for generation.
+        output_stem (str): Output path without extension; each platform is written to <output_stem>_<platform>.
+        platforms (list): Platforms to generate, defaults to all of them.
+        pic_folder (str): Folder for Instagram pictures, relative to the output folder.
+        file_format (str): Format the posts are saved in ("csv", "parquet" or "feather").
+        use_cache (bool): Set to False to regenerate results even if an identical request is cached.
+        pdf (bool): Export a PDF next to every HTML file.
+        count (int): Generate this many posts per platform in parallel chunks of at most chunk_size.
+        chunk_size (int): Maximum posts per request with count.
+        on_platform (callable): Called with (platform, seconds taken, error or None) as each platform finishes.
+    Returns each platform's error, or None where it succeeded, so one failing platform doesn't lose the others.
+    """
+    platforms = list(platforms or PLATFORMS)
+
+    def run(platform: str) -> float:
+        started = time.perf_counter()
+        with stage("fanout.platform", platform=platform):
+            if count:
+                entries = generate_chunked(client, platform, user_prompt, country, model_name, count, chunk_size,
+                                           use_cache=use_cache)
+            else:
+                entries = generate_entries(client, platform, user_prompt, country, model_name, use_cache)
+            df = entries_to_frame(platform, entries, pic_folder, model_name)
+            stem = platform_output(output_stem, platform)
+            write_table(df, stem + FORMATS[file_format])
+            render_output(platform, df, stem + ".html", model_name, client, use_cache, pdf)
+        return time.perf_counter() - started
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(platforms) + 1) as executor:
+        # launching the browser alongside the LLM calls, so the first finished platform doesn't wait for it
+        if pdf:
+            executor.submit(get_pool().warm)
+        # generations inherit the caller's rate limit priority
+        futures = {executor.submit(copy_context().run, run, platform): platform for platform in platforms}
+        for future in as_completed(futures):
+            platform, error = futures[future], future.exception()
+            results[platform] = error
+            if on_platform is not None:
+                on_platform(platform, 0.0 if error else future.result(), error)
+    return results
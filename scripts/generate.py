@@ -0,0 +1,200 @@
+# import packages
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import pandas as pd
+from pydantic import BaseModel, create_model
+from scripts.browser_pool import render_feed_pdf
+from scripts.cache import ResponseCache, get_cache
+from scripts.ratelimit import DEFAULT_OUTPUT_TOKENS, estimate_tokens, get_limiter
+from scripts.image_store import image_path
+from scripts.images import process_images
+from scripts.render import inline_images, text_column
+from scripts.trace import profiled, record_usage, stage
+from scripts.reddit_comments import REDDIT_COLUMNS, REDDIT_PAGE, arrange_thread, reddit_comment_gen, reddit_fragments, RedditComment
+from scripts.tweets import TWEET_PAGE, tweet_gen, tweet_fragments, Tweet
+from scripts.instagram import INSTAGRAM_PAGE, instagram_gen, instagram_fragments, insta_pic_gen, InstaPost
+from scripts.facebook import FACEBOOK_COLUMNS, FACEBOOK_PAGE, Facebook, arrange_feed, facebook_gen, facebook_fragments
+
+# the OpenAI client is passed in by callers, so it is only imported here for type hints
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# folder holding the system prompts for each platform
+prompt_folder = Path(__file__).resolve().parent.parent / "prompts"
+
+# everything needed to generate and render each platform: system prompt, output model and generator function,
+# plus the page template, per-row fragment function and the slot holding the feed, for incremental renders.
+# "columns" lists the columns a CSV needs when it differs from the model's fields, and "arrange" puts rows in
+# display order before fragments are rendered
+PLATFORMS = {
+    "reddit": {"prompt": "reddit_prompt.txt", "model": RedditComment, "render": reddit_comment_gen,
+               "page": REDDIT_PAGE, "fragments": reddit_fragments, "shard_slot": "body",
+               "columns": REDDIT_COLUMNS, "arrange": arrange_thread},
+    "twitter": {"prompt": "twitter_prompt.txt", "model": Tweet, "render": tweet_gen,
+                "page": TWEET_PAGE, "fragments": tweet_fragments, "shard_slot": "body"},
+    "instagram": {"prompt": "instagram_prompt.txt", "model": InstaPost, "render": instagram_gen,
+                  "page": INSTAGRAM_PAGE, "fragments": instagram_fragments, "shard_slot": "body"},
+    "facebook": {"prompt": "facebook_prompt.txt", "model": Facebook, "render": facebook_gen,
+                 "page": FACEBOOK_PAGE, "fragments": facebook_fragments, "shard_slot": "body",
+                 "columns": FACEBOOK_COLUMNS, "arrange": arrange_feed},
+}
+
+def detect_platform(columns) -> str:
+    """
+    Works out which platform a CSV was generated for from its columns.
+    """
+    columns = set(columns)
+    for platform, spec in PLATFORMS.items():
+        if set(spec.get("columns", spec["model"].model_fields)) <= columns:
+            return platform
+    raise ValueError(f"Could not tell which platform these columns belong to: {', '.join(sorted(columns))}")
+
+def load_system_prompt(platform: str, country: str) -> str:
+    """
+    Reads the platform's system prompt and fills in the country name.
+    """
+    with open(prompt_folder / PLATFORMS[platform]["prompt"], "r", encoding="utf-8") as file:
+        return file.read().format(country=country)
+
+def build_schema(platform: str) -> type:
+    """
+    Dynamically generates the output Pydantic model (a list of the platform's posts) for structured outputs.
+    """
+    return create_model("GenData", Entry=(list[PLATFORMS[platform]["model"]]))
+
+def entries_request(platform: str, user_prompt: str, country: str, model_name: str) -> Tuple[dict, str, int]:
+    """
+    Builds the structured output request generating posts for a platform from a user prompt.
+    Returns (responses.parse keyword arguments, cache key, estimated tokens for the rate limiter).
+    """
+    system_prompt = load_system_prompt(platform, country)
+    GenData = build_schema(platform)
+    request = {
+        "model": model_name,
+        "input": [
+            {
+                "role": "system",
+                "content": system_prompt,
+            },
+            {"role": "user", "content": user_prompt},
+        ],
+        "text_format": GenData,
+    }
+    key = ResponseCache.key("responses.parse", model_name, system_prompt, user_prompt, GenData.model_json_schema())
+    tokens = estimate_tokens(system_prompt, user_prompt, json.dumps(GenData.model_json_schema())) + DEFAULT_OUTPUT_TOKENS
+    return request, key, tokens
+
+def generate_entries(client: "OpenAI", platform: str, user_prompt: str, country: str, model_name: str,
+                     use_cache: bool = True) -> List[BaseModel]:
+    """
+    Generates posts for a platform from a user prompt and returns them as a list of the platform's Pydantic model.
+    Results are cached on disk by model, system prompt, user prompt and output schema; set use_cache to False to
+    skip the lookup and generate fresh posts (the new result still replaces the cached one).
+    """
+    request, key, tokens = entries_request(platform, user_prompt, country, model_name)
+    model = PLATFORMS[platform]["model"]
+
+    # checking the cache for an identical request
+    cache = get_cache()
+    if cache is not None and use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return [model(**entry) for entry in cached]
+
+    # creating the LLM result once the shared rate limiter admits it, with retries left to the limiter
+    with stage("llm.parse", platform=platform, model=model_name) as details:
+        result = get_limiter().call(lambda: client.with_options(max_retries=0).responses.parse(**request), tokens)
+        record_usage(details, result)
+
+    # get parsed output in structured form
+    entries = result.output_parsed.Entry
+    if cache is not None:
+        cache.put(key, [e.model_dump() for e in entries])
+    return entries
+
+def entries_to_frame(platform: str, entries: List[BaseModel], pic_folder: str = "pictures",
+                     model_name: str = "gpt-4.1") -> pd.DataFrame:
+    """
+    Converts generated posts to a DataFrame, adding the image FilePath column for Instagram posts, named after the
+    picture's model_name and ImagePrompt (see scripts.image_store).
+    """
+    with stage("dataframe.build", platform=platform, rows=len(entries)):
+        # convert to a dataframe
+        df = pd.DataFrame([e.model_dump() for e in entries])
+
+        # FOR INSTAGRAM ONLY, adding an output folder and filepath column to the df
+        if platform == "instagram":
+            df["FilePath"] = df["ImagePrompt"].apply(lambda image_prompt: image_path(image_prompt, model_name, pic_folder))
+    return df
+
+def generate_pictures(df: pd.DataFrame, output_dir: str, model_name: str, client: Optional["OpenAI"] = None,
+                      use_cache: bool = True) -> None:
+    """
+    Generates the pictures of Instagram posts into output_dir, creating their folders first.
+    """
+    # blank cells (NaN in a hand-edited CSV) have no picture to generate
+    df = df.assign(FilePath=text_column(df["FilePath"]))
+    for folder in {os.path.dirname(path) for path in df["FilePath"] if path}:
+        os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+    with stage("images", rows=len(df)):
+        insta_pic_gen(df, model_name, client=client, use_cache=use_cache, output_dir=output_dir)
+
+def render_output(platform: str, df: pd.DataFrame, output_path: str, model_name: str, client: Optional["OpenAI"] = None,
+                  use_cache: bool = True, pdf: bool = True) -> None:
+    """
+    Runs the platform's generator on a DataFrame, generating Instagram pictures first where needed.
+    """
+    if platform == "instagram":
+        # the picture paths are relative to the output folder (the folder of the HTML file)
+        generate_pictures(df, os.path.dirname(output_path) or ".", model_name, client, use_cache)
+    with stage("render", platform=platform, rows=len(df), pdf=pdf), profiled(f"render_{platform}"):
+        PLATFORMS[platform]["render"](df, output_path, pdf=pdf)
+
+def render_document(platform: str, df: pd.DataFrame, pic_dir: str = "output") -> Tuple[dict, str]:
+    """
+    Renders a DataFrame to a self-contained HTML string, with avatars and Instagram pictures (which must already
+    exist in pic_dir) inlined as data URIs. Returns the template's slots, filled with fragments, and the whole page.
+    """
+    spec = PLATFORMS[platform]
+    if platform == "instagram":
+        # inlining the downsized pictures rather than the full-size originals
+        file_paths = text_column(df["FilePath"])
+        processed = process_images(file_paths.unique(), pic_dir)
+        display = file_paths.map(lambda path: processed[path][0] if path in processed else path)
+        df = df.assign(FilePath=inline_images(display, pic_dir))
+
+    with stage("render", platform=platform, rows=len(df), in_memory=True), profiled(f"render_{platform}"):
+        # without an output folder, fragments inline their avatars instead of referencing files next to the HTML
+        template = spec["page"]
+        slots = {slot: [] for slot in template.slots}
+        for slot, fragment in spec["fragments"](df, None):
+            if slot is not None:
+                slots[slot].append(fragment)
+        return slots, template.render_to_string(**slots)
+
+def render_in_memory(platform: str, df: pd.DataFrame, pdf: bool = True, output_path: Optional[str] = None,
+                     model_name: str = "gpt-4.1", client: Optional["OpenAI"] = None, use_cache: bool = True,
+                     pic_dir: str = "output") -> Tuple[str, Optional[bytes]]:
+    """
+    Renders a DataFrame to a self-contained HTML string, with avatars and pictures inlined as data URIs, and with pdf,
+    to PDF bytes exported straight from that string. Nothing is written unless output_path is given, in which case
+    the HTML (and PDF) are saved there as well. Returns (html, pdf bytes or None).
+    Instagram pictures are still generated into pic_dir, which their FilePath column is relative to.
+    """
+    if platform == "instagram":
+        generate_pictures(df, pic_dir, model_name, client, use_cache)
+    slots, html = render_document(platform, df, pic_dir)
+    data = None
+    if pdf:
+        template, shard_slot = PLATFORMS[platform]["page"], PLATFORMS[platform]["shard_slot"]
+        data = render_feed_pdf(template, len(slots[shard_slot]), shard_slot, html=html, **slots)
+
+    if output_path is not None:
+        with stage("disk.write", path=output_path):
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(html)
+            if data is not None:
+                Path(output_path).with_suffix(".pdf").write_bytes(data)
+    return html, data
@@ -0,0 +1,113 @@
+# import packages
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+def image_key(model_name: str, image_prompt: str) -> str:
+    """
+    Identifies a picture by everything that determines it: the model and the prompt.
+    """
+    return hashlib.sha256(json.dumps([model_name, image_prompt]).encode("utf-8")).hexdigest()
+
+def image_path(image_prompt: str, model_name: str, pic_folder: str = "pictures") -> str:
+    """
+    Builds the picture filepath (relative to the output folder) for an Instagram post, named after the picture's key,
+    so posts sharing a prompt share one picture and different prompts never collide.
+    """
+    return os.path.join(pic_folder, image_key(model_name, image_prompt)[:24] + ".png")
+
+class ImageStore:
+    """
+    Index of the pictures generated within an output folder, kept in a manifest file (.images.json) next to them.
+    Every picture path is recorded with the key (model and prompt) it was generated from, and every key with a path
+    holding it, so both "is this file up to date?" and "was this picture already generated?" are dictionary lookups
+    rather than generation requests.
+    Files the store did not generate (such as a picture put in by hand) are never overwritten.
+    Parameters:
+        output_dir (str): Folder the picture paths are relative to.
+    """
+
+    MANIFEST = ".images.json"
+
+    def __init__(self, output_dir: str = "output"):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        try:
+            with open(self.output_dir / self.MANIFEST, "r", encoding="utf-8") as f:
+                self._paths = json.load(f)
+        except (OSError, ValueError):
+            self._paths = {}
+        # key -> a path holding that picture
+        self._keys = {entry["key"]: path for path, entry in self._paths.items()}
+
+    def status(self, path: str, key: str) -> str:
+        """
+        Returns "current" if path holds the picture for key, "foreign" if it holds a file the store didn't generate,
+        or "missing" if the picture has to be (re)generated.
+        """
+        with self._lock:
+            entry = self._paths.get(path)
+        if not (self.output_dir / path).is_file():
+            return "missing"
+        if entry is None:
+            return "foreign"
+        return "current" if entry["key"] == key else "missing"
+
+    def find(self, key: str) -> Optional[str]:
+        """
+        Returns a path that already holds the picture for key, or None.
+        """
+        with self._lock:
+            path = self._keys.get(key)
+        return path if path is not None and (self.output_dir / path).is_file() else None
+
+    def record(self, path: str, key: str, model_name: str, image_prompt: str) -> None:
+        """
+        Records that path now holds the picture generated by model_name from image_prompt.
+        """
+        with self._lock:
+            # the picture path held before no longer has that key
+            previous = self._paths.get(path)
+            if previous is not None and self._keys.get(previous["key"]) == path:
+                del self._keys[previous["key"]]
+            self._paths[path] = {"key": key, "model": model_name, "prompt": image_prompt}
+            self._keys[key] = path
+
+    def copy(self, source: str, path: str) -> None:
+        """
+        Copies a stored picture to another path, e.g. for older CSVs naming the same picture twice.
+        """
+        target = self.output_dir / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.output_dir / source, target)
+
+    def save(self) -> None:
+        """
+        Writes the manifest, through a temporary file so a crash never leaves half of it behind.
+        """
+        # holding the lock throughout, so an older snapshot can never replace a newer one
+        with self._lock:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._paths, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.output_dir / self.MANIFEST)
+
+# one store per output folder, shared by every thread generating into it
+_stores: Dict[str, ImageStore] = {}
+_stores_lock = threading.Lock()
+
+def get_store(output_dir: str = "output") -> ImageStore:
+    """
+    Returns the process-wide image store of an output folder, loading its manifest on first use.
+    """
+    folder = os.path.abspath(output_dir)
+    with _stores_lock:
+        if folder not in _stores:
+            _stores[folder] = ImageStore(output_dir)
+        return _stores[folder]
@@ -0,0 +1,121 @@
+"""
+Post-processing of generated Instagram pictures. The model returns full-size PNGs, far larger than the 600px square
+they are shown at, which bloats the HTML and PDF and slows rendering down. Every picture is cropped and downsized to
+the displayed size, re-encoded (WebP by default) and given a thumbnail, in a process pool as this is CPU bound.
+The original PNG is kept, so the derived files can always be rebuilt; they are only redone when the PNG is newer.
+Settings (environment variables): IMAGE_FORMAT ("webp", "jpeg", or "png" to use the originals as they are) and
+IMAGE_QUALITY (1-100, default 80). Needs Pillow (pip install pillow).
+"""
+# import packages
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+from scripts.trace import stage
+
+# size in pixels the feed displays every picture at (a square, see .post-image in the Instagram template)
+DISPLAY_SIZE = 600
+# size of the thumbnail offered to narrow screens through srcset
+THUMBNAIL_SIZE = 150
+
+# file extension and Pillow format name of each output format
+FORMATS = {"webp": (".webp", "WEBP"), "jpeg": (".jpg", "JPEG")}
+
+def image_settings() -> Tuple[Optional[str], int]:
+    """
+    Returns the (format, quality) pictures are re-encoded with, with format None when they are used as generated.
+    """
+    fmt = os.getenv("IMAGE_FORMAT", "webp").lower().replace("jpg", "jpeg")
+    if fmt not in FORMATS and fmt != "png":
+        raise ValueError(f"IMAGE_FORMAT must be one of: webp, jpeg, png (got {fmt!r})")
+    return (fmt if fmt in FORMATS else None), int(os.getenv("IMAGE_QUALITY", "80"))
+
+def derived_paths(path: str, fmt: str) -> Tuple[str, str]:
+    """
+    Paths of the display-size picture and thumbnail made from a picture, e.g. pictures/a.png ->
+    (pictures/a.600.webp, pictures/a.150.webp).
+    """
+    stem, extension = os.path.splitext(path)[0], FORMATS[fmt][0]
+    return f"{stem}.{DISPLAY_SIZE}{extension}", f"{stem}.{THUMBNAIL_SIZE}{extension}"
+
+def _process_one(source: str, display: str, thumbnail: str, fmt: str, quality: int) -> None:
+    """
+    Crops a picture to a square, then writes the display-size picture and thumbnail. Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # JPEG has no alpha channel, and WebP files are smaller without one
+        image = image.convert("RGB")
+        # cropping the centre like the feed's object-fit: cover, then downsizing with a high quality filter
+        square = ImageOps.fit(image, (DISPLAY_SIZE, DISPLAY_SIZE), Image.LANCZOS)
+        options = {"quality": quality, "optimize": True} if fmt == "jpeg" else {"quality": quality, "method": 4}
+        square.save(display, FORMATS[fmt][1], **options)
+        square.resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS).save(thumbnail, FORMATS[fmt][1], **options)
+
+def _try(job: tuple) -> Optional[Exception]:
+    # processing in this process, returning the error rather than raising it like a worker's future would
+    try:
+        _process_one(*job)
+    except Exception as e:
+        return e
+    return None
+
+def _stale(source: str, derived: str) -> bool:
+    # comparing modification times, so a regenerated picture is processed again
+    try:
+        return os.stat(derived).st_mtime_ns < os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+def process_images(paths: Iterable[str], base_dir: str = ".", max_workers: Optional[int] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    Makes the display-size picture and thumbnail of every picture that doesn't have up to date ones yet, several
+    at a time in worker processes.
+    Parameters:
+        paths (list): Picture paths, relative to base_dir.
+        base_dir (str): Folder the paths are relative to.
+        max_workers (int): Worker processes, defaults to the number of CPUs.
+    Returns a mapping of each path to its (display picture, thumbnail) paths, relative to base_dir. Pictures that are
+    missing, fail to process, or with IMAGE_FORMAT=png map to themselves.
+    """
+    fmt, quality = image_settings()
+    paths = {path for path in paths if path}
+    if fmt is None:
+        return {path: (path, path) for path in paths}
+
+    results, jobs = {}, {}
+    for path in paths:
+        source = os.path.join(base_dir, path)
+        if not os.path.isfile(source):
+            results[path] = (path, path)
+            continue
+        display, thumbnail = derived_paths(path, fmt)
+        results[path] = (display, thumbnail)
+        if _stale(source, os.path.join(base_dir, display)) or _stale(source, os.path.join(base_dir, thumbnail)):
+            jobs[path] = (source, os.path.join(base_dir, display), os.path.join(base_dir, thumbnail), fmt, quality)
+    if not jobs:
+        return results
+
+    # Pillow is only needed once there is something to process
+    if importlib.util.find_spec("PIL") is None:
+        raise ImportError("Processing pictures requires Pillow (pip install pillow), or set IMAGE_FORMAT=png.")
+
+    with stage("images.process", images=len(jobs), format=fmt, quality=quality):
+        # a single picture isn't worth starting worker processes for
+        if len(jobs) == 1:
+            outcomes = {path: _try(job) for path, job in jobs.items()}
+        else:
+            workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+            # spawning fresh workers rather than forking, as pictures are processed while other threads (the browser
+            # pool, image downloads) may hold locks a forked child would inherit
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {path: executor.submit(_process_one, *job) for path, job in jobs.items()}
+                outcomes = {path: future.exception() for path, future in futures.items()}
+    # falling back to the original picture wherever processing failed, so the feed still renders
+    for path, error in outcomes.items():
+        if error is not None:
+            print(f"Failed to process image {path}: {error}")
+            results[path] = (path, path)
+    return results
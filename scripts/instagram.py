@@ -1,11 +1,34 @@
 # import packages
+import html
 import pandas as pd
 import os
-from openai import OpenAI
+import sys
 from pydantic import BaseModel
 import base64
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from itertools import repeat
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+
+# allowing the script to be run directly (python scripts/instagram.py) as well as imported as part of the package
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.browser_pool import export_feed_pdf
+from scripts.cache import ResponseCache, get_cache
+from scripts.image_store import get_store, image_key
+from scripts.images import THUMBNAIL_SIZE, DISPLAY_SIZE, process_images
+from scripts.avatars import get_avatar_provider
+from scripts.ratelimit import estimate_tokens, get_limiter, retry_after_seconds
+from scripts.render import FeedTemplate, escape_column, format_counts, render_rows, text_column
+from scripts.tables import read_table
+from scripts.trace import record_usage, stage
+
+# the OpenAI client is only imported when pictures are generated, so rendering from a CSV stays fast to start
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # defining a instagram post class for use with structured outputs
 class InstaPost(BaseModel):
@@ -16,55 +39,8 @@ class InstaPost(BaseModel):
     CommentCount: int
     Time: str
 
-def insta_pic_gen(prompt: pd.DataFrame, model_name: str = "gpt-5") -> None:
-    """
-    Generates a picture from a prompt contained with a DataFrame.
-    Expects columns: [ImagePrompt]
-    """
-    # passing API key to OpenAI
-    client = OpenAI()
-
-    # generating images
-    for _, row in prompt.iterrows():
-
-        # sends image generation request
-        response = client.responses.create(
-            model=model_name,
-            instructions="Ensure that all generated images are 600px by 600px.",
-            input=row["ImagePrompt"],
-            tools=[{"type": "image_generation"}]
-        )
-
-        # saving image data to a variable
-        image_data = [
-            output.result
-            for output in response.output
-            if output.type == "image_generation_call"
-        ]
-
-        # checks for image data existing
-        if image_data:
-            image_base64 = image_data[0]
-            # prepend "output" folder to the filename
-            output_path = os.path.join("output", row['FilePath'])
-            # writes it to a png file based on the filepaths we constructed
-            with open(output_path, "wb") as f:
-                f.write(base64.b64decode(image_base64))
-
-def instagram_gen(content: pd.DataFrame, output_path: str = "instagram_feed.html") -> None:
-    """
-    Generates an Instagram-style HTML feed from a DataFrame.
-    Expects columns: [Username, ImagePrompt, FilePath, Caption, Likes, CommentCount, Time, FilePath]
-    """
-
-    # dynamically generating profile images using the DiceBear API - url defined below
-    dicebear_url = "https://api.dicebear.com/9.x/lorelei-neutral/svg?seed="
-
-    # create a new column for ProfileImage using the Username as seed and leveraging on DiceBear's capabilities
-    content["ProfileImage"] = content["Username"].apply(lambda name: f"{dicebear_url}{name}")
-
-    # defining the HTML template and styling
-    html_template = """
+# defining the HTML template and styling, precompiled once into a streamable template
+INSTAGRAM_PAGE = FeedTemplate("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -145,50 +121,236 @@ def instagram_gen(content: pd.DataFrame, output_path: str = "instagram_feed.html
         </div>
     </body>
     </html>
-    """
+    """)
 
-    # instantiates empty string to build html content
-    body_html = ""
-
-    # dynamically generates html from the imported dataframe
-    for _, row in content.iterrows():
-        post_block = f"""
+# HTML for a single post
+INSTAGRAM_BLOCK = """
         <div class="insta-post">
             <div class="post-header">
                 <div class="user-info">
-                    <img class="profile-pic" src="{row['ProfileImage']}" alt="Profile">
+                    <img class="profile-pic" src="{ProfileImage}" alt="Profile">
                     <div>
-                        <span class="username">{row['Username']}</span>
+                        <span class="username">{Username}</span>
                         <span style="color: #8e8e8e; padding: 0 4px;">•</span>
-                        <span class="timestamp" style="font-size: inherit;">{row['Time']}</span>
+                        <span class="timestamp" style="font-size: inherit;">{Time}</span>
                     </div>
                 </div>
                 <div style="font-weight: bold; font-size: 20px;">⋯</div>
             </div>
-            <img class="post-image" src="{row['FilePath']}" alt="Post image">
+            <img class="post-image" src="{FilePath}"{SrcSet} width="600" height="600" loading="lazy" decoding="async" alt="Post image">
             <div class="post-content">
-                <div class="likes">{row['Likes']:,} likes</div>
-                <div class="caption"><span class="username">{row['Username']}</span> {row['Caption']}</div>
-                <div class="view-comments">View all {row['CommentCount']:,} comments</div>
+                <div class="likes">{Likes} likes</div>
+                <div class="caption"><span class="username">{Username}</span> {Caption}</div>
+                <div class="view-comments">View all {CommentCount} comments</div>
             </div>
         </div>
         """
-        body_html += post_block
 
-        # adding dynamically generated html to the empty string following the template laid out above
-        final_html = html_template.format(body=body_html)
+# instructions sent with every image generation request
+image_instructions = "Ensure that all generated images are 600px by 600px."
 
-        # writing html file
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final_html)
+def _generate_image(client: "OpenAI", model_name: str, image_prompt: str, output_path: str,
+                    max_retries: int, backoff: float, use_cache: bool = True) -> bool:
+    """
+    Generates a single picture and writes it to output_path once the shared image rate limiter admits it. Rate limited
+    requests pause the limiter for the API's Retry-After (or an exponential backoff) and are retried, as are timeouts.
+    Pictures are looked up in the response cache first, so an unchanged ImagePrompt is never generated twice.
+    Returns whether a picture was written.
+    """
+    from openai import APITimeoutError, RateLimitError
+
+    # checking the cache for an identical request
+    cache = get_cache()
+    key = ResponseCache.key("image_generation", model_name, image_instructions, image_prompt)
+    image_base64 = cache.get(key) if cache is not None and use_cache else None
 
-    # write html to pdf
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(f"file://{Path(output_path).resolve()}")
-        page.pdf(path=Path(output_path).with_suffix(".pdf"), format="A4")
-        browser.close()
+    if image_base64 is None:
+        limiter = get_limiter("image")
+        with stage("image.generate", path=output_path, model=model_name) as details:
+            for attempt in range(max_retries + 1):
+                details["attempts"] = attempt + 1
+                limiter.acquire(estimate_tokens(image_instructions, image_prompt))
+                try:
+                    # sends image generation request
+                    response = client.responses.create(
+                        model=model_name,
+                        instructions=image_instructions,
+                        input=image_prompt,
+                        tools=[{"type": "image_generation"}]
+                    )
+                    break
+                except RateLimitError as e:
+                    if attempt == max_retries:
+                        raise
+                    # holding back every image request, not just this one, for as long as the API asked
+                    limiter.retry_after(retry_after_seconds(e.response, attempt, backoff))
+                except APITimeoutError:
+                    # giving up once retries are exhausted
+                    if attempt == max_retries:
+                        raise
+                    # waiting a little longer after every failed attempt, with jitter so workers don't retry in lockstep
+                    time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+            record_usage(details, response)
+
+        # saving image data to a variable
+        image_data = [
+            output.result
+            for output in response.output
+            if output.type == "image_generation_call"
+        ]
+
+        # checks for image data existing
+        if not image_data:
+            return False
+        image_base64 = image_data[0]
+        if cache is not None:
+            cache.put(key, image_base64)
+
+    # writes it to a png file based on the filepaths we constructed
+    with stage("disk.write", path=output_path), open(output_path, "wb") as f:
+        f.write(base64.b64decode(image_base64))
+    return True
+
+def insta_pic_gen(prompt: pd.DataFrame, model_name: str = "gpt-5", max_in_flight: int = 4, timeout: float = 180.0,
+                  max_retries: int = 5, backoff: float = 1.0, client: Optional["OpenAI"] = None,
+                  use_cache: bool = True, output_dir: str = "output") -> None:
+    """
+    Generates pictures from the prompts contained within a DataFrame, several at a time.
+    Each image is written to disk as soon as it completes. Pictures are tracked in the output folder's image store
+    (see scripts.image_store): every distinct prompt is generated once, however many rows use it, files already
+    holding their row's picture are skipped, and files the store didn't generate (your own pictures) are kept.
+    Expects columns: [ImagePrompt, FilePath]
+    Parameters:
+        prompt (pd.DataFrame): DataFrame with an image prompt and output path per row.
+        model_name (str): Model used to generate the images.
+        max_in_flight (int): Maximum number of image requests running at the same time.
+        timeout (float): Per-request timeout in seconds.
+        max_retries (int): Number of retries for a request that was rate limited or timed out.
+        backoff (float): Base delay in seconds for the exponential backoff between retries.
+        client (OpenAI): Optional client to use, e.g. one pointed at a different base_url. Defaults to the shared
+            client from scripts.client, so repeated calls reuse its connections.
+        use_cache (bool): Set to False to regenerate images even if an identical prompt is cached.
+        output_dir (str): Folder the FilePath column is relative to.
+    """
+    # grouping the paths still needing a picture by the picture's key, so each picture is generated once
+    store = get_store(output_dir)
+    wanted = {}
+    for image_prompt, file_path in zip(prompt["ImagePrompt"].tolist(), prompt["FilePath"].tolist()):
+        key = image_key(model_name, image_prompt)
+        status = store.status(file_path, key) if file_path else "foreign"
+        # without the cache, pictures are regenerated even when up to date, but your own are still kept
+        if status == "foreign" or (status == "current" and use_cache):
+            continue
+        paths = wanted.setdefault(key, (image_prompt, []))[1]
+        if file_path not in paths:
+            paths.append(file_path)
+
+    def place(key: str, image_prompt: str, paths: list, source: str) -> None:
+        # copying a picture already in the store to every other path that shows it
+        for file_path in paths:
+            if file_path != source:
+                store.copy(source, file_path)
+            store.record(file_path, key, model_name, image_prompt)
+
+    # saving the store even if generation is interrupted or fails, so finished pictures are not generated again
+    try:
+        # pictures already generated for another path (e.g. by an earlier feed in the same folder) are only copied
+        for key in list(wanted):
+            source = store.find(key) if use_cache else None
+            if source is not None:
+                place(key, *wanted.pop(key), source)
+
+        # generating the rest concurrently, bounded by max_in_flight
+        if wanted:
+            # reusing the shared client (and its connection pool) rather than building a new one per call
+            if client is None:
+                from scripts.client import get_client
+                client = get_client()
+            # applying the per-request timeout and switching off the client's own retries, which _generate_image
+            # handles
+            client = client.with_options(timeout=timeout, max_retries=0)
+            with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+                futures = {
+                    # in a copy of this context, so pictures keep the caller's request priority
+                    executor.submit(
+                        copy_context().run, _generate_image, client, model_name, image_prompt,
+                        # prepend the output folder to the filename
+                        os.path.join(output_dir, paths[0]), max_retries, backoff, use_cache
+                    ): key
+                    for key, (image_prompt, paths) in wanted.items()
+                }
+                # reporting failures per image so one bad prompt doesn't lose the rest of the feed
+                for future in as_completed(futures):
+                    key = futures[future]
+                    image_prompt, paths = wanted[key]
+                    try:
+                        if future.result():
+                            place(key, image_prompt, paths, paths[0])
+                    except Exception as e:
+                        print(f"Failed to generate image {paths[0]}: {e}")
+    finally:
+        store.save()
+
+def picture_columns(paths: pd.Series, output_dir) -> Tuple[pd.Series, pd.Series]:
+    """
+    Returns the escaped src of every picture, pointing at its display-size version, and a srcset attribute offering
+    the thumbnail to narrow screens.
+    """
+    if output_dir is None:
+        return escape_column(paths), pd.Series("", index=paths.index)
+    paths = text_column(paths)
+    processed = process_images(paths.unique(), str(output_dir))
+    display = paths.map(lambda path: processed[path][0] if path else path)
+    srcset = {
+        path: f' srcset="{html.escape(thumbnail)} {THUMBNAIL_SIZE}w, {html.escape(full)} {DISPLAY_SIZE}w" '
+              f'sizes="(max-width: {DISPLAY_SIZE}px) 100vw, {DISPLAY_SIZE}px"' if thumbnail != full else ""
+        for path, (full, thumbnail) in processed.items()
+    }
+    return escape_column(display), paths.map(lambda path: srcset.get(path, ""))
+
+def instagram_columns(content: pd.DataFrame, output_dir) -> Dict[str, pd.Series]:
+    """
+    Prepares every template field column-wise, with avatars saved to output_dir/avatars and pictures downsized
+    (see scripts.images) next to the originals. Without output_dir, FilePath is used as it is (e.g. data URIs).
+    """
+    # escaping the text and formatting counts
+    columns = {name: escape_column(content[name]) for name in ["Username", "Time", "Caption"]}
+    columns["FilePath"], columns["SrcSet"] = picture_columns(content["FilePath"], output_dir)
+    columns["Likes"] = escape_column(format_counts(content["Likes"]))
+    columns["CommentCount"] = escape_column(format_counts(content["CommentCount"]))
+
+    # profile images are DiceBear avatars seeded by the Username, produced once per user and saved next to the HTML file
+    avatars = get_avatar_provider("lorelei-neutral")
+    columns["ProfileImage"] = escape_column(avatars.column(content["Username"], output_dir))
+    return columns
+
+def instagram_fragments(content: pd.DataFrame, output_dir) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (template slot, HTML) for every row in order, for callers that assemble the page themselves.
+    """
+    return zip(repeat("body"), render_rows(INSTAGRAM_BLOCK, instagram_columns(content, output_dir)))
+
+def instagram_gen(content: pd.DataFrame, output_path: str = "instagram_feed.html", pdf: bool = True,
+                  shard_size: Optional[int] = None) -> None:
+    """
+    Generates an Instagram-style HTML feed from a DataFrame.
+    Expects columns: [Username, ImagePrompt, FilePath, Caption, Likes, CommentCount, Time, FilePath]
+    Set pdf to False to only write the HTML file, and shard_size to export long feeds to PDF in parallel shards
+    (defaults to the PDF_SHARD_SIZE environment variable).
+    """
+
+    # preparing every field column-wise
+    columns = instagram_columns(content, Path(output_path).parent)
+
+    # streaming the page to file one post at a time
+    INSTAGRAM_PAGE.render_to_file(output_path, body=render_rows(INSTAGRAM_BLOCK, columns))
+
+    # write html to pdf on the shared, already warm browsers, in parallel shards for long feeds
+    if pdf:
+        export_feed_pdf(
+            INSTAGRAM_PAGE, output_path, len(content), "body", shard_size,
+            body=render_rows(INSTAGRAM_BLOCK, columns)
+        )
 
     # completion message
     print("Instagram post generated.")
@@ -196,7 +358,7 @@ def instagram_gen(content: pd.DataFrame, output_path: str = "instagram_feed.html
 # alternative functionality if python file is executed directly
 if __name__ == "__main__":
     # prompting user for input
-    user_path = input("Manual input activated. Enter path to CSV file: ").strip()
+    user_path = input("Manual input activated. Enter path to CSV, Parquet or Arrow file: ").strip()
     # constructing a path to default output directory in case user didn't type full path
     default_path = Path(__file__).resolve().parent.parent / "output" / user_path
     # checking if either file exists
@@ -208,7 +370,7 @@ if __name__ == "__main__":
             file_path = default_path
         # running generator
         try:
-            df = pd.read_csv(file_path)
+            df = read_table(file_path)
             output_path = Path(file_path).with_suffix(".html")
             instagram_gen(df, output_path)
         except Exception as e:
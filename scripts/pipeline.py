@@ -0,0 +1,261 @@
+"""
+Asyncio pipeline running many scenarios at once, with generation and rendering overlapping.
+Every scenario goes through four stages: generate (the LLM call on the async OpenAI client, then the CSV), images
+(Instagram pictures), html (the self-contained page) and pdf (exported on a warm Chromium through Playwright's async
+API). Each stage has its own workers, and stages are connected by bounded queues, so while the model writes one
+scenario the browser is already exporting the previous ones, and a slow stage holds the ones before it back instead
+of letting finished work pile up in memory.
+The HTML stage and picture generation are synchronous code, run on worker threads so the event loop keeps going.
+After a run, every stage reports how busy its workers were, next to the end-to-end throughput in scenarios/minute.
+"""
+# import packages
+import asyncio
+import io
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+from scripts.browser_pool import LOAD_LAZY_IMAGES, shards
+from scripts.cache import get_cache
+from scripts.chunked import generate_chunked
+from scripts.generate import PLATFORMS, entries_request, entries_to_frame, generate_pictures, render_document
+from scripts.ratelimit import get_limiter
+from scripts.tables import FORMATS, write_table
+
+# the clients are passed in by callers, so they are only imported here for type hints
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# stages in the order every scenario goes through them
+STAGES = ("generate", "images", "html", "pdf")
+
+class StageStats:
+    """
+    Counts the scenarios a stage handled and the seconds its workers spent on them.
+    Parameters:
+        name (str): Name of the stage.
+        workers (int): Number of workers running the stage.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+
+    def utilization(self, elapsed: float) -> float:
+        """
+        Share of the run the stage's workers spent working, from 0 (always idle) to 1 (never idle).
+        """
+        return self.busy / (elapsed * self.workers) if elapsed > 0 else 0.0
+
+async def generate_entries_async(client: "AsyncOpenAI", platform: str, user_prompt: str, country: str,
+                                 model_name: str, use_cache: bool = True) -> list:
+    """
+    Async version of scripts.generate.generate_entries, sharing its cache and rate limiter.
+    """
+    request, key, tokens = entries_request(platform, user_prompt, country, model_name)
+    model = PLATFORMS[platform]["model"]
+
+    cache = get_cache()
+    if cache is not None and use_cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return [model(**entry) for entry in cached]
+
+    result = await get_limiter().acall(lambda: client.with_options(max_retries=0).responses.parse(**request), tokens)
+    entries = result.output_parsed.Entry
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, [e.model_dump() for e in entries])
+    return entries
+
+async def _page_pdf(page, html: str) -> bytes:
+    # loading the page straight from memory; without a path, page.pdf returns the PDF as bytes
+    await page.set_content(html, wait_until="load")
+    await page.evaluate(LOAD_LAZY_IMAGES)
+    return await page.pdf(format="A4")
+
+async def _feed_pdf(page, platform: str, slots: dict, html: str, shard_size: int) -> bytes:
+    """
+    Exports a rendered feed to PDF on one page, shard by shard for feeds longer than shard_size posts.
+    """
+    spec = PLATFORMS[platform]
+    if not shard_size or len(slots[spec["shard_slot"]]) <= shard_size:
+        return await _page_pdf(page, html)
+
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise ImportError("Sharded PDF export requires pypdf (pip install pypdf).")
+
+    writer = PdfWriter()
+    for shard_slots in shards(slots, spec["shard_slot"], shard_size):
+        writer.append(io.BytesIO(await _page_pdf(page, spec["page"].render_to_string(**shard_slots))))
+    out = io.BytesIO()
+    await asyncio.to_thread(writer.write, out)
+    return out.getvalue()
+
+async def _worker(stats: StageStats, work: Callable, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+    """
+    Runs a stage on scenarios from inbox until it receives the shutdown sentinel, passing each one on to outbox.
+    Scenarios that failed in an earlier stage are passed on untouched.
+    """
+    while True:
+        item = await inbox.get()
+        # None is the shutdown sentinel
+        if item is None:
+            return
+        if item.get("error") is None:
+            started = time.perf_counter()
+            try:
+                await work(item)
+            except Exception as e:
+                item["error"] = e
+            stats.busy += time.perf_counter() - started
+            stats.items += 1
+        # waiting here whenever the next stage is behind, which is what keeps the queues bounded
+        await outbox.put(item)
+
+async def run_pipeline(jobs: List[dict], client: "OpenAI", async_client: "AsyncOpenAI", model_name: str = "gpt-4.1",
+                       use_cache: bool = True, file_format: str = "csv", pdf: bool = True, output_dir: str = "output",
+                       workers: Optional[Dict[str, int]] = None, queue_size: int = 2,
+                       on_done: Optional[Callable[[dict, float, Optional[Exception]], None]] = None) -> dict:
+    """
+    Generates, saves and renders scenarios with their stages overlapping.
+    Parameters:
+        jobs (list): Scenarios as in batch.py: prompt, platform, output and optionally country, count and chunk_size.
+        client (OpenAI): Client for pictures and chunked generation, which run on worker threads.
+        async_client (AsyncOpenAI): Client for the LLM calls of the generate stage.
+        model_name (str): Model used for generation.
+        use_cache (bool): Set to False to regenerate results even if an identical request is cached.
+        file_format (str): Format the posts are saved in ("csv", "parquet" or "feather").
+        pdf (bool): Export PDFs; without it the pdf stage (and the browser) is left out.
+        output_dir (str): Folder the outputs are written to, with the pictures in its "pictures" folder.
+        workers (dict): Workers per stage, by stage name; defaults to 4 generating, 2 on pictures, 1 rendering HTML
+            and 2 browser pages exporting PDFs.
+        queue_size (int): Scenarios that may wait between two stages.
+        on_done (callable): Called with (job, seconds taken, error or None) as each scenario completes.
+    Returns the run's report: scenarios completed and failed, seconds, scenarios_per_minute, and per stage the
+    workers, scenarios handled, busy seconds and utilization.
+    """
+    stages = [name for name in STAGES if pdf or name != "pdf"]
+    counts = {"generate": 4, "images": 2, "html": 1, "pdf": 2}
+    counts.update(workers or {})
+    stats = {name: StageStats(name, max(1, counts[name])) for name in stages}
+    shard_size = int(os.getenv("PDF_SHARD_SIZE", "0"))
+    os.makedirs(output_dir, exist_ok=True)
+
+    async def generate(item: dict) -> None:
+        job = item["job"]
+        platform, country = job["platform"], job.get("country") or os.getenv("COUNTRY")
+        if job.get("count"):
+            # chunked generation already runs its chunks in parallel, on threads of its own
+            entries = await asyncio.to_thread(generate_chunked, client, platform, job["prompt"], country, model_name,
+                                              int(job["count"]), int(job.get("chunk_size", 25)), use_cache=use_cache)
+        else:
+            entries = await generate_entries_async(async_client, platform, job["prompt"], country, model_name, use_cache)
+        item["df"] = entries_to_frame(platform, entries, "pictures", model_name)
+        # saving the posts for human edits before anything is rendered
+        await asyncio.to_thread(write_table, item["df"], os.path.join(output_dir, job["output"] + FORMATS[file_format]))
+
+    async def images(item: dict) -> None:
+        if item["job"]["platform"] == "instagram":
+            await asyncio.to_thread(generate_pictures, item["df"], output_dir, model_name, client, use_cache)
+
+    async def html(item: dict) -> None:
+        item["slots"], item["html"] = await asyncio.to_thread(render_document, item["job"]["platform"], item["df"],
+                                                              output_dir)
+        path = Path(output_dir) / (item["job"]["output"] + ".html")
+        await asyncio.to_thread(path.write_text, item["html"], encoding="utf-8")
+
+    browser = None
+
+    def export(pages: list):
+        # each worker keeps one page, replaced whenever an export fails in case it was left in a bad state
+        async def work(item: dict) -> None:
+            if not pages:
+                pages.append(await browser.new_page())
+            try:
+                data = await _feed_pdf(pages[0], item["job"]["platform"], item.pop("slots"), item.pop("html"), shard_size)
+            except Exception:
+                page = pages.pop()
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                raise
+            path = Path(output_dir) / (item["job"]["output"] + ".pdf")
+            await asyncio.to_thread(path.write_bytes, data)
+        return work
+
+    playwright = None
+    if pdf:
+        # importing playwright here so runs without PDFs do not pay for it
+        from playwright.async_api import async_playwright
+
+        playwright = await async_playwright().start()
+        browser = await playwright.chromium.launch()
+
+    started = time.perf_counter()
+    work = {"generate": generate, "images": images, "html": html}
+    queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages] + [asyncio.Queue()]
+    tasks = []
+    for index, name in enumerate(stages):
+        tasks.append([asyncio.create_task(_worker(stats[name], export([]) if name == "pdf" else work[name],
+                                                  queues[index], queues[index + 1]))
+                      for _ in range(stats[name].workers)])
+
+    async def feed() -> None:
+        for job in jobs:
+            await queues[0].put({"job": job, "started": time.perf_counter(), "error": None})
+        for _ in tasks[0]:
+            await queues[0].put(None)
+
+    async def close(index: int) -> None:
+        # once every worker of a stage has finished, the next stage's workers can be told to stop
+        await asyncio.gather(*tasks[index])
+        following = tasks[index + 1] if index + 1 < len(tasks) else [None]
+        for _ in following:
+            await queues[index + 1].put(None)
+
+    async def collect() -> List[bool]:
+        # only keeping whether each scenario succeeded, so finished posts and pages don't stay in memory
+        succeeded = []
+        while (item := await queues[-1].get()) is not None:
+            elapsed = time.perf_counter() - item["started"]
+            if on_done is not None:
+                on_done(item["job"], elapsed, item["error"])
+            succeeded.append(item["error"] is None)
+        return succeeded
+
+    try:
+        results = await asyncio.gather(feed(), collect(), *(close(index) for index in range(len(stages))))
+    finally:
+        if browser is not None:
+            await browser.close()
+        if playwright is not None:
+            await playwright.stop()
+    elapsed = time.perf_counter() - started
+
+    succeeded = results[1]
+    completed = sum(succeeded)
+    return {
+        "scenarios": completed,
+        "failed": len(succeeded) - completed,
+        "seconds": round(elapsed, 3),
+        "scenarios_per_minute": round(completed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "stages": {name: {"workers": stage.workers, "items": stage.items, "busy_seconds": round(stage.busy, 3),
+                          "utilization": round(stage.utilization(elapsed), 3)} for name, stage in stats.items()},
+    }
+
+def format_report(report: dict) -> str:
+    """
+    Formats a run_pipeline report as a small table of stage utilization followed by the throughput.
+    """
+    lines = [f"{'stage':<10}{'workers':>8}{'scenarios':>11}{'busy':>9}{'utilization':>13}"]
+    for name, stage in report["stages"].items():
+        lines.append(f"{name:<10}{stage['workers']:>8}{stage['items']:>11}{stage['busy_seconds']:>8.1f}s"
+                     f"{stage['utilization']:>12.0%}")
+    lines.append(f"{report['scenarios']} scenarios in {report['seconds']:.1f}s: "
+                 f"{report['scenarios_per_minute']:.1f} scenarios/minute")
+    return "\n".join(lines)
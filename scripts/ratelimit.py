@@ -0,0 +1,283 @@
+# import packages
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# request priorities: lower numbers are admitted first, so somebody waiting at the prompt never queues behind a batch
+INTERACTIVE = 0
+BATCH = 1
+
+# output tokens reserved for a text request until its real usage is known
+DEFAULT_OUTPUT_TOKENS = 2048
+
+# priority of requests made from the current thread (or task), see priority()
+_priority: ContextVar[int] = ContextVar("priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int):
+    """
+    Runs the requests made inside the block at the given priority (INTERACTIVE or BATCH). Worker threads started
+    inside it inherit the priority when they are submitted with contextvars.copy_context().run.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def estimate_tokens(*texts: str) -> int:
+    """
+    Estimates the tokens of some text at about four characters per token, which is close enough for budgeting;
+    the reservation is corrected with the real usage once the response arrives.
+    """
+    return sum(len(text) for text in texts) // 4 + 1
+
+def retry_after_seconds(response, attempt: int, backoff: float = 1.0) -> float:
+    """
+    Reads how long the API asked us to wait from a 429 response (retry-after-ms or Retry-After, in seconds or as
+    a date), falling back to exponential backoff with jitter.
+    """
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return backoff * (2 ** attempt) * (1 + random.random())
+
+class TokenBucket:
+    """
+    A budget refilling continuously at per_minute units a period, holding at most one period's worth.
+    Parameters:
+        per_minute (float): Units per period, None for no limit.
+        period (float): Length of the period in seconds (60 for per-minute limits).
+    """
+
+    def __init__(self, per_minute: Optional[float], period: float = 60.0):
+        self.capacity = per_minute
+        self.rate = per_minute / period if per_minute else None
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount units are available (requests larger than the whole budget only wait for a full bucket).
+        """
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.capacity is not None:
+            self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        """
+        Returns units to the bucket, or charges more with a negative amount (the level may go below zero).
+        """
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """
+    Admits API requests within a requests-per-minute and a tokens-per-minute budget, shared by every thread.
+    Requests wait in a single queue ordered by priority (then arrival), so interactive requests go ahead of batch
+    ones, and only the request at the head of the queue is admitted once both buckets can pay for it.
+    A 429 pauses the whole queue for as long as its Retry-After header asks, as every queued request would hit the
+    same limit. Time spent waiting is counted per priority.
+    Parameters:
+        rpm (float): Requests per minute, None for no limit.
+        tpm (float): Tokens (input plus output) per minute, None for no limit.
+        period (float): Seconds the budgets refill over, 60 for per-minute limits.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, period: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm, period)
+        self._tokens = TokenBucket(tpm, period)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._tickets = itertools.count()
+        self._paused_until = 0.0
+        self._stats = {"requests": 0, "throttled": 0, "throttled_seconds": {}, "rate_limited": 0, "retry_after_seconds": 0.0}
+
+    def acquire(self, tokens: int, level: Optional[int] = None) -> float:
+        """
+        Blocks until the request may be sent, reserving one request and tokens from the budgets.
+        Returns the seconds spent waiting.
+        """
+        level = _priority.get() if level is None else level
+        ticket = (level, next(self._tickets))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            # a higher priority request may now be at the head of the queue
+            self._cond.notify_all()
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] == ticket:
+                        now = time.monotonic()
+                        timeout = max(self._paused_until - now, self._requests.wait_time(1, now),
+                                      self._tokens.wait_time(tokens, now))
+                        if timeout <= 0:
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            break
+                    self._cond.wait(timeout)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._stats["requests"] += 1
+            if waited > 0.001:
+                self._stats["throttled"] += 1
+                name = "interactive" if level == INTERACTIVE else "batch" if level == BATCH else str(level)
+                self._stats["throttled_seconds"][name] = self._stats["throttled_seconds"].get(name, 0.0) + waited
+        return waited
+
+    def settle(self, reserved: int, used: int) -> None:
+        """
+        Corrects a request's token reservation with the tokens it actually used.
+        """
+        with self._cond:
+            self._tokens.give(reserved - used)
+            self._cond.notify_all()
+
+    def retry_after(self, seconds: float) -> None:
+        """
+        Pauses the queue after a 429, for as long as the API asked.
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._stats["rate_limited"] += 1
+            self._stats["retry_after_seconds"] += seconds
+            self._cond.notify_all()
+
+    def call(self, request: Callable[[], T], tokens: int, max_attempts: int = 5) -> T:
+        """
+        Sends request() once admitted, settling the reservation with the response's usage. Rate limited requests are
+        retried after the Retry-After delay; connection errors, timeouts and server errors after a backoff.
+        The client should have its own retries switched off (client.with_options(max_retries=0)), so every attempt
+        goes through the budgets.
+        """
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+
+        for attempt in range(max_attempts):
+            self.acquire(tokens)
+            try:
+                response = request()
+            except RateLimitError as e:
+                if attempt + 1 >= max_attempts:
+                    raise
+                self.retry_after(retry_after_seconds(e.response, attempt))
+                continue
+            except (APIConnectionError, InternalServerError):
+                # APIConnectionError covers timeouts too
+                if attempt + 1 >= max_attempts:
+                    raise
+                time.sleep(0.5 * (2 ** attempt) * (1 + random.random()))
+                continue
+            self._settle_usage(tokens, response)
+            return response
+
+    async def acall(self, request: Callable[[], Awaitable[T]], tokens: int, max_attempts: int = 5) -> T:
+        """
+        Like call, for the async client: request() returns an awaitable. Waiting for admission happens on a worker
+        thread, so the event loop keeps running while the request queues behind the budgets.
+        """
+        from openai import APIConnectionError, InternalServerError, RateLimitError
+
+        for attempt in range(max_attempts):
+            await asyncio.to_thread(self.acquire, tokens)
+            try:
+                response = await request()
+            except RateLimitError as e:
+                if attempt + 1 >= max_attempts:
+                    raise
+                self.retry_after(retry_after_seconds(e.response, attempt))
+                continue
+            except (APIConnectionError, InternalServerError):
+                if attempt + 1 >= max_attempts:
+                    raise
+                await asyncio.sleep(0.5 * (2 ** attempt) * (1 + random.random()))
+                continue
+            self._settle_usage(tokens, response)
+            return response
+
+    def _settle_usage(self, tokens: int, response) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.settle(tokens, (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0))
+
+    def snapshot(self) -> dict:
+        """
+        Counters: requests admitted, how many had to wait, seconds waited per priority, 429s and Retry-After seconds.
+        """
+        with self._cond:
+            stats = dict(self._stats, throttled_seconds=dict(self._stats["throttled_seconds"]))
+            stats["queued"] = len(self._queue)
+        stats["throttled_seconds"] = {name: round(seconds, 3) for name, seconds in stats["throttled_seconds"].items()}
+        stats["retry_after_seconds"] = round(stats["retry_after_seconds"], 3)
+        return stats
+
+# shared limiters, one per kind of request as the API limits text and image generation separately
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def _env_limit(name: str) -> Optional[float]:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else None
+
+def get_limiter(kind: str = "text") -> RateLimiter:
+    """
+    Returns the process-wide limiter for "text" or "image" requests, creating it on first use.
+    Budgets come from the environment: OPENAI_RPM and OPENAI_TPM for text, OPENAI_IMAGE_RPM for images. Without
+    them nothing is throttled up front, but 429s still pause the queue for their Retry-After.
+    """
+    with _limiters_lock:
+        if kind not in _limiters:
+            if kind == "image":
+                _limiters[kind] = RateLimiter(rpm=_env_limit("OPENAI_IMAGE_RPM"))
+            else:
+                _limiters[kind] = RateLimiter(rpm=_env_limit("OPENAI_RPM"), tpm=_env_limit("OPENAI_TPM"))
+        return _limiters[kind]
+
+def set_limiter(limiter: RateLimiter, kind: str = "text") -> None:
+    """
+    Replaces the process-wide limiter for "text" or "image" requests, e.g. with budgets that aren't in the environment.
+    """
+    with _limiters_lock:
+        _limiters[kind] = limiter
+
+def limiter_stats() -> Dict[str, dict]:
+    """
+    Counters of every limiter in use, by kind.
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {kind: limiter.snapshot() for kind, limiter in limiters.items()}
@@ -1,31 +1,39 @@
 # import packages
+import numpy as np
 import pandas as pd
 import os
+import sys
 from pydantic import BaseModel
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# allowing the script to be run directly (python scripts/reddit_comments.py) as well as imported as part of the package
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.browser_pool import export_feed_pdf
+from scripts.render import FeedTemplate, escape_column, render_rows, text_column
+from scripts.tables import read_table
 
 # defining a reddit comment class for use with structured outputs
 class RedditComment(BaseModel):
+    ID: str
+    ParentID: str
     Type: str
     Username: str
     Upvotes: str
     Time: str
     Content: str
 
-# defining necessary inputs
-def reddit_comment_gen(content: pd.DataFrame, output_path: str = "reddit_comments.html") -> None:
-    """
-    This is a simple tool that takes a dataframe and generates a reddit style content chain. "Top" type comments
-    are generated as top level comments while "comment" type comments are generated as nested replies beneath them in
-    the order they are presented in the dataframe.
-    Parameters:
-        df (pd.DataFrame): DataFrame with columns [Type, Username, Upvotes, Time, Content].
-        output_path (str): Path to save the generated HTML file.
-    """
+# columns a CSV needs to be rendered; ID and ParentID are optional so older, flat threads still render
+REDDIT_COLUMNS = {"Type", "Username", "Upvotes", "Time", "Content"}
+
+# pixels each level of replies is indented by, and the deepest level that is still indented further
+INDENT_PX = 20
+MAX_INDENT_LEVEL = 15
 
-    # HTML header and styling
-    html_template = """
+# HTML header and styling, precompiled once into a streamable template
+REDDIT_PAGE = FeedTemplate("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -41,7 +49,8 @@ def reddit_comment_gen(content: pd.DataFrame, output_path: str = "reddit_comment
                 margin-top: 10px;
                 border: 1px solid #ccc;
             }}
-            .comment-box {{ margin-left: 20px; border-left: 2px solid #ccc; }}
+            .comment-box {{ border-left: 2px solid #ccc; }}
+            .collapsed {{ color: #0079d3; font-size: 12px; margin-top: 8px; }}
             .username {{ color: #0079d3; font-weight: bold; }}
             .meta {{ color: #7c7c7c; font-size: 12px; }}
             .upvotes {{ color: #ff4500; font-weight: bold; margin-right: 10px; }}
@@ -53,39 +62,158 @@ def reddit_comment_gen(content: pd.DataFrame, output_path: str = "reddit_comment
         </div>
     </body>
     </html>
-    """
-
-    # instantiates empty string to build html content
-    body_html = ""
+    """)
 
-    # dynamically generates html from the imported dataframe
-    for _, row in content.iterrows():
-        box_class = "post-box" if row["Type"] == "top" else "comment-box"
-        html_block = f"""
-        <div class="{box_class}">
+# HTML for a single post or comment
+REDDIT_BLOCK = """
+        <div class="{BoxClass}" style="margin-left: {Indent}px">
             <div class="meta">
-                <span class="upvotes">⬆ {row['Upvotes']}</span>
-                <span class="username">u/{row['Username']}</span> · {row['Time']}
+                <span class="upvotes">⬆ {Upvotes}</span>
+                <span class="username">u/{Username}</span> · {Time}
             </div>
-            <div class="text">{row['Content']}</div>
+            <div class="text">{Content}</div>{Collapsed}
         </div>
         """
-        body_html += html_block
 
-    # adding dynamically generated html to the empty string following the template laid out above
-    final_html = html_template.format(body=body_html)
+def comment_tree(ids: Sequence[str], parent_ids: Sequence[str], collapsed: Optional[Sequence[bool]] = None,
+                 collapse_depth: Optional[int] = None) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Orders comments as a thread: every comment directly after its parent, replies in their original order.
+    Comments are indexed by parent in a single pass and walked depth first with an explicit stack, so any depth
+    works in linear time without recursion. Comments whose parent doesn't exist (or that sit in a cycle) become
+    top-level comments.
+    Parameters:
+        ids (list): ID of every comment.
+        parent_ids (list): ID of the comment each one replies to, empty for top-level comments.
+        collapsed (list): Per comment, whether its replies are hidden.
+        collapse_depth (int): Hide all replies below this depth (0 = top-level comments only).
+    Returns (positions in display order, depth of each, number of hidden replies below each).
+    """
+    # one pass: grouping every comment under the ID it replies to
+    children = {}
+    known = set()
+    for position, (comment_id, parent_id) in enumerate(zip(ids, parent_ids)):
+        children.setdefault(parent_id, []).append(position)
+        if comment_id:
+            known.add(comment_id)
+
+    order, depths, hidden = [], [], []
+    visited = bytearray(len(ids))
+
+    def walk(starts: List[int]) -> None:
+        stack = [(position, 0) for position in reversed(starts)]
+        while stack:
+            position, depth = stack.pop()
+            if visited[position]:
+                continue
+            visited[position] = 1
+            order.append(position)
+            depths.append(depth)
+            replies = children.get(ids[position], []) if ids[position] else []
+            if replies and ((collapsed is not None and collapsed[position])
+                            or (collapse_depth is not None and depth >= collapse_depth)):
+                # counting (and skipping) the collapsed subtree without rendering it
+                count, pending = 0, list(replies)
+                while pending:
+                    reply = pending.pop()
+                    if visited[reply]:
+                        continue
+                    visited[reply] = 1
+                    count += 1
+                    if ids[reply]:
+                        pending.extend(children.get(ids[reply], []))
+                hidden.append(count)
+                continue
+            hidden.append(0)
+            stack.extend((reply, depth + 1) for reply in reversed(replies))
+
+    walk([position for position, parent_id in enumerate(parent_ids)
+          if not parent_id or parent_id not in known or parent_id == ids[position]])
+    # anything still unvisited is part of a reply cycle, which is shown from its first comment
+    for position in range(len(ids)):
+        if not visited[position]:
+            walk([position])
+    return order, depths, hidden
+
+def _id_strings(column: pd.Series) -> List[str]:
+    # IDs read back from a CSV may be numbers, with a float column wherever ParentID has blanks
+    if pd.api.types.is_numeric_dtype(column):
+        column = column.astype("Int64")
+    return column.astype(str).replace({"<NA>": "", "nan": ""}).str.strip().tolist()
+
+def arrange_thread(content: pd.DataFrame, collapse_depth: Optional[int] = None) -> pd.DataFrame:
+    """
+    Puts the comments in thread order and adds their Depth and Hidden (collapsed replies) columns.
+    Threads without ID/ParentID columns keep their order, with "top" comments at depth 0 and the rest one level below.
+    Replies of comments with a truthy Collapsed column, or deeper than collapse_depth, are hidden.
+    """
+    if "Depth" in content.columns:
+        return content
+    parent_ids = _id_strings(content["ParentID"]) if {"ID", "ParentID"} <= set(content.columns) else []
+    if not any(parent_ids):
+        return content.assign(Depth=np.where(content["Type"] == "top", 0, 1), Hidden=0)
+
+    collapsed = None
+    if "Collapsed" in content.columns:
+        collapsed = text_column(content["Collapsed"]).str.strip().str.lower().isin(["1", "true", "yes", "x"]).tolist()
+    order, depths, hidden = comment_tree(_id_strings(content["ID"]), parent_ids, collapsed, collapse_depth)
+    return content.iloc[order].assign(Depth=depths, Hidden=hidden)
+
+# defining necessary inputs
+def reddit_columns(content: pd.DataFrame, output_dir=None) -> Dict[str, pd.Series]:
+    """
+    Prepares every template field column-wise from a thread arranged by arrange_thread, with "top" comments at the
+    top level shown as posts and every other comment indented by its depth.
+    """
+    columns = {name: escape_column(content[name]) for name in ["Username", "Upvotes", "Time", "Content"]}
+    depth = content["Depth"].astype(int)
+    columns["BoxClass"] = pd.Series(
+        np.where((content["Type"] == "top") & (depth == 0), "post-box", "comment-box"), index=content.index
+    )
+    columns["Indent"] = depth.clip(upper=MAX_INDENT_LEVEL) * INDENT_PX
+    hidden = content["Hidden"].astype(int)
+    columns["Collapsed"] = pd.Series(
+        np.where(hidden > 0, '<div class="collapsed">[+] ' + hidden.astype(str) + np.where(hidden == 1, " more reply", " more replies") + "</div>", ""),
+        index=content.index
+    )
+    return columns
+
+def reddit_fragments(content: pd.DataFrame, output_dir=None) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (template slot, HTML) for every row of an arranged thread (see arrange_thread) in order, for callers that
+    assemble the page themselves.
+    """
+    return zip(repeat("body"), render_rows(REDDIT_BLOCK, reddit_columns(arrange_thread(content), output_dir)))
+
+def reddit_comment_gen(content: pd.DataFrame, output_path: str = "reddit_comments.html", pdf: bool = True,
+                       shard_size: Optional[int] = None, collapse_depth: Optional[int] = None) -> None:
+    """
+    This is a simple tool that takes a dataframe and generates a reddit style content chain. With ID and ParentID
+    columns, every comment is nested under the comment it replies to, to any depth. Without them, "top" type
+    comments are generated as top level comments while "comment" type comments are generated as nested replies
+    beneath them in the order they are presented in the dataframe.
+    Parameters:
+        df (pd.DataFrame): DataFrame with columns [ID, ParentID, Type, Username, Upvotes, Time, Content]
+            (ID and ParentID optional, plus an optional Collapsed column to hide a comment's replies).
+        output_path (str): Path to save the generated HTML file.
+        pdf (bool): Whether to also export the HTML file to PDF.
+        shard_size (int): Comments per PDF shard for parallel export of long threads (defaults to PDF_SHARD_SIZE).
+        collapse_depth (int): Hide replies nested deeper than this, showing a "more replies" link instead.
+    """
+
+    # putting the comments in thread order, then preparing every field column-wise
+    content = arrange_thread(content, collapse_depth)
+    columns = reddit_columns(content)
 
-    # writing html file
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    # streaming the page to file one comment at a time
+    REDDIT_PAGE.render_to_file(output_path, body=render_rows(REDDIT_BLOCK, columns))
 
-    # write html to pdf
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(f"file://{Path(output_path).resolve()}")
-        page.pdf(path=Path(output_path).with_suffix(".pdf"), format="A4")
-        browser.close()
+    # write html to pdf on the shared, already warm browsers, in parallel shards for long feeds
+    if pdf:
+        export_feed_pdf(
+            REDDIT_PAGE, output_path, len(content), "body", shard_size,
+            body=render_rows(REDDIT_BLOCK, columns)
+        )
 
     # completion message
     print("Reddit comment chain generated.")
@@ -93,7 +221,7 @@ def reddit_comment_gen(content: pd.DataFrame, output_path: str = "reddit_comment
 # alternative functionality if python file is executed directly
 if __name__ == "__main__":
     # prompting user for input
-    user_path = input("Manual input activated. Enter path to CSV file: ").strip()
+    user_path = input("Manual input activated. Enter path to CSV, Parquet or Arrow file: ").strip()
     # constructing a path to default output directory in case user didn't type full path
     default_path = Path(__file__).resolve().parent.parent / "output" / user_path
     # checking if either file exists
@@ -105,7 +233,7 @@ if __name__ == "__main__":
             file_path = default_path
         # running generator
         try:
-            df = pd.read_csv(file_path)
+            df = read_table(file_path)
             output_path = Path(file_path).with_suffix(".html")
             reddit_comment_gen(df, output_path)
         except Exception as e:
@@ -0,0 +1,125 @@
+# import packages
+import base64
+import html
+import io
+import mimetypes
+import os
+import numpy as np
+import pandas as pd
+from string import Formatter
+from typing import Dict, Iterable, Iterator, TextIO
+from scripts.trace import stage
+
+class FeedTemplate:
+    """
+    A page template precompiled into literal segments and named slots (e.g. {body}).
+    Instead of formatting the whole document at once, each slot is filled by streaming fragments straight into
+    a file or buffer, so only one post is ever held in memory alongside the template itself.
+    Literal braces are written as {{ and }}, as with str.format.
+    """
+
+    def __init__(self, html: str):
+        # splitting the template once into (literal text, slot name) pairs, unescaping doubled braces on the way
+        self.parts = [
+            (literal, field)
+            for literal, field, _, _ in Formatter().parse(html)
+        ]
+        self.slots = {field for _, field in self.parts if field}
+
+    def stream(self, out: TextIO, **slots: Iterable[str]) -> None:
+        """
+        Writes the template to out, writing each slot's fragments in order as they are produced.
+        """
+        # making sure every slot was provided before anything is written
+        missing = self.slots - slots.keys()
+        if missing:
+            raise KeyError(f"Missing template slots: {', '.join(sorted(missing))}")
+
+        for literal, field in self.parts:
+            out.write(literal)
+            if field:
+                for fragment in slots[field]:
+                    out.write(fragment)
+
+    def render_to_file(self, output_path, **slots: Iterable[str]) -> None:
+        """
+        Streams the rendered template into a UTF-8 file at output_path.
+        """
+        with stage("html.write", path=str(output_path)), open(output_path, "w", encoding="utf-8") as f:
+            self.stream(f, **slots)
+
+    def render_to_string(self, **slots: Iterable[str]) -> str:
+        """
+        Renders the template into a string, for callers that never need the HTML on disk.
+        """
+        with stage("html.render"):
+            out = io.StringIO()
+            self.stream(out, **slots)
+            return out.getvalue()
+
+def text_column(column: pd.Series) -> pd.Series:
+    """
+    Converts a column of any dtype (including categoricals and nullable integers read from Parquet) to strings,
+    treating missing values as empty strings.
+    """
+    return column.astype(object).where(column.notna(), "").astype(str)
+
+def escape_column(column: pd.Series) -> pd.Series:
+    """
+    HTML-escapes a whole column at once, treating missing values as empty strings.
+    Categorical columns are escaped once per category rather than once per row.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        escaped = np.append(column.cat.categories.astype(str).map(html.escape).to_numpy(dtype=object), "")
+        # code -1 (a missing value) picks the empty string appended at the end
+        return pd.Series(escaped[column.cat.codes.to_numpy()], index=column.index)
+    return text_column(column).map(html.escape)
+
+def inside(folder: str, path: str) -> bool:
+    """
+    Checks whether a resolved path lies within a resolved folder.
+    """
+    try:
+        return os.path.commonpath([folder, path]) == folder
+    except ValueError:
+        # paths on different drives (Windows)
+        return False
+
+def inline_images(paths: pd.Series, base_dir: str = ".") -> pd.Series:
+    """
+    Replaces image paths (relative to base_dir) with data URIs, reading every unique file once, so a page renders
+    without access to the folder it would normally sit in. Paths that don't exist, or lead outside base_dir (absolute
+    paths, "..", symlinks out of it), are kept as they are, so an uploaded feed can't embed arbitrary files.
+    """
+    paths = text_column(paths)
+    base = os.path.realpath(base_dir)
+    sources = {}
+    with stage("images.inline", images=paths.nunique()):
+        for path in paths.unique():
+            file_path = os.path.realpath(os.path.join(base, path))
+            if not path or not inside(base, file_path) or not os.path.isfile(file_path):
+                sources[path] = path
+                continue
+            mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            with open(file_path, "rb") as f:
+                sources[path] = f"data:{mime};base64," + base64.b64encode(f.read()).decode()
+    return paths.map(sources)
+
+def format_counts(column: pd.Series) -> pd.Series:
+    """
+    Formats a column of counts with thousands separators (1234 -> "1,234").
+    Values that are not plain numbers (e.g. "1.2k" typed into the CSV) are kept as they are.
+    """
+    numbers = pd.to_numeric(column, errors="coerce")
+    return numbers.map("{:,.0f}".format).where(numbers.notna(), column.astype(str))
+
+def render_rows(template: str, columns: Dict[str, pd.Series]) -> Iterator[str]:
+    """
+    Formats template once per row from column-wise prepared data, without boxing each row into a Series.
+    columns maps the template's field names to equally long columns.
+    """
+    names = list(columns)
+    fill = template.format
+    # walking plain tuples of python values rather than DataFrame rows
+    for values in zip(*(columns[name].tolist() for name in names)):
+        yield fill(**dict(zip(names, values)))
@@ -0,0 +1,143 @@
+# import packages
+import contextlib
+import csv
+import io
+import json
+import time
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
+import pandas as pd
+from pydantic import BaseModel
+from scripts.cache import get_cache
+from scripts.generate import PLATFORMS, entries_request, render_output
+from scripts.image_store import image_path
+from scripts.ratelimit import get_limiter
+from scripts.trace import record_usage, stage
+
+# the OpenAI client is passed in by callers, so it is only imported here for type hints
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+class EntryStreamParser:
+    """
+    Incrementally extracts the objects of the "Entry" array from streamed structured output text,
+    e.g. {"Entry": [{...}, {...}]}, returning each object as soon as its closing brace arrives.
+    Only the object currently being received is buffered.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current = []
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        Consumes the next piece of text and returns the entries it completed.
+        """
+        completed = []
+        for char in text:
+            # entries sit at depth 2: inside the top-level object and the Entry array
+            if self._depth >= 2 and (self._depth > 2 or char == "{"):
+                self._current.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                # an entry just closed
+                if self._depth == 2 and char == "}":
+                    completed.append(json.loads("".join(self._current)))
+                    self._current = []
+        return completed
+
+def stream_entries(client: "OpenAI", platform: str, user_prompt: str, country: str, model_name: str,
+                   use_cache: bool = True) -> Iterator[BaseModel]:
+    """
+    Generates posts like generate_entries, but yields each one as soon as the model has finished writing it.
+    The complete, validated result is cached once the stream ends.
+    """
+    request, key, tokens = entries_request(platform, user_prompt, country, model_name)
+    model = PLATFORMS[platform]["model"]
+
+    # replaying cached results straight away
+    cache = get_cache()
+    if cache is not None and use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield from (model(**entry) for entry in cached)
+            return
+
+    # opening the stream once the shared rate limiter admits it, with retries left to the limiter; the request is
+    # sent when the stream is entered, so 429s and connection errors are retried before any post has been yielded
+    limiter = get_limiter()
+
+    def open_stream():
+        return client.with_options(max_retries=0).responses.stream(**request).__enter__()
+
+    # streaming the LLM result and validating every entry as it completes
+    parser = EntryStreamParser()
+    # the stage spans the whole stream, including whatever the caller does with each post in between
+    with stage("llm.stream", platform=platform, model=model_name) as details, limiter.call(open_stream, tokens) as stream:
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                for entry in parser.feed(event.delta):
+                    yield model(**entry)
+        result = stream.get_final_response()
+        record_usage(details, result)
+        limiter.settle(tokens, details.get("input_tokens", 0) + details.get("output_tokens", 0))
+
+    if cache is not None:
+        cache.put(key, [e.model_dump() for e in result.output_parsed.Entry])
+
+def stream_to_files(client: "OpenAI", platform: str, user_prompt: str, country: str, model_name: str, output_stem: str,
+                    pic_folder: str = "pictures", use_cache: bool = True, pdf: bool = True,
+                    on_post: Optional[Callable[[int, float], None]] = None) -> pd.DataFrame:
+    """
+    Streams generation straight into <output_stem>.csv and an HTML preview at <output_stem>.html, adding each post
+    as soon as it is complete, then runs the full render (Instagram pictures and PDF) once the stream ends.
+    Parameters:
+        output_stem (str): Output path without extension, e.g. "output/unicorn".
+        pdf (bool): Whether the final render also exports a PDF.
+        on_post (callable): Called with (number of posts so far, seconds since the request started) per post.
+    """
+    started = time.perf_counter()
+    render = PLATFORMS[platform]["render"]
+    html_path = output_stem + ".html"
+    rows = []
+
+    with open(output_stem + ".csv", "w", newline="", encoding="utf-8-sig") as f:
+        writer = None
+        for entry in stream_entries(client, platform, user_prompt, country, model_name, use_cache):
+            row = entry.model_dump()
+            # FOR INSTAGRAM ONLY, adding the picture filepath
+            if platform == "instagram":
+                row["FilePath"] = image_path(row["ImagePrompt"], model_name, pic_folder)
+
+            # appending the post to the CSV for human edits
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+
+            # refreshing the HTML preview without a PDF; the feed is LLM-sized, so re-rendering it is cheap,
+            # and the generator's completion message is silenced so it isn't printed once per post
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(pd.DataFrame(rows), html_path, pdf=False)
+            if on_post is not None:
+                on_post(len(rows), time.perf_counter() - started)
+
+    # final render with pictures and PDF
+    df = pd.DataFrame(rows)
+    render_output(platform, df, html_path, model_name, client, use_cache, pdf)
+    return df
@@ -0,0 +1,106 @@
+"""
+Reading and writing generated posts as CSV, Parquet or Arrow (Feather) files, picked by file extension.
+CSV stays the default, as it is easy to edit by hand. For large corpora the columnar formats store proper dtypes
+(usernames and post types as categoricals, counts as integers), are a fraction of the size, and can be read back
+memory-mapped and restricted to the columns needed.
+Parquet and Arrow need pyarrow (pip install pyarrow), which is only imported when one of them is used.
+"""
+# import packages
+import os
+from typing import List, Optional
+import pandas as pd
+from scripts.trace import stage
+
+# file extensions of each supported format
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+# columns repeating a small set of values, stored once per distinct value as categoricals
+CATEGORY_COLUMNS = {"Username", "Handle", "Name", "Type"}
+# engagement counts, which the models generate as text but are stored as integers whenever every value is a number
+COUNT_COLUMNS = {"Likes", "Upvotes", "Replies", "Retweets", "Views", "CommentCount"}
+
+def table_format(path: str) -> str:
+    """
+    Returns the format ("csv", "parquet" or "feather") of a file from its extension.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unsupported file type {extension!r}, expected one of: {', '.join(EXTENSIONS)}")
+    return EXTENSIONS[extension]
+
+def _pyarrow():
+    # pyarrow is only needed for the columnar formats
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files require pyarrow (pip install pyarrow).")
+    return pyarrow
+
+def typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts posts to compact dtypes: categorical usernames and post types, and integer counts where every value of
+    the column is a whole number (counts such as "1.2K" keep the column as text).
+    """
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if name in CATEGORY_COLUMNS:
+            columns[name] = column.astype("category")
+        elif name in COUNT_COLUMNS and not pd.api.types.is_integer_dtype(column):
+            numbers = pd.to_numeric(column, errors="coerce")
+            if numbers.notna().sum() == column.notna().sum() and (numbers.dropna() % 1 == 0).all():
+                columns[name] = numbers.astype("Int64")
+    return df.assign(**columns) if columns else df
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    """
+    Saves posts to path in the format given by its extension. CSVs are written as before (UTF-8 with BOM so Excel
+    reads them correctly); Parquet (zstd compressed) and Arrow files keep the compact dtypes of typed_frame.
+    Arrow files are written uncompressed so they can be memory-mapped without decoding.
+    """
+    fmt = table_format(path)
+    with stage("disk.write", path=str(path), format=fmt):
+        if fmt == "csv":
+            df.to_csv(path, index=False, encoding="utf-8-sig")
+            return
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(typed_frame(df), preserve_index=False)
+        if fmt == "parquet":
+            pa.parquet.write_table(table, path, compression="zstd")
+        else:
+            pa.feather.write_feather(table, path, compression="uncompressed")
+
+def table_columns(path: str) -> List[str]:
+    """
+    Lists a file's columns, reading only the CSV header or the Parquet/Arrow schema.
+    """
+    fmt = table_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_schema(path).names
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+def read_table(path: str, columns: Optional[List[str]] = None, memory_map: bool = True) -> pd.DataFrame:
+    """
+    Reads posts from a CSV, Parquet or Arrow file.
+    Parameters:
+        path (str): File to read, its format is taken from the extension.
+        columns (list): Only read these columns (skipping the others entirely for Parquet and Arrow).
+        memory_map (bool): Map Parquet and Arrow files into memory instead of reading them into buffers first.
+    """
+    fmt = table_format(path)
+    with stage("disk.read", path=str(path), format=fmt):
+        if fmt == "csv":
+            return pd.read_csv(path, usecols=columns)
+        pa = _pyarrow()
+        if fmt == "parquet":
+            table = pa.parquet.read_table(path, columns=columns, memory_map=memory_map)
+        else:
+            table = pa.feather.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
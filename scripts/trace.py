@@ -0,0 +1,185 @@
+# import packages
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+class Tracer:
+    """
+    Collects timed pipeline stages (LLM calls, image generation, DataFrame build, HTML render, browser launch,
+    PDF export, disk writes) from every thread and writes them as a Chrome trace, viewable in chrome://tracing
+    or https://ui.perfetto.dev, with a per-stage summary alongside.
+    Parameters:
+        path (str): Where the trace JSON is written.
+        profile (bool): Also run cProfile around each renderer, writing <trace stem>.<stage>.prof files next to the trace.
+    """
+
+    def __init__(self, path: str, profile: bool = False):
+        self.path = Path(path)
+        self.profile = profile
+        self.events = []
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._origin = time.perf_counter()
+        self._profiles = 0
+        self._profiling = threading.Lock()
+
+    def _now(self) -> float:
+        # microseconds since the trace started, the unit Chrome traces use
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def stage(self, name: str, **args):
+        """
+        Times the enclosed block as one stage. Yields the stage's args dict, so details only known at the end
+        (e.g. token usage) can be added to it.
+        """
+        thread = threading.current_thread()
+        start = self._now()
+        try:
+            yield args
+        finally:
+            event = {"name": name, "cat": name.split(".")[0], "ph": "X", "ts": round(start, 1),
+                     "dur": round(self._now() - start, 1), "pid": os.getpid(), "tid": thread.ident, "args": args}
+            with self._lock:
+                self._threads[thread.ident] = thread.name
+                self.events.append(event)
+
+    def summary(self) -> dict:
+        """
+        Totals per stage: how often it ran, its total and maximum duration in ms, and any token counts.
+        """
+        stages = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            stage = stages.setdefault(event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] = round(stage["total_ms"] + event["dur"] / 1000, 3)
+            stage["max_ms"] = round(max(stage["max_ms"], event["dur"] / 1000), 3)
+            for key in ("input_tokens", "output_tokens"):
+                if key in event["args"]:
+                    stage[key] = stage.get(key, 0) + event["args"][key]
+        return stages
+
+    def write(self) -> Path:
+        """
+        Writes the trace (and the summary under "otherData") to self.path.
+        """
+        with self._lock:
+            names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                     for tid, name in self._threads.items()]
+            events = names + list(self.events)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"stages": self.summary()}}, f)
+        return self.path
+
+    @contextmanager
+    def profiled(self, name: str):
+        """
+        Runs the enclosed block under cProfile when profiling is switched on, writing <trace stem>.<name>.<n>.prof.
+        """
+        # only one profiler can be active per process, so renders running alongside a profiled one are not profiled
+        if not self.profile or not self._profiling.acquire(blocking=False):
+            yield
+            return
+        self._profiles += 1
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(self.path.with_name(f"{self.path.stem}.{name}.{self._profiles}.prof"))
+            self._profiling.release()
+
+# the active tracer, shared by every thread; None means tracing is off and stages cost next to nothing
+_tracer: Optional[Tracer] = None
+
+def start_trace(path: str, profile: bool = False) -> Tracer:
+    """
+    Switches tracing on for the rest of the process; the trace is written when the interpreter exits
+    (or earlier through stop_trace).
+    """
+    global _tracer
+    _tracer = Tracer(path, profile)
+    atexit.register(stop_trace)
+    return _tracer
+
+def stop_trace() -> Optional[Path]:
+    """
+    Writes the active trace and switches tracing off, returning the trace path.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer.write() if tracer is not None else None
+
+def trace_from_env() -> Optional[Tracer]:
+    """
+    Starts tracing if the TRACE environment variable names a trace file; PROFILE=1 adds cProfile output.
+    """
+    if os.getenv("TRACE"):
+        return start_trace(os.environ["TRACE"], os.getenv("PROFILE", "") not in ("", "0"))
+    return None
+
+@contextmanager
+def stage(name: str, **args):
+    """
+    Times the enclosed block as a stage of the active trace, if there is one. Yields a dict that extra details
+    can be added to either way.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+    with tracer.stage(name, **args) as details:
+        yield details
+
+@contextmanager
+def profiled(name: str):
+    """
+    Runs the enclosed block under cProfile if the active trace has profiling switched on.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    with tracer.profiled(name):
+        yield
+
+def record_usage(details: dict, response) -> None:
+    """
+    Copies token usage from an OpenAI response (if it reports any) into a stage's details.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        details["input_tokens"] = getattr(usage, "input_tokens", 0) or 0
+        details["output_tokens"] = getattr(usage, "output_tokens", 0) or 0
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """
+    Prints the per-stage totals of two traces side by side, e.g. from two releases running the same job.
+    """
+    def totals(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["otherData"]["stages"]
+    baseline, current = totals(baseline_path), totals(current_path)
+    print(f"{'stage':<18} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name in sorted(baseline.keys() | current.keys()):
+        before = baseline.get(name, {}).get("total_ms", 0.0)
+        after = current.get(name, {}).get("total_ms", 0.0)
+        change = f"{(after - before) / before:+.0%}" if before else "new"
+        print(f"{name:<18} {before:>12,.1f} {after:>12,.1f} {change:>8}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python -m scripts.trace <baseline trace.json> <current trace.json>")
+    compare(sys.argv[1], sys.argv[2])
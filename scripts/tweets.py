@@ -1,9 +1,19 @@
 import os
+import sys
 import pandas as pd
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+from itertools import repeat
+from typing import Dict, Iterator, Optional, Tuple
 from pydantic import BaseModel
 
+# allowing the script to be run directly (python scripts/tweets.py) as well as imported as part of the package
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scripts.browser_pool import export_feed_pdf
+from scripts.avatars import FALLBACK_AVATAR, get_avatar_provider
+from scripts.render import FeedTemplate, escape_column, render_rows
+from scripts.tables import read_table
+
 # defining a tweet class for use with structured outputs
 class Tweet(BaseModel):
     Username: str
@@ -15,20 +25,8 @@ class Tweet(BaseModel):
     Likes: str
     Views: str
 
-def tweet_gen (content: pd.DataFrame, output_path: str = "tweets.html") -> None:
-    """
-    Generates a Twitter-style HTML feed from a DataFrame.
-    Expects columns: [Username, Handle, Time, Content, Replies, Retweets, Likes, Views]
-    """
-
-    # dynamically generating profile images using the DiceBear API - url defined below
-    dicebear_url = "https://api.dicebear.com/9.x/notionists-neutral/svg?seed="
-
-    # create a new column for ProfileImage using the Username as seed and leveraging on DiceBear's capabilities
-    content["ProfileImage"] = content["Username"].apply(lambda name: f"{dicebear_url}{name}")
-
-    # defining the HTML template and styling
-    html_template = """
+# defining the HTML page template and styling, precompiled once into a streamable template
+TWEET_PAGE = FeedTemplate("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -97,48 +95,69 @@ def tweet_gen (content: pd.DataFrame, output_path: str = "tweets.html") -> None:
         </div>
     </body>
     </html>
-    """
-    # instantiating an empty string to accept html
-    tweet_html = ""
+    """)
 
-    # dynamically generating tweets from content
-    for _, row in content.iterrows():
-        # creating a fallback image in case prof images fail to load
-        profile_img_tag = f"""
-        <img class="profile-img" src="{row["ProfileImage"]}" alt="Profile"
-             onerror="this.onerror=null;this.src='https://cdn-icons-png.flaticon.com/512/149/149071.png';">
-        """
-        tweet_html += f"""
+# defining the HTML for a single tweet, with a fallback image in case profile images fail to load
+TWEET_BLOCK = """
         <div class="tweet">
-            {profile_img_tag}
+            <img class="profile-img" src="{ProfileImage}" alt="Profile"
+                 onerror="this.onerror=null;this.src='""" + FALLBACK_AVATAR + """';">
             <div class="tweet-body">
-                <div class="tweet-header">{row['Username']} <span class="tweet-handle">{row['Handle']}</span></div>
-                <div class="tweet-time">{row['Time']}</div>
-                <div class="tweet-content">{row['Content']}</div>
+                <div class="tweet-header">{Username} <span class="tweet-handle">{Handle}</span></div>
+                <div class="tweet-time">{Time}</div>
+                <div class="tweet-content">{Content}</div>
                 <div class="tweet-footer">
-                    <span>{row['Replies']} Replies</span>
-                    <span>{row['Retweets']} Retweets</span>
-                    <span>{row['Likes']} Likes</span>
-                    <span>{row['Views']} Views</span>
+                    <span>{Replies} Replies</span>
+                    <span>{Retweets} Retweets</span>
+                    <span>{Likes} Likes</span>
+                    <span>{Views} Views</span>
                 </div>
             </div>
         </div>
         """
 
-    # adding dynamically generated html to template
-    final_html = html_template.format(body=tweet_html)
+def tweet_columns(content: pd.DataFrame, output_dir) -> Dict[str, pd.Series]:
+    """
+    Prepares every template field column-wise, with avatars saved to output_dir/avatars.
+    """
+    # escaping the text
+    columns = {
+        name: escape_column(content[name])
+        for name in ["Username", "Handle", "Time", "Content", "Replies", "Retweets", "Likes", "Views"]
+    }
+
+    # profile images are DiceBear avatars seeded by the Username, produced once per user and saved next to the HTML file
+    avatars = get_avatar_provider("notionists-neutral")
+    columns["ProfileImage"] = escape_column(avatars.column(content["Username"], output_dir))
+    return columns
+
+def tweet_fragments(content: pd.DataFrame, output_dir) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (template slot, HTML) for every row in order, for callers that assemble the page themselves.
+    """
+    return zip(repeat("body"), render_rows(TWEET_BLOCK, tweet_columns(content, output_dir)))
+
+def tweet_gen (content: pd.DataFrame, output_path: str = "tweets.html", pdf: bool = True,
+               shard_size: Optional[int] = None) -> None:
+    """
+    Generates a Twitter-style HTML feed from a DataFrame.
+    Expects columns: [Username, Handle, Time, Content, Replies, Retweets, Likes, Views]
+    Set pdf to False to only write the HTML file, and shard_size to export long feeds to PDF in parallel shards
+    (defaults to the PDF_SHARD_SIZE environment variable).
+    """
+
+    # preparing every field column-wise
+    columns = tweet_columns(content, Path(output_path).parent)
 
-    # writing the final output to file
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    # streaming the page to file one tweet at a time
+    TWEET_PAGE.render_to_file(output_path, body=render_rows(TWEET_BLOCK, columns))
 
-    # write html to pdf
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(f"file://{Path(output_path).resolve()}")
-        page.pdf(path=Path(output_path).with_suffix(".pdf"), format="A4")
-        browser.close()
+    # write html to pdf on the shared, already warm browsers, in parallel shards for long feeds
+    if pdf:
+        export_feed_pdf(
+            TWEET_PAGE, output_path, len(content), "body", shard_size,
+            body=render_rows(TWEET_BLOCK, columns)
+        )
 
     # printing completion message
     print(f"Twitter thread generated.")
@@ -146,7 +165,7 @@ def tweet_gen (content: pd.DataFrame, output_path: str = "tweets.html") -> None:
 # alternative functionality if python file is executed directly
 if __name__ == "__main__":
     # prompting user for input
-    user_path = input("Manual input activated. Enter path to CSV file: ").strip()
+    user_path = input("Manual input activated. Enter path to CSV, Parquet or Arrow file: ").strip()
     # constructing a path to default output directory in case user didn't type full path
     default_path = Path(__file__).resolve().parent.parent / "output" / user_path
     # checking if either file exists
@@ -158,7 +177,7 @@ if __name__ == "__main__":
             file_path = default_path
         # running generator
         try:
-            df = pd.read_csv(file_path)
+            df = read_table(file_path)
             output_path = Path(file_path).with_suffix(".html")
             tweet_gen(df, output_path)
         except Exception as e:
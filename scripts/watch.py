@@ -0,0 +1,131 @@
+# import packages
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+import pandas as pd
+from scripts.browser_pool import export_feed_pdf, get_pool
+from scripts.generate import PLATFORMS, detect_platform
+from scripts.instagram import insta_pic_gen
+from scripts.trace import stage
+
+# the OpenAI client is only needed when an edited ImagePrompt has to be regenerated
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+class CsvWatcher:
+    """
+    Re-renders a CSV whenever it changes, only rebuilding the HTML of rows that were edited (and, for Instagram,
+    only regenerating pictures whose ImagePrompt changed), then re-exporting the PDF on the already warm browser.
+    Rows are identified by a hash of their values, so moved rows are reused as they are and deleted rows dropped.
+    Parameters:
+        csv_path (str): The CSV being edited.
+        platform (str): Platform of the CSV, detected from its columns if omitted.
+        output_path (str): HTML file to write, defaults to the CSV path with an .html extension.
+        pdf (bool): Whether to re-export the PDF after every change.
+        model_name (str): Model used for Instagram pictures.
+        client (OpenAI): Client used for Instagram pictures, defaults to the shared pooled client.
+    """
+
+    def __init__(self, csv_path: str, platform: Optional[str] = None, output_path: Optional[str] = None,
+                 pdf: bool = True, model_name: str = "gpt-4.1", client: Optional["OpenAI"] = None,
+                 use_cache: bool = True):
+        self.csv_path = csv_path
+        self.platform = platform
+        self.output_path = output_path or os.path.splitext(csv_path)[0] + ".html"
+        self.output_dir = Path(self.output_path).parent
+        self.pdf = pdf
+        self.model_name = model_name
+        self.client = client
+        self.use_cache = use_cache
+        # row hash -> (slot, HTML fragment) from the previous render
+        self._fragments = {}
+        # FilePath -> ImagePrompt the picture on disk was generated from
+        self._pictures = {}
+        self._platform = None
+
+    def _refresh_pictures(self, df: pd.DataFrame) -> int:
+        """
+        Generates the Instagram pictures whose prompt changed (or whose file is missing), returning how many.
+        """
+        stale = [
+            self._pictures.get(path) != prompt or not (self.output_dir / path).exists()
+            for path, prompt in zip(df["FilePath"].tolist(), df["ImagePrompt"].tolist())
+        ]
+        changed = df[stale]
+        if len(changed):
+            for folder in {os.path.dirname(path) for path in changed["FilePath"]}:
+                os.makedirs(self.output_dir / folder, exist_ok=True)
+            insta_pic_gen(changed, self.model_name, client=self.client, use_cache=self.use_cache,
+                          output_dir=str(self.output_dir))
+        self._pictures = dict(zip(df["FilePath"].tolist(), df["ImagePrompt"].tolist()))
+        return len(changed)
+
+    def render(self) -> dict:
+        """
+        Renders the CSV once, reusing the fragments of unchanged rows. Returns counts of what was redone.
+        """
+        # reading every value as text, so editing one cell never changes a column's dtype (and every row's hash)
+        df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+        platform = self.platform or detect_platform(df.columns)
+        spec = PLATFORMS[platform]
+        # fragments can't be reused if the CSV now holds another platform's posts
+        if platform != self._platform:
+            self._fragments, self._platform = {}, platform
+
+        pictures = self._refresh_pictures(df) if platform == "instagram" else 0
+
+        # putting rows in display order first where that depends on the whole feed (Reddit reply trees, Facebook posts)
+        if "arrange" in spec:
+            df = spec["arrange"](df)
+
+        # hashing every row at once, then rendering only the rows not seen in the previous render
+        keys = pd.util.hash_pandas_object(df, index=False).tolist()
+        missing = [i for i, key in enumerate(keys) if key not in self._fragments]
+        with stage("watch.fragments", rows=len(missing)):
+            if missing:
+                fragments = spec["fragments"](df.iloc[missing], self.output_dir)
+                self._fragments.update(zip((keys[i] for i in missing), fragments))
+        # forgetting rows that no longer exist
+        self._fragments = {key: self._fragments[key] for key in keys}
+
+        # assembling every slot in row order
+        template = spec["page"]
+        slots = {slot: [] for slot in template.slots}
+        for key in keys:
+            slot, fragment = self._fragments[key]
+            if slot is not None:
+                slots[slot].append(fragment)
+
+        template.render_to_file(self.output_path, **slots)
+        if self.pdf:
+            shard_slot = spec["shard_slot"]
+            export_feed_pdf(template, self.output_path, len(slots[shard_slot]), shard_slot, **slots)
+        return {"platform": platform, "rows": len(df), "rendered": len(missing), "pictures": pictures}
+
+    def watch(self, interval: float = 0.25, on_render: Optional[Callable[[dict, float], None]] = None) -> None:
+        """
+        Polls the CSV's modification time and re-renders after every change until interrupted.
+        on_render is called with render()'s counts and the seconds the render took.
+        """
+        # launching the browsers up front so the first edit doesn't pay for it
+        if self.pdf:
+            get_pool().warm()
+        last = None
+        while True:
+            try:
+                modified = os.stat(self.csv_path).st_mtime_ns
+            except FileNotFoundError:
+                modified = None
+            if modified is not None and modified != last:
+                last = modified
+                started = time.perf_counter()
+                try:
+                    result = self.render()
+                except Exception as e:
+                    # editors often save in several steps, so a half-written CSV is reported and picked up next save
+                    print(f"Could not render {self.csv_path}: {e}")
+                else:
+                    if on_render is not None:
+                        on_render(result, time.perf_counter() - started)
+            time.sleep(interval)
@@ -0,0 +1,285 @@
+"""
+Server mode: a local HTTP service that keeps the OpenAI client, browser pool, page templates and avatar cache warm
+between requests, instead of paying interpreter start-up and a Chromium launch for every run.
+
+Endpoints (JSON in, JSON out):
+    POST /generate  {"platform": "twitter", "prompt": "...", "country": "...", "output": "name", "pdf": true}
+                    Generates posts and returns them; with "output", also writes output/<name>.csv and renders it.
+                    Add "batch": true for background work that should give way to other requests under rate limits.
+    POST /render    {"csv": "<csv text>" or "rows": [{...}, ...], "output": "name", "platform": "twitter", "pdf": true}
+                    Renders posted rows to output/<name>.html (and .pdf); the platform is detected if omitted.
+                    Without "output", nothing is written and the response carries the "html" and base64 "pdf" instead.
+                    Instagram FilePaths must be relative paths inside the output folder (no absolute paths or "..").
+    GET  /metrics   Requests in flight and queued per endpoint, browser queue depth, per-stage latencies and
+                    time spent throttled by the OpenAI rate limits.
+
+Usage: python server.py [--port 8765] [--max-generate 4] [--max-render 2] [--max-queue 32]
+"""
+# import packages
+import argparse
+import base64
+import io
+import json
+import os
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from dotenv import load_dotenv
+import pandas as pd
+from scripts.api import generate, get_client, render_bytes
+from scripts.browser_pool import get_pool, shutdown_pool
+from scripts.generate import PLATFORMS, detect_platform, entries_to_frame
+from scripts.ratelimit import BATCH, INTERACTIVE, limiter_stats, priority
+from scripts.trace import trace_from_env
+
+class Busy(Exception):
+    """
+    Raised when an endpoint's queue is full; answered with a 503.
+    """
+
+class Limiter:
+    """
+    Caps how many requests of one kind run at once, queueing up to max_queue more and rejecting the rest.
+    """
+
+    def __init__(self, limit: int, max_queue: int):
+        self._slots = threading.Semaphore(max(1, limit))
+        self._lock = threading.Lock()
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = 0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                raise Busy()
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._slots.release()
+
+class Metrics:
+    """
+    Keeps the latest latencies of each stage (queue wait, LLM generation, rendering) and request counters.
+    Parameters:
+        window (int): Number of recent samples kept per stage for the percentiles.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self.stages = {}
+        self.counts = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def timed(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {stage: sorted(samples) for stage, samples in self.stages.items()}
+            counts = dict(self.counts)
+        latencies = {}
+        for stage, samples in stages.items():
+            latencies[stage] = {
+                "count": len(samples),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+            }
+        return {"requests": counts, "stages": latencies}
+
+class RenderService:
+    """
+    The warm state shared by every request, plus the request handlers themselves.
+    """
+
+    def __init__(self, max_generate: int = 4, max_render: int = 2, max_queue: int = 32, model_name: str = "gpt-4.1"):
+        self.model_name = model_name
+        self.metrics = Metrics()
+        self.limits = {"generate": Limiter(max_generate, max_queue), "render": Limiter(max_render, max_queue)}
+
+    @staticmethod
+    def output_stem(name: str) -> str:
+        if not name or re.search(r'[\\/:*?"<>|]', name):
+            raise ValueError(r'"output" must be a non-empty name without any of: \ / : * ? " < > |')
+        return os.path.join("output", name)
+
+    @staticmethod
+    def check_file_paths(df: pd.DataFrame) -> None:
+        # Instagram pictures are read from and generated to FilePath, so it must stay inside the output folder
+        if "FilePath" not in df.columns:
+            return
+        for path in df["FilePath"].dropna().astype(str):
+            parts = re.split(r"[\\/]", path)
+            if os.path.isabs(path) or re.match(r"^[A-Za-z]:", path) or ".." in parts:
+                raise ValueError(f'"FilePath" must be a path inside the output folder, got {path!r}')
+
+    @contextmanager
+    def slot(self, endpoint: str):
+        # the time spent waiting for a free slot is reported as its own stage
+        started = time.perf_counter()
+        with self.limits[endpoint].slot():
+            self.metrics.record(f"{endpoint}.queue", time.perf_counter() - started)
+            yield
+
+    def render_rows(self, platform: str, df: pd.DataFrame, stem: Optional[str], pdf: bool, model_name: str) -> dict:
+        # rendering in memory, so the browsers load the page from a string rather than reading back a file
+        with self.metrics.timed("render"):
+            if stem is None:
+                html, data = render_bytes(platform, df, pdf, model_name=model_name)
+                return {"html": html, "pdf": base64.b64encode(data).decode() if data is not None else None}
+            df.to_csv(stem + ".csv", index=False, encoding="utf-8-sig")
+            render_bytes(platform, df, pdf, stem + ".html", model_name)
+        return {"csv": stem + ".csv", "html": stem + ".html", "pdf": stem + ".pdf" if pdf else None}
+
+    def generate(self, body: dict) -> dict:
+        platform = body.get("platform")
+        if platform not in PLATFORMS or not body.get("prompt"):
+            raise ValueError(f'"prompt" and "platform" (one of: {", ".join(PLATFORMS)}) are required')
+        country = body.get("country") or os.getenv("COUNTRY")
+        stem = self.output_stem(body["output"]) if "output" in body else None
+        # one model for the posts and their pictures
+        model_name = body.get("model", self.model_name)
+        with self.slot("generate"), priority(BATCH if body.get("batch") else INTERACTIVE):
+            with self.metrics.timed("generate"):
+                posts = generate(platform, body["prompt"], country, model_name, use_cache=body.get("cache", True))
+            result = {"platform": platform, "entries": [post.model_dump() for post in posts]}
+            if stem is not None:
+                # pictures are named after their prompt, so every output shares one folder
+                df = entries_to_frame(platform, posts, "pictures", model_name)
+                result.update(self.render_rows(platform, df, stem, body.get("pdf", True), model_name))
+        return result
+
+    def render(self, body: dict) -> dict:
+        stem = self.output_stem(body["output"]) if "output" in body else None
+        if "csv" in body:
+            df = pd.read_csv(io.StringIO(body["csv"]))
+        elif "rows" in body:
+            df = pd.DataFrame(body["rows"])
+        else:
+            raise ValueError('either "csv" or "rows" is required')
+        self.check_file_paths(df)
+        platform = body.get("platform") or detect_platform(df.columns)
+        with self.slot("render"):
+            result = self.render_rows(platform, df, stem, body.get("pdf", True), body.get("model", self.model_name))
+        return dict(result, platform=platform, rows=len(df))
+
+    def status(self) -> dict:
+        snapshot = self.metrics.snapshot()
+        snapshot["queues"] = {
+            endpoint: {"running": limiter.running, "waiting": limiter.waiting}
+            for endpoint, limiter in self.limits.items()
+        }
+        snapshot["queues"]["browser"] = {"waiting": get_pool().pending}
+        snapshot["rate_limits"] = limiter_stats()
+        return snapshot
+
+def make_handler(service: RenderService) -> type:
+    routes = {("POST", "/generate"): service.generate, ("POST", "/render"): service.render,
+              ("GET", "/metrics"): lambda body: service.status()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self, method: str) -> None:
+            path = self.path.split("?")[0]
+            route = routes.get((method, path))
+            if route is None:
+                self._send(404, {"error": f"no route for {method} {path}"})
+                return
+            service.metrics.count(path)
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                self._send(200, route(body))
+            except Busy:
+                service.metrics.count("rejected")
+                self._send(503, {"error": "too many requests queued, try again later"})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                service.metrics.count("errors")
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve generation and rendering over HTTP on localhost.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--max-generate", type=int, default=4, help="generation requests running at once (default: 4)")
+    parser.add_argument("--max-render", type=int, default=2, help="render requests running at once (default: 2)")
+    parser.add_argument("--max-queue", type=int, default=32, help="requests queued per endpoint before answering 503 (default: 32)")
+    parser.add_argument("--model", default="gpt-4.1", help="model used for generation (default: gpt-4.1)")
+    parser.add_argument("--no-browser", action="store_true", help="don't launch the browsers until the first PDF export")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # TRACE=<file> records every stage of every request, written when the server stops
+    trace_from_env()
+    os.makedirs("output", exist_ok=True)
+    service = RenderService(args.max_generate, args.max_render, args.max_queue, args.model)
+
+    # warming everything up before the first request arrives
+    if os.getenv("OPENAI_API_KEY"):
+        get_client()
+    if not args.no_browser:
+        get_pool().warm()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Serving on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutdown_pool()
+
+if __name__ == "__main__":
+    main()